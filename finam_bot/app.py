@@ -23,6 +23,8 @@ async def market_loop(engine: TradeEngine, grpc: FinamGrpcClient):
     else:
         print("🕯 MARKET DATA MODE: CANDLES")
 
+        # один снапшот на весь поток: TradeEngine не хранит ссылку на него
+        snapshot = None
         async for candle in grpc.stream_candles(
             symbol=config.SYMBOL,
             timeframe=config.CANDLES_TIMEFRAME,
@@ -30,6 +32,7 @@ async def market_loop(engine: TradeEngine, grpc: FinamGrpcClient):
             snapshot = MarketSnapshot.from_candle(
                 symbol=config.SYMBOL,
                 candle=candle,
+                into=snapshot,
             )
             engine.on_market_data(snapshot)
 
@@ -37,8 +40,17 @@ async def market_loop(engine: TradeEngine, grpc: FinamGrpcClient):
 async def main():
     print("🟢 START S7.C — STREAM → SNAPSHOT → ENGINE")
 
-    from finam_bot.grpc.factory import create_client
-    grpc = create_client()
+    from finam_bot.grpc.factory import create_market_client
+    from finam_bot.infra.exporters import reporter_from_env
+
+    # FINAM_METRICS_PROM / FINAM_METRICS_JSON — периодический экспорт метрик gRPC
+    reporter = reporter_from_env()
+    if reporter is not None:
+        reporter.start()
+
+    grpc = create_market_client()
+    if hasattr(grpc, "connect"):
+        await grpc.connect()
     engine = TradeEngine(
         symbol=config.SYMBOL,
         equity=config.START_EQUITY,
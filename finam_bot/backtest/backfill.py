@@ -0,0 +1,243 @@
+# finam_bot/backtest/backfill.py
+"""
+Backfill исторических баров через gRPC Bars с локальным кэшем.
+
+- [from, to) режется на куски, которые API отдаёт за один запрос (CHUNK_SECONDS)
+- куски всех символов качаются параллельно через один grpc.aio канал
+  (HTTP/2 keep-alive, без нового TLS на каждый запрос), не больше
+  `concurrency` запросов одновременно
+- результат сливается в CandleStore (<root>/<symbol>.<TF>.candles, тот же
+  формат, что читает replay_server), повторный запуск докачивает только
+  недостающую голову / хвост диапазона
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from finam_bot.backtest.candle_store import (
+    CANDLE_DTYPE,
+    PathLike,
+    array_to_candles,
+    load_candles_array,
+    save_candles,
+)
+from finam_bot.backtest.models import Candle
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# максимальная глубина одного запроса Bars по таймфрейму
+CHUNK_SECONDS = {
+    "M1": 7 * DAY,
+    "M5": 30 * DAY,
+    "M15": 30 * DAY,
+    "M30": 30 * DAY,
+    "H1": 30 * DAY,
+    "H2": 30 * DAY,
+    "H4": 30 * DAY,
+    "H8": 30 * DAY,
+    "D1": 365 * DAY,
+    "W1": 5 * 365 * DAY,
+    "MN": 5 * 365 * DAY,
+}
+
+
+def split_range(start: int, end: int, chunk: int) -> List[Tuple[int, int]]:
+    """
+    [start, end) -> [(a, b), ...] длиной не больше chunk секунд.
+    """
+    if chunk <= 0:
+        raise ValueError("chunk must be > 0")
+    return [(a, min(a + chunk, end)) for a in range(int(start), int(end), int(chunk))]
+
+
+def bars_to_array(bars) -> np.ndarray:
+    """
+    repeated marketdata.Bar -> CANDLE_DTYPE.
+    """
+    arr = np.empty(len(bars), dtype=CANDLE_DTYPE)
+    for i, b in enumerate(bars):
+        arr[i] = (
+            b.timestamp.seconds,
+            float(b.open.value or 0),
+            float(b.high.value or 0),
+            float(b.low.value or 0),
+            float(b.close.value or 0),
+            float(b.volume.value or 0),
+        )
+    return arr
+
+
+def merge_candles(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """
+    Объединение по ts: сортировка, на дубликатах побеждает новая запись
+    (последний бар прошлой загрузки мог быть незакрытым).
+    """
+    if not len(old):
+        merged = new
+    elif not len(new):
+        return old
+    else:
+        merged = np.concatenate([old, new])
+    # stable sort + последний из одинаковых ts
+    merged = merged[np.argsort(merged["ts"], kind="stable")]
+    keep = np.ones(len(merged), dtype=bool)
+    keep[:-1] = merged["ts"][1:] != merged["ts"][:-1]
+    return merged[keep]
+
+
+class CandleStore:
+    """
+    Каталог бинарных файлов свечей: один файл на (symbol, tf).
+    """
+
+    def __init__(self, root: PathLike):
+        self.root = Path(root)
+
+    def path(self, symbol: str, tf: str) -> Path:
+        return self.root / f"{symbol}.{tf.upper()}.candles"
+
+    def load(self, symbol: str, tf: str) -> np.ndarray:
+        path = self.path(symbol, tf)
+        if not path.exists():
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return load_candles_array(path)
+
+    def merge(self, symbol: str, tf: str, arr: np.ndarray) -> np.ndarray:
+        merged = merge_candles(self.load(symbol, tf), arr)
+        save_candles(self.path(symbol, tf), merged)
+        return merged
+
+    def missing(self, symbol: str, tf: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Какие части [start, end) надо докачать: голова до первого бара в кэше
+        и хвост начиная с последнего бара (он перезапрашивается).
+        Дыры внутри закэшированного диапазона не ищем.
+        """
+        cached = self.load(symbol, tf)
+        if not len(cached):
+            return [(start, end)]
+
+        first, last = int(cached["ts"][0]), int(cached["ts"][-1])
+        out = []
+        if start < first:
+            out.append((start, min(first, end)))
+        if last < end:
+            out.append((max(last, start), end))
+        return out
+
+
+class BarsBackfill:
+    """
+        client = await create_async_client().connect()
+        backfill = BarsBackfill(client, CandleStore("data/candles"))
+        data = await backfill.run(["SBER@MISX", "GAZP@MISX"], "M1", dt_from, dt_to)
+    """
+
+    def __init__(
+        self,
+        client,
+        store: CandleStore,
+        *,
+        concurrency: int = 4,
+        chunk_seconds: Optional[Dict[str, int]] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.client = client
+        self.store = store
+        self.concurrency = int(concurrency)
+        self.chunk_seconds = dict(CHUNK_SECONDS, **(chunk_seconds or {}))
+        self.requests = 0
+
+    async def _fetch(self, sem: asyncio.Semaphore, symbol: str, tf: str, a: int, b: int) -> np.ndarray:
+        async with sem:
+            self.requests += 1
+            resp = await self.client.get_bars(
+                symbol,
+                tf,
+                datetime.fromtimestamp(a, timezone.utc),
+                datetime.fromtimestamp(b, timezone.utc),
+            )
+        return bars_to_array(resp.bars)
+
+    async def run(
+        self,
+        symbols: Sequence[str],
+        tf: str,
+        dt_from: datetime,
+        dt_to: datetime,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Возвращает symbol -> CANDLE_DTYPE в [dt_from, dt_to) из кэша после докачки.
+        """
+        tf = tf.upper()
+        if tf not in self.chunk_seconds:
+            raise ValueError(f"Unsupported tf={tf}. Use one of: {', '.join(self.chunk_seconds)}")
+        start, end = int(dt_from.timestamp()), int(dt_to.timestamp())
+        if end <= start:
+            raise ValueError("dt_to must be after dt_from")
+
+        chunk = self.chunk_seconds[tf]
+        sem = asyncio.Semaphore(self.concurrency)
+
+        jobs: Dict[str, List[asyncio.Task]] = {}
+        for symbol in symbols:
+            ranges = [r for gap in self.store.missing(symbol, tf, start, end) for r in split_range(*gap, chunk)]
+            jobs[symbol] = [asyncio.create_task(self._fetch(sem, symbol, tf, a, b)) for a, b in ranges]
+
+        try:
+            await asyncio.gather(*(t for tasks in jobs.values() for t in tasks))
+        except BaseException:
+            for tasks in jobs.values():
+                for t in tasks:
+                    t.cancel()
+            raise
+
+        out: Dict[str, np.ndarray] = {}
+        for symbol, tasks in jobs.items():
+            if tasks:
+                fresh = np.concatenate([t.result() for t in tasks])
+                cached = self.store.merge(symbol, tf, fresh)
+                logger.info("backfill %s %s: +%d bars in %d requests", symbol, tf, len(fresh), len(tasks))
+            else:
+                cached = self.store.load(symbol, tf)
+            ts = cached["ts"]
+            out[symbol] = cached[(ts >= start) & (ts < end)]
+        return out
+
+
+def backfill_candles(
+    *,
+    symbols: Sequence[str],
+    tf: str,
+    dt_from: datetime,
+    dt_to: datetime,
+    cache_dir: PathLike,
+    secret: Optional[str] = None,
+    concurrency: int = 4,
+) -> List[Candle]:
+    """
+    Синхронная обёртка для backtest.cli: все символы одним списком, по ts.
+    """
+    from finam_bot.grpc.factory import create_async_client
+
+    async def _run() -> Dict[str, np.ndarray]:
+        async with create_async_client(api_token=secret) as client:
+            return await BarsBackfill(client, CandleStore(cache_dir), concurrency=concurrency).run(
+                symbols, tf, dt_from, dt_to
+            )
+
+    data = asyncio.run(_run())
+    candles: List[Candle] = []
+    for arr in data.values():
+        candles.extend(array_to_candles(arr))
+    candles.sort(key=lambda c: (c.ts or 0))
+    return candles
@@ -68,7 +68,12 @@ class BrokerSim:
         stop_loss: float,
         take_profit: float,
         ts: Optional[int] = None,
+        fee_price: Optional[float] = None,
     ) -> None:
+        """
+        fee_price — цена для расчёта комиссии, если отличается от price
+        (ролл по склеенному ряду: PnL по скорректированной цене, комиссия по сырой).
+        """
         if self.position is not None:
             raise RuntimeError("Position already open")
 
@@ -80,7 +85,7 @@ class BrokerSim:
             raise RuntimeError(f"Not enough cash for margin: need={margin:.2f} have={self.cash:.2f}")
 
         # комиссия на вход
-        fee_entry = self.commission.calc(price * qty)
+        fee_entry = self.commission.calc((price if fee_price is None else fee_price) * qty)
         self._apply_fee(fee_entry)
 
         self.used_margin = margin
@@ -102,6 +107,7 @@ class BrokerSim:
         price: float,
         ts: Optional[int] = None,
         reason: str = "EXIT",
+        fee_price: Optional[float] = None,
     ) -> Trade:
         if self.position is None:
             raise RuntimeError("No open position")
@@ -109,7 +115,7 @@ class BrokerSim:
         pos = self.position
 
         # комиссия на выход
-        fee_exit = self.commission.calc(price * pos.qty)
+        fee_exit = self.commission.calc((price if fee_price is None else fee_price) * pos.qty)
         self._apply_fee(fee_exit)
 
         # PnL
@@ -146,6 +152,50 @@ class BrokerSim:
         self.trades.append(trade)
         return trade
 
+    def roll_position(
+        self,
+        *,
+        to_symbol: str,
+        price: float,
+        ts: Optional[int] = None,
+        old_price: Optional[float] = None,
+        new_price: Optional[float] = None,
+    ) -> Optional[Trade]:
+        """
+        Ролл фьючерса: закрываем позицию по старому контракту (reason="ROLL")
+        и открываем такую же (side/qty/SL/TP) по новому.
+
+        price — цена склеенного ряда (по ней PnL, SL/TP не сдвигаются),
+        old_price/new_price — сырые цены контрактов для комиссий.
+
+        Ролл атомарный: если новую ногу открыть нельзя (не хватает маржи
+        после комиссий и т.п.), старая позиция и счёт восстанавливаются,
+        исключение пробрасывается.
+        """
+        if self.position is None:
+            return None
+
+        pos = self.position
+        saved = (self.cash, self.equity, self.used_margin, len(self.trades))
+        trade = self.close_position(price=price, ts=ts, reason="ROLL", fee_price=old_price)
+        try:
+            self.open_position(
+                symbol=to_symbol,
+                side=pos.side,
+                price=price,
+                qty=pos.qty,
+                stop_loss=pos.stop_loss,
+                take_profit=pos.take_profit,
+                ts=ts,
+                fee_price=new_price,
+            )
+        except Exception:
+            self.cash, self.equity, self.used_margin, n_trades = saved
+            del self.trades[n_trades:]
+            self.position = pos
+            raise
+        return trade
+
     def apply_cashflow(self, *, ts: int | None, symbol: str, amount: float, kind: str = "COUPON", comment: str = ""):
         self.cash += amount
         self.equity = self.cash + (
@@ -0,0 +1,147 @@
+# finam_bot/backtest/candle_store.py
+"""
+Бинарный формат свечей, тиков и обновлений стакана.
+
+Файл = 8 байт magic + плоский массив записей CANDLE_DTYPE / TICK_DTYPE /
+BOOK_DTYPE (little-endian). Читается одним np.fromfile без парсинга, поэтому годится
+как кэш для многолетних рядов и записанной ленты.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List, Union
+
+import numpy as np
+
+from finam_bot.backtest.models import Candle
+
+
+CANDLE_MAGIC = b"FCNDL\x00\x00\x01"
+
+CANDLE_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+TICK_MAGIC = b"FTICK\x00\x00\x01"
+
+# side — как в OrderFlowAccumulator: SIDE_BUY = 1, SIDE_SELL = -1, 0 — неизвестно
+TICK_DTYPE = np.dtype(
+    [
+        ("ts", "<f8"),
+        ("price", "<f8"),
+        ("qty", "<f8"),
+        ("side", "i1"),
+    ]
+)
+
+BOOK_MAGIC = b"FBOOK\x00\x00\x01"
+
+# инкрементальные строки стакана, action — как StreamOrderBook.Row.Action
+# (1 REMOVE, 2 ADD, 3 UPDATE)
+BOOK_DTYPE = np.dtype(
+    [
+        ("ts", "<f8"),
+        ("price", "<f8"),
+        ("buy_size", "<f8"),
+        ("sell_size", "<f8"),
+        ("action", "i1"),
+    ]
+)
+
+# Candle.ts может быть None — храним как sentinel
+NO_TS = np.iinfo(np.int64).min
+
+PathLike = Union[str, Path]
+
+
+def candles_to_array(candles: Iterable[Candle]) -> np.ndarray:
+    candles = list(candles)
+    arr = np.empty(len(candles), dtype=CANDLE_DTYPE)
+    for i, c in enumerate(candles):
+        arr[i] = (
+            NO_TS if c.ts is None else int(c.ts),
+            c.open,
+            c.high,
+            c.low,
+            c.close,
+            c.volume,
+        )
+    return arr
+
+
+def array_to_candles(arr: np.ndarray) -> List[Candle]:
+    out: List[Candle] = []
+    for ts, o, h, l, c, v in arr.tolist():
+        out.append(
+            Candle(
+                ts=None if ts == NO_TS else ts,
+                open=o,
+                high=h,
+                low=l,
+                close=c,
+                volume=v,
+            )
+        )
+    return out
+
+
+def _save(path: PathLike, magic: bytes, arr: np.ndarray) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(magic)
+        arr.tofile(f)
+    tmp.replace(path)
+
+
+def _load(path: PathLike, magic: bytes, dtype: np.dtype, what: str) -> np.ndarray:
+    path = Path(path)
+    with path.open("rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"Not a {what} file: {path}")
+        return np.fromfile(f, dtype=dtype)
+
+
+def save_candles(path: PathLike, candles: Union[np.ndarray, Iterable[Candle]]) -> None:
+    """
+    Пишет свечи атомарно (tmp + rename), чтобы параллельный читатель
+    не увидел недописанный файл.
+    """
+    arr = candles if isinstance(candles, np.ndarray) else candles_to_array(candles)
+    _save(path, CANDLE_MAGIC, np.ascontiguousarray(arr, dtype=CANDLE_DTYPE))
+
+
+def load_candles_array(path: PathLike) -> np.ndarray:
+    return _load(path, CANDLE_MAGIC, CANDLE_DTYPE, "candle")
+
+
+def load_candles(path: PathLike) -> List[Candle]:
+    return array_to_candles(load_candles_array(path))
+
+
+def save_ticks(path: PathLike, ticks: np.ndarray) -> None:
+    """
+    Лента сделок (массив TICK_DTYPE, отсортирован по ts).
+    """
+    _save(path, TICK_MAGIC, np.ascontiguousarray(ticks, dtype=TICK_DTYPE))
+
+
+def load_ticks(path: PathLike) -> np.ndarray:
+    return _load(path, TICK_MAGIC, TICK_DTYPE, "tick")
+
+
+def save_book(path: PathLike, rows: np.ndarray) -> None:
+    _save(path, BOOK_MAGIC, np.ascontiguousarray(rows, dtype=BOOK_DTYPE))
+
+
+def load_book(path: PathLike) -> np.ndarray:
+    return _load(path, BOOK_MAGIC, BOOK_DTYPE, "order book")
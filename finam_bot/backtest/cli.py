@@ -126,10 +126,7 @@ def _http_json(method: str, url: str, *, headers: Dict[str, str], body: Optional
 # ---------------------------
 # FINAM REST loader
 # ---------------------------
-def finam_create_session(*, secret: str, base_url: str = FINAM_BASE_DEFAULT) -> str:
-    """
-    POST /v1/sessions  { "secret": "<token>" } -> { "token": "<jwt>" }
-    """
+def _finam_session_request(secret: str, base_url: str) -> str:
     url = f"{base_url.rstrip('/')}/v1/sessions"
     data = _http_json("POST", url, headers={"Accept": "application/json"}, body={"secret": secret})
     token = data.get("token") if isinstance(data, dict) else None
@@ -138,6 +135,18 @@ def finam_create_session(*, secret: str, base_url: str = FINAM_BASE_DEFAULT) ->
     return str(token)
 
 
+def finam_create_session(*, secret: str, base_url: str = FINAM_BASE_DEFAULT) -> str:
+    """
+    POST /v1/sessions  { "secret": "<token>" } -> { "token": "<jwt>" }
+    JWT кэшируется в общем файле TokenManager: повторные запуски CLI
+    не создают новую сессию, пока старая не близка к истечению.
+    """
+    from finam_bot.grpc.token_manager import TokenManager
+
+    tokens = TokenManager(secret, lambda s: _finam_session_request(s, base_url), scope=base_url.rstrip("/"))
+    return tokens.token()
+
+
 def load_finam_candles(
     *,
     symbols: Sequence[str],
@@ -250,13 +259,28 @@ def load_candles_auto(args) -> Tuple[str, List[Candle]]:
             raise ValueError("--source finam requires --symbols (example: SBER@MISX)")
         if not args.dt_from or not args.dt_to:
             raise ValueError("--source finam requires --from and --to ISO timestamps")
-        candles = load_finam_candles(
+        if getattr(args, "transport", "grpc") == "rest":
+            candles = load_finam_candles(
+                symbols=symbols,
+                tf=args.tf,
+                dt_from=args.dt_from,
+                dt_to=args.dt_to,
+                secret=token,
+                base_url=args.finam_base,
+            )
+            return "finam", candles
+
+        # gRPC Bars: чанки + параллельно + кэш на диске (докачивается только хвост)
+        from finam_bot.backtest.backfill import backfill_candles
+
+        candles = backfill_candles(
             symbols=symbols,
             tf=args.tf,
-            dt_from=args.dt_from,
-            dt_to=args.dt_to,
+            dt_from=datetime.fromtimestamp(_iso_to_epoch_seconds(args.dt_from), timezone.utc),
+            dt_to=datetime.fromtimestamp(_iso_to_epoch_seconds(args.dt_to), timezone.utc),
+            cache_dir=args.cache_dir,
             secret=token,
-            base_url=args.finam_base,
+            concurrency=args.concurrency,
         )
         return "finam", candles
 
@@ -342,6 +366,10 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--to", dest="dt_to", default="", help="ISO to datetime, e.g. 2026-02-01T18:45:00")
     p.add_argument("--token", default="", help="Finam secret token. Prefer env FINAM_TOKEN.")
     p.add_argument("--finam-base", default=FINAM_BASE_DEFAULT, help="Finam REST base URL (default: https://api.finam.ru).")
+    p.add_argument("--transport", choices=["grpc", "rest"], default="grpc",
+                   help="Finam bars transport: grpc (chunked backfill + cache) or rest (single request per symbol).")
+    p.add_argument("--cache-dir", default="data/candles", help="Candle cache for gRPC backfill.")
+    p.add_argument("--concurrency", type=int, default=4, help="Parallel Bars requests for gRPC backfill.")
 
     # engine params
     p.add_argument("--symbol", default="TEST", help="Backtest symbol (internal).")
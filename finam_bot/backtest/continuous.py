@@ -0,0 +1,275 @@
+# finam_bot/backtest/continuous.py
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterable, List, Literal, Mapping, Optional, Sequence, Tuple
+
+from finam_bot.backtest.candle_store import load_candles, save_candles
+from finam_bot.backtest.models import Candle
+
+AdjustMethod = Literal["back", "ratio", "none"]
+
+
+def files_source_key(paths: Iterable[str | Path]) -> str:
+    """
+    source_key по файлам-источникам (например, CandleStore.path(symbol, tf)):
+    имя, mtime и размер — докачка баров меняет ключ без чтения файлов.
+    """
+    parts = []
+    for p in paths:
+        p = Path(p)
+        if p.exists():
+            st = p.stat()
+            parts.append(f"{p.name}:{st.st_mtime_ns}:{st.st_size}")
+        else:
+            parts.append(f"{p.name}:missing")
+    return "|".join(parts)
+
+
+def series_source_key(series: Mapping[str, Sequence[Candle]]) -> str:
+    """
+    source_key по самим данным: число баров, первый / последний ts и
+    последний close каждого контракта.
+    """
+    parts = []
+    for symbol in sorted(series):
+        candles = series[symbol]
+        if not candles:
+            parts.append(f"{symbol}:0")
+            continue
+        first, last = candles[0], candles[-1]
+        parts.append(f"{symbol}:{len(candles)}:{first.ts}:{last.ts}:{last.close!r}")
+    return "|".join(parts)
+
+
+@dataclass(frozen=True)
+class ContractSpec:
+    """
+    Один контракт в цепочке (в порядке экспирации).
+
+    roll_ts — момент перехода на СЛЕДУЮЩИЙ контракт (epoch seconds).
+    None -> ролл по пересечению объёмов (первый общий бар, где объём
+    следующего контракта больше текущего).
+    """
+    symbol: str
+    roll_ts: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RollEvent:
+    """
+    Событие ролла для BrokerSim.
+
+    old_price / new_price — сырые цены контрактов в момент ролла
+    (по ним считается комиссия), adjustment — gap (back) или ratio (ratio).
+    """
+    ts: int
+    from_symbol: str
+    to_symbol: str
+    old_price: float
+    new_price: float
+    adjustment: float
+
+
+class ContinuousContractBuilder:
+    """
+    Склейка поэкспирационных рядов в непрерывный контракт.
+
+    method:
+      - "back":  back-adjustment, к истории прибавляется разница цен на ролле
+      - "ratio": история умножается на отношение цен на ролле
+      - "none":  простая склейка без корректировки
+
+    Последний контракт всегда остаётся в сырых ценах.
+    """
+
+    VERSION = 1
+
+    def __init__(self, contracts: Sequence[ContractSpec], method: AdjustMethod = "back"):
+        if not contracts:
+            raise ValueError("contracts must not be empty")
+        if method not in ("back", "ratio", "none"):
+            raise ValueError(f"Unknown adjust method: {method}")
+
+        self.contracts = list(contracts)
+        self.method: AdjustMethod = method
+
+    # ------------------------- helpers -------------------------
+
+    @staticmethod
+    def _sorted(candles: Sequence[Candle]) -> List[Candle]:
+        return sorted((c for c in candles if c.ts is not None), key=lambda c: c.ts)
+
+    @staticmethod
+    def _volume_crossover(old: List[Candle], new: List[Candle]) -> Optional[int]:
+        old_vol = {c.ts: c.volume for c in old}
+        for c in new:
+            v = old_vol.get(c.ts)
+            if v is not None and c.volume > v:
+                return c.ts
+        return None
+
+    def _roll_ts(self, spec: ContractSpec, old: List[Candle], new: List[Candle]) -> int:
+        if spec.roll_ts is not None:
+            return int(spec.roll_ts)
+
+        ts = self._volume_crossover(old, new)
+        if ts is not None:
+            return ts
+
+        # нет пересечения объёмов -> переходим сразу после последнего бара старого
+        if old:
+            after = [c.ts for c in new if c.ts > old[-1].ts]
+            if after:
+                return after[0]
+            return old[-1].ts + 1
+        if new:
+            return new[0].ts
+        raise ValueError(f"No data to roll from {spec.symbol}")
+
+    @staticmethod
+    def _roll_prices(old: List[Candle], new: List[Candle], roll_ts: int) -> Tuple[float, float]:
+        """
+        Цены обоих контрактов на последнем баре старого до ролла.
+        Если новый в этот момент не торговался — берём его первый open после ролла.
+        """
+        before = [c for c in old if c.ts < roll_ts]
+        if not before:
+            raise ValueError("old contract has no bars before roll")
+        last_old = before[-1]
+
+        new_at = [c for c in new if c.ts <= last_old.ts]
+        if new_at:
+            return last_old.close, new_at[-1].close
+
+        after = [c for c in new if c.ts >= roll_ts]
+        if not after:
+            raise ValueError("new contract has no bars after roll")
+        return last_old.close, after[0].open
+
+    # ------------------------- main API -------------------------
+
+    def build(self, series: Mapping[str, Sequence[Candle]]) -> Tuple[List[Candle], List[RollEvent]]:
+        """
+        series: symbol -> свечи контракта.
+        Возвращает (склеенный ряд, события ролла).
+        """
+        data = []
+        for spec in self.contracts:
+            if spec.symbol not in series:
+                raise KeyError(f"No candles for contract: {spec.symbol}")
+            data.append(self._sorted(series[spec.symbol]))
+
+        n = len(self.contracts)
+        roll_ts: List[int] = []
+        gaps: List[float] = []
+        ratios: List[float] = []
+        rolls: List[RollEvent] = []
+
+        for i in range(n - 1):
+            spec, nxt = self.contracts[i], self.contracts[i + 1]
+            ts = self._roll_ts(spec, data[i], data[i + 1])
+            old_px, new_px = self._roll_prices(data[i], data[i + 1], ts)
+
+            roll_ts.append(ts)
+            gaps.append(new_px - old_px)
+            ratios.append(new_px / old_px if old_px else 1.0)
+
+            adjustment = gaps[-1] if self.method == "back" else ratios[-1] if self.method == "ratio" else 0.0
+            rolls.append(
+                RollEvent(
+                    ts=ts,
+                    from_symbol=spec.symbol,
+                    to_symbol=nxt.symbol,
+                    old_price=float(old_px),
+                    new_price=float(new_px),
+                    adjustment=float(adjustment),
+                )
+            )
+
+        # накопленная корректировка для каждого сегмента (от последнего к первому)
+        add = [0.0] * n
+        mul = [1.0] * n
+        for i in range(n - 2, -1, -1):
+            add[i] = add[i + 1] + gaps[i]
+            mul[i] = mul[i + 1] * ratios[i]
+
+        out: List[Candle] = []
+        for i, candles in enumerate(data):
+            lo = roll_ts[i - 1] if i > 0 else None
+            hi = roll_ts[i] if i < n - 1 else None
+
+            for c in candles:
+                if lo is not None and c.ts < lo:
+                    continue
+                if hi is not None and c.ts >= hi:
+                    break
+                out.append(self._adjust(c, add[i], mul[i]))
+
+        return out, rolls
+
+    def _adjust(self, c: Candle, add: float, mul: float) -> Candle:
+        if self.method == "back" and add:
+            return Candle(ts=c.ts, open=c.open + add, high=c.high + add, low=c.low + add,
+                          close=c.close + add, volume=c.volume)
+        if self.method == "ratio" and mul != 1.0:
+            return Candle(ts=c.ts, open=c.open * mul, high=c.high * mul, low=c.low * mul,
+                          close=c.close * mul, volume=c.volume)
+        return c
+
+    # ------------------------- cache -------------------------
+
+    def cache_key(self, source_key: str) -> str:
+        """
+        source_key — версия исходных данных (files_source_key /
+        series_source_key); при её смене кэш пересобирается.
+        """
+        payload = {
+            "v": self.VERSION,
+            "method": self.method,
+            "contracts": [asdict(c) for c in self.contracts],
+            "source": source_key,
+        }
+        raw = json.dumps(payload, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()[:16]
+
+    def load_or_build(
+        self,
+        load_series: Callable[[], Mapping[str, Sequence[Candle]]],
+        *,
+        cache_dir: str | Path,
+        source_key: Optional[str],
+    ) -> Tuple[List[Candle], List[RollEvent]]:
+        """
+        Достаёт склеенный ряд из кэша (бинарный формат свечей + json роллов).
+
+        source_key обязателен — без него докачанные бары отдавали бы старый ряд:
+          str  — версия источника (files_source_key); load_series вызывается
+                 только при промахе кэша
+          None — ключ считается по загруженным данным (series_source_key):
+                 load_series вызывается всегда, кэш экономит только склейку
+        """
+        cache_dir = Path(cache_dir)
+        series = None
+        if source_key is None:
+            series = load_series()
+            source_key = series_source_key(series)
+        key = self.cache_key(source_key)
+        candles_path = cache_dir / f"continuous_{key}.candles"
+        rolls_path = cache_dir / f"continuous_{key}.rolls.json"
+
+        if candles_path.exists() and rolls_path.exists():
+            rolls = [RollEvent(**r) for r in json.loads(rolls_path.read_text(encoding="utf-8"))]
+            return load_candles(candles_path), rolls
+
+        candles, rolls = self.build(series if series is not None else load_series())
+
+        save_candles(candles_path, candles)
+        tmp = rolls_path.with_name(rolls_path.name + ".tmp")
+        tmp.write_text(json.dumps([asdict(r) for r in rolls]), encoding="utf-8")
+        tmp.replace(rolls_path)
+
+        return candles, rolls
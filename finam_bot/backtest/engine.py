@@ -6,6 +6,7 @@ from typing import Optional, Literal, Sequence
 
 from finam_bot.backtest.models import Candle
 from finam_bot.backtest.broker import BrokerSim, PercentCommission
+from finam_bot.backtest.continuous import RollEvent
 from finam_bot.core.market_snapshot import MarketSnapshot
 from finam_bot.core.signals import Signal
 from finam_bot.core.risk_manager import RiskManager
@@ -202,20 +203,47 @@ class BacktestEngine:
         *,
         orderflow: Optional[Sequence[object]] = None,
         atr_floor: float = 0.0,
+        rolls: Optional[Sequence[RollEvent]] = None,
+        reuse_snapshot: bool = False,
     ) -> BrokerSim:
         """
         orderflow: список такого же размера, как candles (опционально).
         atr_floor: минимальный ATR, чтобы не улетал размер позиции на первых барах.
+        rolls: события ролла склеенного фьючерса (ContinuousContractBuilder) —
+               открытая позиция перекладывается в новый контракт с комиссиями.
+        reuse_snapshot: opt-in. Один MarketSnapshot на весь прогон (update() на
+               каждом баре) вместо нового объекта. Контракт: стратегия получает
+               один и тот же объект на каждом баре — ссылка, сохранённая на
+               баре N, на баре N+1 уже содержит новые данные. Включать только
+               для стратегий, которые не хранят snapshot между вызовами.
         """
         candles = list(candles)
+        pending_rolls = sorted(rolls or [], key=lambda r: r.ts)
+        roll_idx = 0
+        contract = pending_rolls[0].from_symbol if pending_rolls else self.symbol
         self.equity_curve = [self.broker.equity]
+        snapshot: Optional[MarketSnapshot] = None
         for i, c in enumerate(candles):
+            # 0) ролл контракта: на первом баре нового контракта, по close предыдущего
+            while roll_idx < len(pending_rolls) and c.ts is not None and c.ts >= pending_rolls[roll_idx].ts:
+                r = pending_rolls[roll_idx]
+                if self.broker.position is not None and i > 0:
+                    self.broker.roll_position(
+                        to_symbol=r.to_symbol,
+                        price=candles[i - 1].close,
+                        ts=r.ts,
+                        old_price=r.old_price,
+                        new_price=r.new_price,
+                    )
+                contract = r.to_symbol
+                roll_idx += 1
+
             # 1) исполняем отложенный вход по OPEN текущего бара
             self.broker.last_price = c.close
             if self._pending is not None and self.broker.position is None:
                 p = self._pending
                 self.broker.open_position(
-                    symbol=self.symbol,
+                    symbol=contract,
                     side=p.side,
                     price=c.open,
                     qty=p.qty,
@@ -251,7 +279,10 @@ class BacktestEngine:
                 snap_kwargs["prices"] = getattr(of, "prices", None) or (of.get("prices") if isinstance(of, dict) else None)
                 snap_kwargs["volumes"] = getattr(of, "volumes", None) or (of.get("volumes") if isinstance(of, dict) else None)
 
-            snapshot = MarketSnapshot(**snap_kwargs)
+            if reuse_snapshot and snapshot is not None:
+                snapshot.update(**snap_kwargs)
+            else:
+                snapshot = MarketSnapshot(**snap_kwargs)
             # 4a) стратегия: on_snapshot | on_candle (return) | on_candle+generate_signal | callable
             sig_raw = None
 
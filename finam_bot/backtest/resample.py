@@ -0,0 +1,224 @@
+# finam_bot/backtest/resample.py
+"""
+Ресемплинг свечей: M1 -> M5/H1/D1, а также volume/tick/dollar бары.
+
+Каждый режим сводится к номеру группы для исходной свечи:
+  - time:   номер временного интервала, выровненного по открытию сессии MOEX
+  - volume: floor(накопленный объём ДО свечи / size)
+  - tick:   номер свечи // size
+  - dollar: floor(накопленный оборот close*volume ДО свечи / size)
+
+resample() считает группы и агрегаты за один векторный проход (reduceat),
+StreamingResampler повторяет ту же логику по одной свече — результаты совпадают.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Literal, Optional, Sequence, Union
+
+import numpy as np
+
+from finam_bot.backtest.candle_store import CANDLE_DTYPE, array_to_candles, candles_to_array
+from finam_bot.backtest.models import Candle
+
+BarKind = Literal["time", "volume", "tick", "dollar"]
+
+# MSK = UTC+3, основная сессия акций открывается в 10:00 MSK
+MOEX_UTC_OFFSET = 3 * 3600
+MOEX_SESSION_OPEN = 10 * 3600
+# торговый день срочного рынка начинается с вечерней сессии (19:00 MSK)
+MOEX_FUTURES_DAY_START = 19 * 3600
+
+TIMEFRAME_SECONDS = {
+    "M1": 60,
+    "M5": 5 * 60,
+    "M10": 10 * 60,
+    "M15": 15 * 60,
+    "M30": 30 * 60,
+    "H1": 3600,
+    "H2": 2 * 3600,
+    "H4": 4 * 3600,
+    "D1": 86400,
+}
+
+
+@dataclass(frozen=True)
+class BarRule:
+    kind: BarKind
+    size: float                 # секунды | объём | кол-во свечей | оборот
+    utc_offset: int = MOEX_UTC_OFFSET
+    session_open: int = MOEX_SESSION_OPEN
+
+    def __post_init__(self):
+        if self.kind not in ("time", "volume", "tick", "dollar"):
+            raise ValueError(f"Unknown bar kind: {self.kind}")
+        if self.size <= 0:
+            raise ValueError("size must be > 0")
+
+    @classmethod
+    def timeframe(cls, tf: str, **kwargs) -> "BarRule":
+        tf = (tf or "").strip().upper()
+        if tf not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported tf={tf}. Use one of: {', '.join(TIMEFRAME_SECONDS)}")
+        return cls(kind="time", size=TIMEFRAME_SECONDS[tf], **kwargs)
+
+    # --- time helpers (общие для векторного и потокового пути) ---
+
+    def _shift(self) -> int:
+        return self.utc_offset - self.session_open
+
+    def bucket_start(self, bucket: int) -> int:
+        return int(bucket * int(self.size) - self._shift())
+
+
+def group_ids(arr: np.ndarray, rule: BarRule) -> np.ndarray:
+    """
+    Номер группы для каждой свечи (массив CANDLE_DTYPE, отсортирован по ts).
+    """
+    n = len(arr)
+    if rule.kind == "time":
+        return (arr["ts"] + rule._shift()) // int(rule.size)
+
+    if rule.kind == "tick":
+        return np.arange(n, dtype=np.int64) // int(rule.size)
+
+    if rule.kind == "volume":
+        weight = arr["volume"]
+    else:  # dollar
+        weight = arr["close"] * arr["volume"]
+
+    before = np.empty(n, dtype=np.float64)
+    if n:
+        before[0] = 0.0
+        np.cumsum(weight[:-1], out=before[1:])
+    return np.floor(before / rule.size).astype(np.int64)
+
+
+def resample(
+    candles: Union[np.ndarray, Sequence[Candle]],
+    rule: BarRule,
+) -> Union[np.ndarray, List[Candle]]:
+    """
+    Векторный ресемплинг. Тип результата совпадает с типом входа
+    (np.ndarray CANDLE_DTYPE или list[Candle]).
+    """
+    as_list = not isinstance(candles, np.ndarray)
+    arr = candles_to_array(candles) if as_list else candles
+
+    if len(arr) == 0:
+        out = np.empty(0, dtype=CANDLE_DTYPE)
+        return [] if as_list else out
+
+    groups = group_ids(arr, rule)
+    is_start = np.r_[True, groups[1:] != groups[:-1]]
+    starts = np.flatnonzero(is_start)
+    ends = np.r_[starts[1:], len(arr)] - 1
+
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    if rule.kind == "time":
+        out["ts"] = groups[starts] * int(rule.size) - rule._shift()
+    else:
+        out["ts"] = arr["ts"][starts]
+    out["open"] = arr["open"][starts]
+    out["high"] = np.maximum.reduceat(arr["high"], starts)
+    out["low"] = np.minimum.reduceat(arr["low"], starts)
+    out["close"] = arr["close"][ends]
+    # bincount складывает последовательно (как потоковый путь), reduceat — попарно
+    out["volume"] = np.bincount(np.cumsum(is_start) - 1, weights=arr["volume"], minlength=len(starts))
+
+    return array_to_candles(out) if as_list else out
+
+
+class StreamingResampler:
+    """
+    Потоковая версия resample() для live: push() по одной свече.
+
+    - volume/tick/dollar: бар отдаётся сразу, как только порог пройден
+    - time: бар отдаётся при приходе первой свечи следующего интервала
+    - flush(): отдать незакрытый бар (конец сессии / остановка)
+    """
+
+    def __init__(self, rule: BarRule):
+        self.rule = rule
+        self._count = 0
+        self._cum = 0.0
+        self._reset_bar()
+        self._group: Optional[int] = None
+
+    def _reset_bar(self) -> None:
+        self._ts: Optional[int] = None
+        self._open = 0.0
+        self._high = 0.0
+        self._low = 0.0
+        self._close = 0.0
+        self._volume = 0.0
+        self._has_bar = False
+
+    def _emit(self) -> Candle:
+        candle = Candle(
+            ts=self._ts,
+            open=self._open,
+            high=self._high,
+            low=self._low,
+            close=self._close,
+            volume=self._volume,
+        )
+        self._reset_bar()
+        return candle
+
+    def _add(self, c: Candle, group: int) -> None:
+        if not self._has_bar:
+            self._has_bar = True
+            if self.rule.kind == "time":
+                self._ts = self.rule.bucket_start(group)
+            else:
+                self._ts = c.ts
+            self._open = c.open
+            self._high = c.high
+            self._low = c.low
+        else:
+            if c.high > self._high:
+                self._high = c.high
+            if c.low < self._low:
+                self._low = c.low
+        self._close = c.close
+        self._volume += c.volume
+
+    def _next_group(self) -> int:
+        kind = self.rule.kind
+        if kind == "tick":
+            return self._count // int(self.rule.size)
+        return int(np.floor(self._cum / self.rule.size))
+
+    def push(self, c: Candle) -> Optional[Candle]:
+        rule = self.rule
+
+        if rule.kind == "time":
+            group = (int(c.ts) + rule._shift()) // int(rule.size)
+            done = None
+            if self._has_bar and group != self._group:
+                done = self._emit()
+            self._group = group
+            self._add(c, group)
+            return done
+
+        if self._group is None:
+            self._group = self._next_group()
+        self._add(c, self._group)
+
+        self._count += 1
+        if rule.kind == "volume":
+            self._cum += c.volume
+        elif rule.kind == "dollar":
+            self._cum += c.close * c.volume
+
+        nxt = self._next_group()
+        if nxt != self._group:
+            self._group = nxt
+            return self._emit()
+        return None
+
+    def flush(self) -> Optional[Candle]:
+        if not self._has_bar:
+            return None
+        return self._emit()
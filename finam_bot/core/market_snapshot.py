@@ -1,71 +1,38 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
-from datetime import datetime   # ← ВОТ ЭТО
 print("🔥 LOADED MarketSnapshot FROM:", __file__)
 
-@dataclass
+
+@dataclass(slots=True)
 class MarketSnapshot:
-    symbol: str                 # ← ДОБАВИТЬ 
+    """
+    Срез рынка на баре / тике для стратегии.
+
+    __slots__: снапшот создаётся на каждый бар и тик, поэтому без __dict__.
+    В горячем цикле вместо нового объекта используем update() / from_candle(into=...).
+    """
+    symbol: str
     price: float
-# 🔽 ДОБАВИТЬ
     bid_volume: Optional[float] = None
     ask_volume: Optional[float] = None
+    prices: list = field(default_factory=list)
+    volumes: list = field(default_factory=list)
     delta: Optional[float] = None
-
-    atr: Optional[float] = None
-    timestamp: Optional[datetime] = None
     atr: Optional[float] = None
     atr_fast: Optional[float] = None
     timestamp: Optional[int] = None
 
-    @property
-    def total_volume(self) -> float:
-        if self.bid_volume is None or self.ask_volume is None:
-            return 0.0
-        return self.bid_volume + self.ask_volume
-    @property
-    def imbalance(self) -> float:
-        if self.bid_volume is None or self.ask_volume is None:
-            return 0.0
-
-        total = self.bid_volume + self.ask_volume
-        if total == 0:
-            return 0.0
+    def __post_init__(self):
+        if self.prices is None:
+            self.prices = []
+        if self.volumes is None:
+            self.volumes = []
 
-        return (self.bid_volume - self.ask_volume) / total
-    
-    @property
-    def has_orderflow(self) -> bool:
-        return (
-            self.bid_volume is not None
-            and self.ask_volume is not None
-            and self.total_volume > 0
-        )
-    
-    @property
-    def has_absorption_data(self) -> bool:
-        return bool(self.prices) and bool(self.volumes)
-    @property
-    def mid_price(self) -> float:
-        return self.price
-
-    @property
-    def total_volume(self) -> float:
-        if self.bid_volume is None or self.ask_volume is None:
-            return 0.0
-        return self.bid_volume + self.ask_volume
-
-    @property
-    def imbalance(self) -> float:
-        tv = self.total_volume
-        if tv == 0:
-            return 0.5
-        return self.bid_volume / tv
-    
-    def __init__(
+    def update(
         self,
-        symbol: str,
+        *,
         price: float,
+        symbol: Optional[str] = None,
         bid_volume: float | None = None,
         ask_volume: float | None = None,
         prices: list[float] | None = None,
@@ -74,8 +41,15 @@ class MarketSnapshot:
         atr: float | None = None,
         atr_fast: float | None = None,
         timestamp=None,
-    ):
-        self.symbol = symbol
+    ) -> "MarketSnapshot":
+        """
+        Переиспользование объекта: все поля как у нового MarketSnapshot(...),
+        symbol сохраняется, если не передан.
+
+        Стратегия не должна хранить ссылку на снапшот между вызовами.
+        """
+        if symbol is not None:
+            self.symbol = symbol
         self.price = price
 
         self.bid_volume = bid_volume
@@ -88,6 +62,36 @@ class MarketSnapshot:
         self.atr = atr
         self.atr_fast = atr_fast
         self.timestamp = timestamp
+        return self
+
+    @property
+    def total_volume(self) -> float:
+        if self.bid_volume is None or self.ask_volume is None:
+            return 0.0
+        return self.bid_volume + self.ask_volume
+
+    @property
+    def imbalance(self) -> float:
+        tv = self.total_volume
+        if tv == 0:
+            return 0.5
+        return self.bid_volume / tv
+
+    @property
+    def has_orderflow(self) -> bool:
+        return (
+            self.bid_volume is not None
+            and self.ask_volume is not None
+            and self.total_volume > 0
+        )
+
+    @property
+    def has_absorption_data(self) -> bool:
+        return bool(self.prices) and bool(self.volumes)
+
+    @property
+    def mid_price(self) -> float:
+        return self.price
 
     @classmethod
     def from_candle(
@@ -97,11 +101,13 @@ class MarketSnapshot:
         candle,
         atr: float | None = None,
         timestamp: int | None = None,
+        into: "MarketSnapshot | None" = None,
     ) -> "MarketSnapshot":
         """
         Универсальный адаптер:
         - candle может быть float (TEST)
         - candle может быть объектом с .close (REAL)
+        - into: существующий снапшот для переиспользования (без аллокации)
         """
 
         # TEST MODE: candle = float
@@ -114,6 +120,9 @@ class MarketSnapshot:
             price = candle.close
             ts = getattr(candle, "timestamp", timestamp)
 
+        if into is not None:
+            return into.update(symbol=symbol, price=price, atr=atr, timestamp=ts)
+
         return cls(
             symbol=symbol,
             price=price,
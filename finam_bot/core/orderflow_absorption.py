@@ -1,3 +1,7 @@
+import math
+from collections import deque
+from typing import Optional
+
 from finam_bot.core.orderflow_signal import AbsorptionSignal
 from finam_bot.core.market_snapshot import MarketSnapshot
 
@@ -67,3 +71,149 @@ class OrderFlowAbsorptionDetector:
             imbalance=getattr(base, "imbalance", 0.0),
             reason=base.reason,
         )
+
+
+class StreamingAbsorptionDetector:
+    """
+    Потоковый вариант OrderFlowAbsorptionDetector: окно ленты ведётся
+    инкрементально, каждая сделка — O(1) амортизированно.
+
+    - объём / сумма цен / bid-ask — бегущие суммы
+    - min / max цены окна — монотонные деки
+    - окно ограничено по времени (window_seconds) и/или по числу сделок (max_prints)
+    - каждые max(resum_every, len(окна)) вытеснений бегущие суммы
+      пересчитываются из окна через math.fsum: на живой ленте окно не
+      пустеет, и ошибка округления иначе копится всю сессию
+
+    Условие то же, что в analyze(): объём окна >= min_volume и
+    max|p - mean| <= price_tolerance. Сигнал отдаётся на переходе
+    окна в состояние absorption (повторно — только после выхода из него).
+    Сторона — как в analyze_snapshot(): доля bid >= 0.6 -> BUY, <= 0.4 -> SELL.
+    """
+
+    def __init__(
+        self,
+        min_volume: float,
+        price_tolerance: float,
+        *,
+        window_seconds: Optional[float] = None,
+        max_prints: Optional[int] = None,
+        eps: float = 1e-9,
+        resum_every: int = 1024,
+    ):
+        if window_seconds is None and max_prints is None:
+            raise ValueError("window_seconds or max_prints must be set")
+
+        self.min_volume = min_volume
+        self.price_tolerance = price_tolerance
+        self.window_seconds = window_seconds
+        self.max_prints = max_prints
+        self.eps = eps
+        self.resum_every = int(resum_every)
+        self.reset()
+
+    def reset(self) -> None:
+        self._window: deque = deque()      # (seq, ts, price, qty, bid_qty, ask_qty)
+        self._min: deque = deque()         # (seq, price), цены возрастают
+        self._max: deque = deque()         # (seq, price), цены убывают
+        self._seq = 0
+        self._volume = 0.0
+        self._price_sum = 0.0
+        self._bid = 0.0
+        self._ask = 0.0
+        self._active = False
+        self._evicted = 0
+
+    def _expire(self, ts) -> None:
+        w = self._window
+        while w and (
+            (self.max_prints is not None and len(w) > self.max_prints)
+            or (self.window_seconds is not None and ts - w[0][1] > self.window_seconds)
+        ):
+            seq, _, price, qty, bid, ask = w.popleft()
+            self._volume -= qty
+            self._price_sum -= price
+            self._bid -= bid
+            self._ask -= ask
+            if self._min[0][0] == seq:
+                self._min.popleft()
+            if self._max[0][0] == seq:
+                self._max.popleft()
+            self._evicted += 1
+
+        if not w:
+            # сбрасываем накопленную ошибку округления бегущих сумм
+            self._volume = self._price_sum = self._bid = self._ask = 0.0
+            self._evicted = 0
+        elif self._evicted >= max(self.resum_every, len(w)):
+            # O(окна) раз в >= len(окна) вытеснений — амортизированно O(1)
+            self._resum()
+
+    def _resum(self) -> None:
+        w = self._window
+        self._price_sum = math.fsum(x[2] for x in w)
+        self._volume = math.fsum(x[3] for x in w)
+        self._bid = math.fsum(x[4] for x in w)
+        self._ask = math.fsum(x[5] for x in w)
+        self._evicted = 0
+
+    def push(
+        self,
+        ts: float,
+        price: float,
+        qty: float,
+        side: Optional[str] = None,
+    ) -> Optional[AbsorptionSignal]:
+        """
+        side — агрессор сделки: BUY -> ask volume, SELL -> bid volume,
+        None -> объём учитывается, но на сторону не влияет.
+        """
+        seq = self._seq
+        self._seq += 1
+
+        bid = qty if side == "SELL" else 0.0
+        ask = qty if side == "BUY" else 0.0
+        self._window.append((seq, ts, price, qty, bid, ask))
+        self._volume += qty
+        self._price_sum += price
+        self._bid += bid
+        self._ask += ask
+
+        while self._min and self._min[-1][1] >= price:
+            self._min.pop()
+        self._min.append((seq, price))
+        while self._max and self._max[-1][1] <= price:
+            self._max.pop()
+        self._max.append((seq, price))
+
+        self._expire(ts)
+
+        qualifies = self._qualifies()
+        fired = qualifies and not self._active
+        self._active = qualifies
+        if not fired:
+            return None
+
+        total = self._bid + self._ask
+        side_out = None
+        if total > 0:
+            ratio = self._bid / total
+            if ratio >= 0.6:
+                side_out = "BUY"
+            elif ratio <= 0.4:
+                side_out = "SELL"
+
+        return AbsorptionSignal(
+            side=side_out,
+            strength=self._volume,
+            imbalance=0.0,
+            reason="absorption",
+            absorbed_volume=self._volume,
+        )
+
+    def _qualifies(self) -> bool:
+        if not self._window or self._volume < self.min_volume:
+            return False
+        mean = self._price_sum / len(self._window)
+        deviation = max(self._max[0][1] - mean, mean - self._min[0][1])
+        return deviation <= self.price_tolerance + self.eps
@@ -1,9 +1,21 @@
 # finam_bot/core/orderflow_accumulator.py
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
 from finam_bot.core.orderflow_snapshot import OrderFlowSnapshot
 
+# Компактное кодирование стороны агрессора для batch-пути (int8)
+SIDE_UNKNOWN = 0
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+# tradeapi.v1.Side: SIDE_BUY = 1, SIDE_SELL = 2
+_PROTO_SIDE_BUY = 1
+_PROTO_SIDE_SELL = 2
+
 def flush_snapshot(self) -> OrderFlowSnapshot:
     snapshot = OrderFlowSnapshot(
         bid_volume=self.bid_volume,
@@ -22,6 +34,84 @@ class OrderFlowSnapshot:
     vwap: Optional[float]
 
 
+def encode_sides(sides) -> np.ndarray:
+    """
+    "BUY"/"SELL" (или уже закодированные -1/0/1) -> np.int8.
+    Неизвестные значения -> SIDE_UNKNOWN (такие сделки пропускаются).
+    """
+    arr = np.asarray(sides)
+    if arr.dtype.kind in "iu":
+        ok = (arr >= SIDE_SELL) & (arr <= SIDE_BUY)
+        return np.where(ok, arr, SIDE_UNKNOWN).astype(np.int8)
+
+    out = np.zeros(arr.shape, dtype=np.int8)
+    out[arr == "BUY"] = SIDE_BUY
+    out[arr == "SELL"] = SIDE_SELL
+    return out
+
+
+def trades_to_arrays(trades: Iterable) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Repeated Trade из LatestTradesResponse / SubscribeLatestTradesResponse
+    -> (prices float64, qtys float64, sides int8).
+    """
+    trades = list(trades)
+    n = len(trades)
+    prices = np.fromiter((float(t.price.value or 0) for t in trades), dtype=np.float64, count=n)
+    qtys = np.fromiter((float(t.size.value or 0) for t in trades), dtype=np.float64, count=n)
+    raw = np.fromiter((t.side for t in trades), dtype=np.int8, count=n)
+
+    sides = np.zeros(n, dtype=np.int8)
+    sides[raw == _PROTO_SIDE_BUY] = SIDE_BUY
+    sides[raw == _PROTO_SIDE_SELL] = SIDE_SELL
+    return prices, qtys, sides
+
+
+def replay_bars(
+    bar_ids: np.ndarray,
+    prices: np.ndarray,
+    qtys: np.ndarray,
+    sides: np.ndarray,
+    n_bars: Optional[int] = None,
+) -> List[OrderFlowSnapshot]:
+    """
+    Векторная раскладка ленты сделок по барам.
+
+    bar_ids — номер бара (0..n_bars-1) для каждой сделки.
+    Результат совпадает с update() по каждой сделке + flush() на границе бара.
+    """
+    bar_ids = np.asarray(bar_ids, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    qtys = np.asarray(qtys, dtype=np.float64)
+    sides = encode_sides(sides)
+
+    if n_bars is None:
+        n_bars = int(bar_ids.max()) + 1 if len(bar_ids) else 0
+
+    ok = (qtys > 0) & (sides != SIDE_UNKNOWN)
+    ids = bar_ids[ok]
+    q = qtys[ok]
+    s = sides[ok]
+
+    ask = np.bincount(ids, weights=np.where(s == SIDE_BUY, q, 0.0), minlength=n_bars)
+    bid = np.bincount(ids, weights=np.where(s == SIDE_SELL, q, 0.0), minlength=n_bars)
+    total = np.bincount(ids, weights=q, minlength=n_bars)
+    pq = np.bincount(ids, weights=prices[ok] * q, minlength=n_bars)
+    trades = np.bincount(ids, minlength=n_bars)
+
+    return [
+        OrderFlowSnapshot(
+            bid_volume=float(bid[i]),
+            ask_volume=float(ask[i]),
+            total_volume=float(total[i]),
+            delta=float(bid[i] - ask[i]),
+            trades=int(trades[i]),
+            vwap=float(pq[i] / total[i]) if total[i] > 0 else None,
+        )
+        for i in range(n_bars)
+    ]
+
+
 class OrderFlowAccumulator:
     """
     S8.A — Accumulates order flow (trade prints) inside a bar.
@@ -66,6 +156,35 @@ class OrderFlowAccumulator:
         self._vwap_price_qty += price * qty
         self._trades += 1
 
+    def update_batch(self, prices, qtys, sides) -> None:
+        """
+        Пачка сделок за один вызов (numpy-суммы вместо цикла по update()).
+
+        sides: int8 (SIDE_BUY / SIDE_SELL / SIDE_UNKNOWN) или "BUY"/"SELL".
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        qtys = np.asarray(qtys, dtype=np.float64)
+        sides = encode_sides(sides)
+
+        buy = (qtys > 0) & (sides == SIDE_BUY)
+        sell = (qtys > 0) & (sides == SIDE_SELL)
+        ok = buy | sell
+
+        ask = float(qtys[buy].sum())
+        bid = float(qtys[sell].sum())
+
+        self._ask_volume += ask
+        self._bid_volume += bid
+        self._total_volume += ask + bid
+        self._vwap_price_qty += float(np.dot(prices[ok], qtys[ok]))
+        self._trades += int(np.count_nonzero(ok))
+
+    def update_trades(self, trades: Iterable) -> None:
+        """
+        Repeated Trade из gRPC (LatestTrades / SubscribeLatestTrades).
+        """
+        self.update_batch(*trades_to_arrays(trades))
+
     def flush(self) -> OrderFlowSnapshot:
         """
         Finalize current bar and reset accumulator.
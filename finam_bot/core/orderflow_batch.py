@@ -0,0 +1,226 @@
+# finam_bot/core/orderflow_batch.py
+"""
+Векторные аналоги OrderFlowAnalyzer / OrderFlowAbsorptionDetector /
+build_composite_signal для бэктеста: одна колонка на признак, один проход.
+
+Результат побитово совпадает со скалярным путём
+OrderFlowPullbackStrategy.on_snapshot(MarketSnapshot):
+  - imbalance как у MarketSnapshot: bid / (bid + ask), 0.5 при пустом объёме
+    (kind="orderflow" — как у OrderFlowSnapshot: (bid - ask) / total)
+  - bid/ask = NaN соответствует None в MarketSnapshot
+  - absorption без стороны получает её из imbalance (как в стратегии)
+
+Сторона кодируется int8: SIDE_BUY = 1, SIDE_SELL = -1, 0 — нет сигнала.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Literal, Optional, Tuple
+
+import numpy as np
+
+from finam_bot.core.orderflow_accumulator import SIDE_BUY, SIDE_SELL, SIDE_UNKNOWN
+from finam_bot.core.orderflow_composite import DIVERGENCE_BOOST
+
+ImbalanceKind = Literal["market", "orderflow"]
+
+
+@dataclass
+class TapeStats:
+    """
+    Агрегаты ленты (prices / volumes) по барам — всё, что нужно absorption.
+    count == 0 -> у бара нет ленты (как пустые prices/volumes).
+    """
+    volume: np.ndarray       # sum(volumes)
+    price_sum: np.ndarray    # sum(prices)
+    price_max: np.ndarray
+    price_min: np.ndarray
+    count: np.ndarray        # len(prices)
+
+    @classmethod
+    def from_ticks(cls, bar_ids, prices, volumes, n_bars: Optional[int] = None) -> "TapeStats":
+        """
+        Лента сделок, разложенная по барам (bar_ids отсортированы по времени).
+        """
+        bar_ids = np.asarray(bar_ids, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        if n_bars is None:
+            n_bars = int(bar_ids.max()) + 1 if len(bar_ids) else 0
+
+        price_max = np.full(n_bars, -np.inf)
+        price_min = np.full(n_bars, np.inf)
+        np.maximum.at(price_max, bar_ids, prices)
+        np.minimum.at(price_min, bar_ids, prices)
+
+        return cls(
+            volume=np.bincount(bar_ids, weights=volumes, minlength=n_bars),
+            price_sum=np.bincount(bar_ids, weights=prices, minlength=n_bars),
+            price_max=price_max,
+            price_min=price_min,
+            count=np.bincount(bar_ids, minlength=n_bars),
+        )
+
+    @classmethod
+    def from_lists(cls, prices_per_bar, volumes_per_bar) -> "TapeStats":
+        """
+        Окна ленты в форме MarketSnapshot.prices / .volumes (None или [] — нет ленты).
+        """
+        n = len(prices_per_bar)
+        out = cls(
+            volume=np.zeros(n),
+            price_sum=np.zeros(n),
+            price_max=np.full(n, -np.inf),
+            price_min=np.full(n, np.inf),
+            count=np.zeros(n, dtype=np.int64),
+        )
+        for i, (ps, vs) in enumerate(zip(prices_per_bar, volumes_per_bar)):
+            if not ps or not vs:
+                continue
+            out.volume[i] = sum(vs)
+            out.price_sum[i] = sum(ps)
+            out.price_max[i] = max(ps)
+            out.price_min[i] = min(ps)
+            out.count[i] = len(ps)
+        return out
+
+
+def _volumes(bid, ask) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    bid = np.asarray(bid, dtype=np.float64)
+    ask = np.asarray(ask, dtype=np.float64)
+    has = ~(np.isnan(bid) | np.isnan(ask))
+    total = np.where(has, bid + ask, 0.0)
+    return bid, total, has
+
+
+def imbalance_batch(bid, ask, kind: ImbalanceKind = "market") -> np.ndarray:
+    bid_arr, total, _ = _volumes(bid, ask)
+    nz = total != 0
+    safe = np.where(nz, total, 1.0)
+    if kind == "market":
+        return np.where(nz, bid_arr / safe, 0.5)
+    if kind == "orderflow":
+        ask_arr = np.asarray(ask, dtype=np.float64)
+        return np.where(nz, (bid_arr - ask_arr) / safe, 0.0)
+    raise ValueError(f"Unknown imbalance kind: {kind}")
+
+
+def analyze_imbalance_batch(
+    bid,
+    ask,
+    *,
+    imbalance_threshold: float = 0.6,
+    min_volume: float = 50.0,
+    kind: ImbalanceKind = "market",
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    OrderFlowAnalyzer.analyze по колонкам.
+    Возвращает (side int8, strength, imbalance); strength = 0 там, где сигнала нет.
+    """
+    _, total, _ = _volumes(bid, ask)
+    imb = imbalance_batch(bid, ask, kind)
+
+    enough = ~(total < min_volume)
+    buy = enough & (imb >= imbalance_threshold)
+    sell = enough & ~buy & (imb <= -imbalance_threshold)
+
+    side = np.zeros(len(imb), dtype=np.int8)
+    side[buy] = SIDE_BUY
+    side[sell] = SIDE_SELL
+    strength = np.where(buy | sell, np.minimum(1.0, np.abs(imb)), 0.0)
+    return side, strength, imb
+
+
+def analyze_absorption_batch(
+    tape: TapeStats,
+    *,
+    min_volume: float,
+    price_tolerance: float,
+    eps: float = 1e-9,
+) -> np.ndarray:
+    """
+    OrderFlowAbsorptionDetector.analyze по барам -> bool (есть absorption).
+    """
+    count = np.asarray(tape.count)
+    has = count > 0
+    mean = tape.price_sum / np.where(has, count, 1)
+    deviation = np.maximum(tape.price_max - mean, mean - tape.price_min)
+    return has & ~(tape.volume < min_volume) & ~(deviation > price_tolerance + eps)
+
+
+def composite_batch(
+    imb_side: np.ndarray,
+    imb_strength: np.ndarray,
+    absorption_side: Optional[np.ndarray] = None,
+    divergence: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    build_composite_signal по колонкам.
+
+    absorption_side / divergence: int8, 0 — нет сигнала (или absorption без стороны).
+    Возвращает (side int8, confidence); confidence = 0 там, где composite = None.
+    """
+    side = np.asarray(imb_side, dtype=np.int8).copy()
+    has = side != SIDE_UNKNOWN
+    confidence = np.asarray(imb_strength, dtype=np.float64).copy()
+
+    if absorption_side is not None:
+        absorption_side = np.asarray(absorption_side, dtype=np.int8)
+        has &= ~((absorption_side != SIDE_UNKNOWN) & (absorption_side != side))
+        confidence = np.where(has & (absorption_side == side), 1.0, confidence)
+
+    if divergence is not None:
+        divergence = np.asarray(divergence, dtype=np.int8)
+        div = divergence != SIDE_UNKNOWN
+        has &= ~(div & (divergence != side))
+        confidence = np.where(has & div, confidence + DIVERGENCE_BOOST, confidence)
+
+    confidence = np.where(has, np.minimum(confidence, 1.0), 0.0)
+    side[~has] = SIDE_UNKNOWN
+    return side, confidence
+
+
+def evaluate_orderflow_batch(
+    bid,
+    ask,
+    tape: Optional[TapeStats] = None,
+    divergence=None,
+    *,
+    min_confidence: float = 0.6,
+    imbalance_threshold: float = 0.6,
+    imbalance_min_volume: float = 50.0,
+    absorption_min_volume: float = 100.0,
+    absorption_price_tolerance: float = 0.01,
+    infer_absorption_side_from_imbalance: bool = True,
+    infer_opposite_tol_threshold: float = 0.001,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Полный путь OrderFlowPullbackStrategy.on_snapshot для всех баров сразу.
+
+    Возвращает (signal int8 после порога min_confidence, strength imbalance,
+    confidence composite — то же, что strategy.last_confidence).
+    """
+    imb_side, strength, _ = analyze_imbalance_batch(
+        bid,
+        ask,
+        imbalance_threshold=imbalance_threshold,
+        min_volume=imbalance_min_volume,
+    )
+
+    absorption_side = None
+    if tape is not None:
+        absorbed = analyze_absorption_batch(
+            tape,
+            min_volume=absorption_min_volume,
+            price_tolerance=absorption_price_tolerance,
+        )
+        absorption_side = np.zeros(len(imb_side), dtype=np.int8)
+        if infer_absorption_side_from_imbalance:
+            if absorption_price_tolerance < infer_opposite_tol_threshold:
+                absorption_side[absorbed] = -imb_side[absorbed]
+            else:
+                absorption_side[absorbed] = imb_side[absorbed]
+
+    side, confidence = composite_batch(imb_side, strength, absorption_side, divergence)
+    signal = np.where(confidence >= min_confidence, side, SIDE_UNKNOWN).astype(np.int8)
+    return signal, strength, confidence
@@ -5,8 +5,11 @@ from typing import Optional, List
 
 from finam_bot.core.orderflow_signal import OrderFlowSignal, AbsorptionSignal
 
+# прибавка к confidence от CVD-дивергенции в сторону imbalance
+DIVERGENCE_BOOST = 0.2
 
-@dataclass
+
+@dataclass(slots=True)
 class CompositeOrderFlowSignal:
     side: str                 # "BUY" | "SELL"
     confidence: float         # 0.0 .. 1.0
@@ -16,6 +19,7 @@ class CompositeOrderFlowSignal:
 def build_composite_signal(
     imbalance: Optional[OrderFlowSignal],
     absorption: Optional[AbsorptionSignal],
+    divergence: Optional[OrderFlowSignal] = None,
 ) -> Optional[CompositeOrderFlowSignal]:
     # 1) нет imbalance -> нет сигнала
     if imbalance is None:
@@ -26,6 +30,10 @@ def build_composite_signal(
         if absorption.side != imbalance.side:
             return None
 
+    # 2b) CVD-дивергенция против направления -> блок
+    if divergence is not None and divergence.side != imbalance.side:
+        return None
+
     reasons = [imbalance.reason]
     confidence = float(imbalance.strength)
 
@@ -34,6 +42,11 @@ def build_composite_signal(
         reasons.append("absorption")
         confidence = 1.0
 
+    # 4) CVD-дивергенция в ту же сторону -> усиление
+    if divergence is not None:
+        reasons.append("cvd_divergence")
+        confidence += DIVERGENCE_BOOST
+
     confidence = min(confidence, 1.0)
 
     return CompositeOrderFlowSignal(
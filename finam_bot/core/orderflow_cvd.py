@@ -0,0 +1,227 @@
+# finam_bot/core/orderflow_cvd.py
+"""
+Cumulative volume delta (CVD) + дивергенции цены и CVD.
+
+CVD — накопленная OrderFlowSnapshot.delta (bid - ask) с обнулением
+на начале торговой сессии. Знак тот же, что у dominant_side / imbalance:
+рост CVD = давление покупателя (BUY).
+
+Пивоты цены ищутся окном 2k+1 бар: бар i — pivot high, если его high —
+самый левый максимум окна [i-k, i+k] (pivot low — аналогично по low).
+Пивот подтверждается через k баров. Дивергенция сравнивает новый пивот
+с предыдущим пивотом того же типа в той же сессии:
+  - high выше, CVD ниже  -> SELL
+  - low ниже,  CVD выше  -> BUY
+Если на одном баре подтвердились обе — сигнала нет.
+
+CvdTracker — потоковый путь (монотонные деки, O(1) амортизированно на бар),
+cvd_divergence_batch() — векторный путь для бэктеста; результаты совпадают.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+from finam_bot.backtest.resample import MOEX_SESSION_OPEN, MOEX_UTC_OFFSET
+from finam_bot.core.orderflow_signal import DivergenceSignal
+
+# в batch-форме: +1 BUY (бычья), -1 SELL (медвежья), 0 — нет
+DIV_BUY = 1
+DIV_SELL = -1
+DIV_NONE = 0
+
+
+def session_ids(
+    ts,
+    *,
+    utc_offset: int = MOEX_UTC_OFFSET,
+    session_start: int = MOEX_SESSION_OPEN,
+):
+    """
+    Номер торговой сессии (сутки, начинающиеся в session_start по местному времени).
+    Работает и со скаляром, и с numpy-массивом.
+    """
+    return (ts + utc_offset - session_start) // 86400
+
+
+class CvdTracker:
+    """
+    Потоковый CVD + детектор дивергенций.
+
+    push() / update() на закрытии каждого бара; возвращает DivergenceSignal,
+    если на этом баре подтвердился пивот с дивергенцией.
+    """
+
+    def __init__(
+        self,
+        pivot_bars: int = 3,
+        *,
+        utc_offset: int = MOEX_UTC_OFFSET,
+        session_start: int = MOEX_SESSION_OPEN,
+    ):
+        if pivot_bars < 1:
+            raise ValueError("pivot_bars must be >= 1")
+
+        self.k = int(pivot_bars)
+        self.utc_offset = utc_offset
+        self.session_start = session_start
+
+        self.session: Optional[int] = None
+        self._reset_session()
+
+    def _reset_session(self) -> None:
+        self.cvd = 0.0
+        self._n = 0                                     # баров в сессии
+        self._bars: deque = deque(maxlen=self.k + 1)    # (ts, high, low, cvd) последних k+1
+        self._max: deque = deque()                      # (idx, high), самый левый максимум в голове
+        self._min: deque = deque()                      # (idx, low)
+        self._last_high: Optional[Tuple[float, float]] = None   # (price, cvd)
+        self._last_low: Optional[Tuple[float, float]] = None
+
+    def update(self, candle, flow) -> Optional[DivergenceSignal]:
+        """
+        candle — backtest.models.Candle, flow — любой snapshot с .delta.
+        """
+        return self.push(candle.ts, candle.high, candle.low, flow.delta)
+
+    def push(self, ts: int, high: float, low: float, delta: float) -> Optional[DivergenceSignal]:
+        session = session_ids(int(ts), utc_offset=self.utc_offset, session_start=self.session_start)
+        if session != self.session:
+            self.session = session
+            self._reset_session()
+
+        i = self._n
+        self._n += 1
+        self.cvd += delta
+        self._bars.append((ts, high, low, self.cvd))
+
+        while self._max and self._max[-1][1] < high:
+            self._max.pop()
+        self._max.append((i, high))
+        while self._min and self._min[-1][1] > low:
+            self._min.pop()
+        self._min.append((i, low))
+
+        w = 2 * self.k
+        while self._max[0][0] < i - w:
+            self._max.popleft()
+        while self._min[0][0] < i - w:
+            self._min.popleft()
+
+        if i < w:
+            return None
+
+        center = i - self.k
+        c_ts, c_high, c_low, c_cvd = self._bars[0]
+        sell = buy = False
+        div = None
+
+        if self._max[0][0] == center:
+            prev = self._last_high
+            if prev is not None and c_high > prev[0] and c_cvd < prev[1]:
+                sell = True
+                div = ("SELL", c_high, prev)
+            self._last_high = (c_high, c_cvd)
+
+        if self._min[0][0] == center:
+            prev = self._last_low
+            if prev is not None and c_low < prev[0] and c_cvd > prev[1]:
+                buy = True
+                div = ("BUY", c_low, prev)
+            self._last_low = (c_low, c_cvd)
+
+        if div is None or (buy and sell):
+            return None
+
+        side, price, (prev_price, prev_cvd) = div
+        return DivergenceSignal(
+            side=side,
+            strength=1.0,
+            imbalance=0.0,
+            reason="cvd_divergence",
+            pivot_ts=c_ts,
+            price=price,
+            prev_price=prev_price,
+            cvd=c_cvd,
+            prev_cvd=prev_cvd,
+        )
+
+
+def _session_cvd(sessions: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    # cumsum по каждой сессии отдельно: тот же порядок сложения, что и в потоке
+    cvd = np.empty(len(delta), dtype=np.float64)
+    bounds = np.r_[0, np.flatnonzero(sessions[1:] != sessions[:-1]) + 1, len(delta)]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        np.cumsum(delta[a:b], out=cvd[a:b])
+    return cvd
+
+
+def _pivots(values: np.ndarray, sessions: np.ndarray, k: int, *, high: bool) -> np.ndarray:
+    """
+    Индексы центров пивотов (окно 2k+1 целиком внутри одной сессии,
+    центр — самый левый экстремум окна).
+    """
+    w = 2 * k + 1
+    n = len(values)
+    if n < w:
+        return np.empty(0, dtype=np.int64)
+
+    win = np.lib.stride_tricks.sliding_window_view(values, w)
+    pos = np.argmax(win, axis=1) if high else np.argmin(win, axis=1)
+    same = sessions[w - 1:] == sessions[: n - w + 1]
+    return np.flatnonzero((pos == k) & same) + k
+
+
+def _diverge(piv: np.ndarray, price: np.ndarray, cvd: np.ndarray, sessions: np.ndarray, *, high: bool) -> np.ndarray:
+    if len(piv) < 2:
+        return np.empty(0, dtype=np.int64)
+    prev, cur = piv[:-1], piv[1:]
+    same = sessions[prev] == sessions[cur]
+    if high:
+        hit = (price[cur] > price[prev]) & (cvd[cur] < cvd[prev])
+    else:
+        hit = (price[cur] < price[prev]) & (cvd[cur] > cvd[prev])
+    return cur[same & hit]
+
+
+def cvd_divergence_batch(
+    ts,
+    high,
+    low,
+    delta,
+    pivot_bars: int = 3,
+    *,
+    utc_offset: int = MOEX_UTC_OFFSET,
+    session_start: int = MOEX_SESSION_OPEN,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Векторная форма CvdTracker для бэктеста.
+
+    Возвращает (cvd float64, divergence int8) по барам; divergence стоит
+    на баре подтверждения пивота (центр + k), как в потоковом пути.
+    """
+    if pivot_bars < 1:
+        raise ValueError("pivot_bars must be >= 1")
+
+    ts = np.asarray(ts, dtype=np.int64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    delta = np.asarray(delta, dtype=np.float64)
+    k = int(pivot_bars)
+
+    n = len(ts)
+    out = np.zeros(n, dtype=np.int8)
+    if n == 0:
+        return np.zeros(0, dtype=np.float64), out
+
+    sessions = session_ids(ts, utc_offset=utc_offset, session_start=session_start)
+    cvd = _session_cvd(sessions, delta)
+
+    sell = _diverge(_pivots(high, sessions, k, high=True), high, cvd, sessions, high=True)
+    buy = _diverge(_pivots(low, sessions, k, high=False), low, cvd, sessions, high=False)
+
+    out[sell + k] += DIV_SELL
+    out[buy + k] += DIV_BUY   # обе на одном баре -> 0
+    return cvd, out
@@ -0,0 +1,226 @@
+# finam_bot/core/orderflow_footprint.py
+"""
+Footprint (volume-at-price) внутри бара.
+
+Объём раскладывается по ценовым тикам в два столбца:
+  - ask: агрессивные покупки (BUY)
+  - bid: агрессивные продажи (SELL)
+как в OrderFlowAccumulator. Дельта уровня: bid - ask (та же конвенция).
+
+Уровни хранятся в плотных numpy-массивах, индекс = смещение в тиках
+от цены открытия бара (+ запас в обе стороны, массив растёт по требованию).
+Все запросы (POC, value area, дельты, stacked imbalance) — O(levels).
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+StackedImbalance = Tuple[str, float, float]   # (side, price_low, price_high)
+
+
+@dataclass(frozen=True)
+class FootprintBar:
+    """
+    Срез footprint'а: цены уровней по возрастанию + объёмы bid/ask на уровне.
+    """
+    tick_size: float
+    prices: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.bid + self.ask
+
+    @property
+    def deltas(self) -> np.ndarray:
+        return self.bid - self.ask
+
+    @property
+    def total_volume(self) -> float:
+        return float(self.bid.sum() + self.ask.sum())
+
+    def _index(self, price: float) -> Optional[int]:
+        if not len(self.prices):
+            return None
+        i = int(round((price - self.prices[0]) / self.tick_size))
+        if 0 <= i < len(self.prices):
+            return i
+        return None
+
+    def delta_at(self, price: float) -> float:
+        i = self._index(price)
+        if i is None:
+            return 0.0
+        return float(self.bid[i] - self.ask[i])
+
+    def poc(self) -> Optional[float]:
+        """
+        Point of control — уровень с максимальным объёмом
+        (при равенстве — нижний).
+        """
+        if not len(self.prices):
+            return None
+        return float(self.prices[int(np.argmax(self.volume))])
+
+    def value_area(self, pct: float = 0.7) -> Optional[Tuple[float, float]]:
+        """
+        (VAL, VAH): расширяемся от POC в сторону большего соседнего уровня,
+        пока не наберём pct объёма бара.
+        """
+        if not 0 < pct <= 1:
+            raise ValueError("pct must be in (0, 1]")
+        if not len(self.prices):
+            return None
+
+        vol = self.volume
+        target = vol.sum() * pct
+        lo = hi = int(np.argmax(vol))
+        acc = vol[lo]
+        n = len(vol)
+
+        while acc < target and (lo > 0 or hi < n - 1):
+            down = vol[lo - 1] if lo > 0 else -1.0
+            up = vol[hi + 1] if hi < n - 1 else -1.0
+            if up >= down:
+                hi += 1
+                acc += up
+            else:
+                lo -= 1
+                acc += down
+
+        return float(self.prices[lo]), float(self.prices[hi])
+
+    def stacked_imbalances(
+        self,
+        ratio: float = 3.0,
+        min_stack: int = 3,
+        min_volume: float = 0.0,
+    ) -> List[StackedImbalance]:
+        """
+        Диагональные дисбалансы, идущие подряд >= min_stack уровней.
+
+        BUY на уровне i:  ask[i] >= ratio * bid[i-1]
+        SELL на уровне i: bid[i] >= ratio * ask[i+1]
+        """
+        n = len(self.prices)
+        if n < 2:
+            return []
+
+        buy = np.zeros(n, dtype=bool)
+        sell = np.zeros(n, dtype=bool)
+        buy[1:] = (self.ask[1:] > min_volume) & (self.ask[1:] >= ratio * self.bid[:-1])
+        sell[:-1] = (self.bid[:-1] > min_volume) & (self.bid[:-1] >= ratio * self.ask[1:])
+
+        out: List[StackedImbalance] = []
+        for side, mask in (("BUY", buy), ("SELL", sell)):
+            edges = np.diff(np.r_[0, mask.view(np.int8), 0])
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1)
+            for s, e in zip(starts, ends):
+                if e - s >= min_stack:
+                    out.append((side, float(self.prices[s]), float(self.prices[e - 1])))
+
+        out.sort(key=lambda x: x[1])
+        return out
+
+
+class FootprintAccumulator:
+    """
+    Копит footprint текущего бара по сделкам.
+
+    update() — O(1) (амортизированно, с учётом редкого роста массива),
+    view()   — срез без копирования для запросов посреди бара,
+    flush()  — FootprintBar с копией данных + сброс.
+    """
+
+    def __init__(self, tick_size: float, initial_levels: int = 64):
+        if tick_size <= 0:
+            raise ValueError("tick_size must be > 0")
+        if initial_levels < 2:
+            raise ValueError("initial_levels must be >= 2")
+
+        self.tick_size = float(tick_size)
+        self._bid = np.zeros(initial_levels, dtype=np.float64)
+        self._ask = np.zeros(initial_levels, dtype=np.float64)
+        self._lo, self._hi = 0, -1
+        self.reset()
+
+    def reset(self) -> None:
+        if self._lo <= self._hi:
+            self._bid[self._lo:self._hi + 1] = 0.0
+            self._ask[self._lo:self._hi + 1] = 0.0
+        self._base: Optional[int] = None        # тик цены открытия
+        self._center = len(self._bid) // 2      # индекс уровня открытия
+        self._lo = len(self._bid)               # занятый диапазон [lo, hi]
+        self._hi = -1
+
+    def _grow(self, idx: int) -> int:
+        """
+        Расширяет массивы так, чтобы idx поместился; возвращает новый idx.
+        """
+        size = len(self._bid)
+        need_left = max(0, -idx)
+        need_right = max(0, idx - size + 1)
+        pad = max(size // 2, need_left, need_right)
+        left = pad if need_left else 0
+        right = pad if need_right else 0
+
+        self._bid = np.pad(self._bid, (left, right))
+        self._ask = np.pad(self._ask, (left, right))
+        self._center += left
+        self._lo += left
+        self._hi += left
+        return idx + left
+
+    def update(self, *, price: float, qty: float, side: str) -> None:
+        if qty <= 0:
+            return
+        if side == "BUY":
+            col = self._ask
+        elif side == "SELL":
+            col = self._bid
+        else:
+            return
+
+        tick = int(round(price / self.tick_size))
+        if self._base is None:
+            self._base = tick
+
+        idx = self._center + tick - self._base
+        if idx < 0 or idx >= len(self._bid):
+            idx = self._grow(idx)
+            col = self._ask if side == "BUY" else self._bid
+
+        col[idx] += qty
+        if idx < self._lo:
+            self._lo = idx
+        if idx > self._hi:
+            self._hi = idx
+
+    def _bar(self, copy: bool) -> FootprintBar:
+        if self._base is None:
+            empty = np.empty(0, dtype=np.float64)
+            return FootprintBar(self.tick_size, empty, empty, empty)
+
+        lo, hi = self._lo, self._hi + 1
+        ticks = np.arange(lo - self._center, hi - self._center) + self._base
+        bid = self._bid[lo:hi]
+        ask = self._ask[lo:hi]
+        if copy:
+            bid = bid.copy()
+            ask = ask.copy()
+        return FootprintBar(self.tick_size, ticks * self.tick_size, bid, ask)
+
+    def view(self) -> FootprintBar:
+        """
+        Текущий бар без копирования (валиден до следующего update/flush).
+        """
+        return self._bar(copy=False)
+
+    def flush(self) -> FootprintBar:
+        bar = self._bar(copy=True)
+        self.reset()
+        return bar
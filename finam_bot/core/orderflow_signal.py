@@ -1,27 +1,10 @@
 # finam_bot/core/orderflow_signal.py
 
 from dataclasses import dataclass
-from typing import Literal
+from typing import Optional
 
-Side = Literal["BUY", "SELL"]
 
-
-@dataclass(frozen=True)
-class OrderFlowSignal:
-    side: Side
-    strength: float          # 0.0 .. 1.0
-    imbalance: float         # -1 .. +1
-    reason: str              # human-readable (logs/debug)
-
-    @property
-    def is_strong(self) -> bool:
-        return True
-# finam_bot/core/orderflow_signal.py
-
-from dataclasses import dataclass
-
-
-@dataclass
+@dataclass(slots=True)
 class OrderFlowSignal:
     side: str            # "BUY" | "SELL"
     strength: float      # 0..1
@@ -33,10 +16,24 @@ class OrderFlowSignal:
         return self.strength >= 0.6
 
 
-@dataclass
+@dataclass(slots=True)
 class AbsorptionSignal(OrderFlowSignal):
     """
     Сигнал абсорбции:
     большой объём + отсутствие продолжения цены
     """
     absorbed_volume: float = 0.0
+
+
+@dataclass(slots=True)
+class DivergenceSignal(OrderFlowSignal):
+    """
+    Дивергенция цены и CVD на подтверждённом пивоте:
+      SELL — цена обновила high, CVD нет
+      BUY  — цена обновила low, CVD нет
+    """
+    pivot_ts: Optional[int] = None
+    price: float = 0.0
+    prev_price: float = 0.0
+    cvd: float = 0.0
+    prev_cvd: float = 0.0
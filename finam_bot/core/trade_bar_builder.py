@@ -0,0 +1,162 @@
+# finam_bot/core/trade_bar_builder.py
+
+from typing import Literal, Optional, Tuple
+
+from finam_bot.backtest.models import Candle
+from finam_bot.backtest.resample import MOEX_SESSION_OPEN, MOEX_UTC_OFFSET
+from finam_bot.core.orderflow_accumulator import OrderFlowSnapshot
+
+BarMode = Literal["time", "volume", "tick"]
+
+
+class TradeBarBuilder:
+    """
+    Единый потоковый сборщик баров из ленты сделок (ts, price, qty, side).
+
+    На закрытии бара отдаёт пару (Candle, OrderFlowSnapshot):
+      - time:   бар закрывается первой сделкой следующего интервала
+                (или poll(now) по таймеру), интервалы выровнены по сессии MOEX;
+                эта сделка открывает новый бар
+      - volume: бар закрывается сделкой, на которой объём бара >= threshold;
+                сделка целиком входит в закрываемый бар (не делится), поэтому
+                объём бара может быть больше threshold, а следующий бар
+                начинается со следующей сделки
+      - tick:   бар закрывается N-й сделкой (она входит в бар)
+
+    push(ts, price, qty, side) — на каждую сделку ленты; возвращает
+    закрытый бар или None. poll(now_ts) — только для time-баров, по
+    таймеру: закрывает бар, интервал которого истёк, когда следующей
+    сделки нет (тихий рынок); для volume / tick всегда None — их
+    закрывает только сделка. flush() — закрыть недостроенный бар
+    (конец сессии / остановка).
+
+    Всё состояние — фиксированный набор скаляров (без буферов на тик).
+    side как в OrderFlowAccumulator: BUY -> ask volume, SELL -> bid volume.
+    """
+
+    __slots__ = (
+        "mode", "threshold", "_shift", "_period",
+        "_bucket", "_ts", "_open", "_high", "_low", "_close",
+        "_bid", "_ask", "_volume", "_pq", "_trades",
+    )
+
+    def __init__(
+        self,
+        mode: BarMode = "time",
+        threshold: float = 60,
+        *,
+        utc_offset: int = MOEX_UTC_OFFSET,
+        session_open: int = MOEX_SESSION_OPEN,
+    ):
+        if mode not in ("time", "volume", "tick"):
+            raise ValueError(f"Unknown bar mode: {mode}")
+        if threshold <= 0:
+            raise ValueError("threshold must be > 0")
+
+        self.mode = mode
+        self.threshold = threshold
+        self._shift = int(utc_offset) - int(session_open)
+        self._period = int(threshold) if mode == "time" else 0
+        self._bucket: Optional[int] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ts = None
+        self._open = 0.0
+        self._high = 0.0
+        self._low = 0.0
+        self._close = 0.0
+        self._bid = 0.0
+        self._ask = 0.0
+        self._volume = 0.0
+        self._pq = 0.0
+        self._trades = 0
+
+    def _emit(self) -> Tuple[Candle, OrderFlowSnapshot]:
+        volume = self._volume
+        candle = Candle(
+            ts=self._ts,
+            open=self._open,
+            high=self._high,
+            low=self._low,
+            close=self._close,
+            volume=volume,
+        )
+        snapshot = OrderFlowSnapshot(
+            bid_volume=self._bid,
+            ask_volume=self._ask,
+            total_volume=volume,
+            delta=self._bid - self._ask,
+            trades=self._trades,
+            vwap=self._pq / volume if volume > 0 else None,
+        )
+        self._reset()
+        return candle, snapshot
+
+    def push(
+        self,
+        ts: int,
+        price: float,
+        qty: float,
+        side: str,
+    ) -> Optional[Tuple[Candle, OrderFlowSnapshot]]:
+        if qty <= 0:
+            return None
+        if side == "BUY":
+            buy = True
+        elif side == "SELL":
+            buy = False
+        else:
+            return None
+
+        done = None
+        if self._period:
+            bucket = (int(ts) + self._shift) // self._period
+            if bucket != self._bucket:
+                if self._trades:
+                    done = self._emit()
+                self._bucket = bucket
+                self._ts = bucket * self._period - self._shift
+
+        if self._trades == 0:
+            # time: начало интервала (в т.ч. для поздней сделки после poll())
+            self._ts = ts if not self._period else self._bucket * self._period - self._shift
+            self._open = self._high = self._low = price
+        elif price > self._high:
+            self._high = price
+        elif price < self._low:
+            self._low = price
+
+        self._close = price
+        if buy:
+            self._ask += qty
+        else:
+            self._bid += qty
+        self._volume += qty
+        self._pq += price * qty
+        self._trades += 1
+
+        if self.mode == "volume":
+            if self._volume >= self.threshold:
+                return self._emit()
+        elif self.mode == "tick":
+            if self._trades >= self.threshold:
+                return self._emit()
+
+        return done
+
+    def poll(self, now_ts: int) -> Optional[Tuple[Candle, OrderFlowSnapshot]]:
+        """
+        Time-бары: закрыть текущий бар по часам, если его интервал истёк,
+        не дожидаясь следующей сделки.
+        """
+        if not self._period or not self._trades:
+            return None
+        if (int(now_ts) + self._shift) // self._period != self._bucket:
+            return self._emit()
+        return None
+
+    def flush(self) -> Optional[Tuple[Candle, OrderFlowSnapshot]]:
+        if not self._trades:
+            return None
+        return self._emit()
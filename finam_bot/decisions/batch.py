@@ -0,0 +1,94 @@
+# finam_bot/decisions/batch.py
+"""
+Пакетная оценка сигналов: qty -> Risk v2.2 -> decisions.
+
+- qty считается одним QtyCalculator.calc_batch
+- риск — RiskEngineV22.check_batch против одного снимка агрегатов:
+  принятые сигналы занимают лимиты класса для следующих в пачке
+- все решения пишутся одной транзакцией (storage.insert_decisions)
+
+    decisions = decide_batch(signals, qty_calc=calc, risk=risk, storage=storage)
+"""
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence
+
+from finam_bot.instruments import get_asset_class
+
+
+def _asset_class(signal, resolve: Callable[[str], str]) -> Optional[str]:
+    asset_class = getattr(signal, "asset_class", None)
+    if asset_class:
+        return asset_class
+    try:
+        return resolve(signal.symbol)
+    except KeyError:
+        return None
+
+
+def decide_batch(
+    signals: Sequence,
+    *,
+    qty_calc,
+    risk,
+    storage=None,
+    ts: Optional[str] = None,
+    asset_class_of: Callable[[str], str] = get_asset_class,
+) -> List[dict]:
+    """
+    signals — signals.models.Signal (или объекты с теми же полями).
+    Возвращает decision dict на каждый сигнал в исходном порядке;
+    storage=None — без записи.
+    """
+    ts = ts or datetime.now(timezone.utc).isoformat()
+    classes = [_asset_class(s, asset_class_of) for s in signals]
+    known = [i for i, ac in enumerate(classes) if ac is not None]
+
+    qty = [0.0] * len(signals)
+    sized = qty_calc.calc_batch(
+        [signals[i].entry for i in known],
+        [signals[i].stop for i in known],
+        asset_classes=[classes[i] for i in known],
+        symbols=[signals[i].symbol for i in known],
+    )
+    for i, q in zip(known, sized):
+        qty[i] = float(q)
+
+    verdicts = {}
+    candidates = [i for i in known if qty[i] > 0]
+    results = risk.check_batch(
+        dict(qty=qty[i], entry=signals[i].entry, stop=signals[i].stop,
+             asset_class=classes[i], symbol=signals[i].symbol)
+        for i in candidates
+    )
+    for i, v in zip(candidates, results):
+        verdicts[i] = (v.allowed, v.reason, v.asset_class)
+
+    decisions = []
+    for i, s in enumerate(signals):
+        if classes[i] is None:
+            allowed, reason, asset_class = False, "UNKNOWN_ASSET_CLASS", "UNKNOWN"
+        elif qty[i] <= 0:
+            allowed, reason, asset_class = False, "QTY_BLOCKED", classes[i]
+        else:
+            allowed, reason, asset_class = verdicts[i]
+        decisions.append({
+            "decision_id": str(uuid.uuid4()),
+            "ts": ts,
+            "symbol": s.symbol,
+            "asset_class": asset_class,
+            "side": s.side,
+            "entry": s.entry,
+            "stop": s.stop,
+            "qty": qty[i],
+            "risk_allowed": allowed,
+            "risk_reason": reason,
+            "strategy": getattr(s, "reason", None),
+            "confidence": getattr(s, "confidence", None),
+        })
+
+    if storage is not None:
+        storage.insert_decisions(decisions)
+    return decisions
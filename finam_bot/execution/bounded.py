@@ -0,0 +1,35 @@
+# finam_bot/execution/bounded.py
+
+from collections import OrderedDict
+from typing import Hashable
+
+
+class BoundedSet:
+    """
+    Множество для дедупликации (trade_id и т.п.) с вытеснением самых
+    старых ключей сверх maxsize — на долгой сессии не растёт без предела.
+    Повторное add() освежает ключ (LRU).
+    """
+
+    __slots__ = ("maxsize", "_items")
+
+    def __init__(self, maxsize: int = 10_000):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be > 0")
+        self.maxsize = int(maxsize)
+        self._items: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def add(self, key: Hashable) -> None:
+        items = self._items
+        if key in items:
+            items.move_to_end(key)
+            return
+        items[key] = None
+        if len(items) > self.maxsize:
+            items.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -23,7 +23,7 @@ class OrderExecutor:
             result = self.grpc.place_market_order(
                 symbol=symbol,
                 side=side,
-                quantity=qty,
+                qty=qty,
             )
 
             print("[EXEC] OK:", result)
@@ -49,7 +49,7 @@ class OrderExecutor:
             result = self.grpc.place_limit_order(
                 symbol=symbol,
                 side=side,
-                quantity=qty,
+                qty=qty,
                 price=price,
             )
 
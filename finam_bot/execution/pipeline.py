@@ -0,0 +1,371 @@
+# finam_bot/execution/pipeline.py
+"""
+Низколатентный конвейер исполнения.
+
+- PlaceOrder уходит асинхронно по уже прогретому каналу AsyncFinamClient,
+  submit() возвращает тикет сразу, не дожидаясь ответа
+- состояние ордеров ведётся по стримам SubscribeOrders / SubscribeTrades,
+  без поллинга GetOrder
+- сделки, пришедшие раньше ack (order_id ещё неизвестен), буферизуются
+  и применяются, как только ордер сопоставлен
+- стрим, упавший с неповторяемой ошибкой, логируется и перезапускается
+  с экспоненциальной паузой; после переподписки открытые тикеты сверяются
+  по GetOrders (события, пропущенные в разрыве, не теряются, а живой
+  ордер не объявляется упавшим)
+- сделки чужих ордеров (сироты без тикета) вытесняются по возрасту и
+  числу, дедуп trade_id — ограниченный LRU
+- латентность пишется в гистограммы infra.metrics:
+    exec.signal_to_ack   сигнал -> ack (ответ PlaceOrder или первый OrderState)
+    exec.ack_to_fill     ack -> полное исполнение
+    exec.signal_to_fill  сигнал -> полное исполнение
+
+    pipeline = ExecutionPipeline(client)
+    await pipeline.start()
+    ticket = pipeline.submit("SBER@MISX", "BUY", 10, signal_ts=t0)
+    await pipeline.wait(ticket, timeout=5)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from google.type import decimal_pb2
+
+from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2
+from finam_bot.execution.bounded import BoundedSet
+from finam_bot.infra.metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# статусы, после которых ордер больше не меняется
+TERMINAL_STATUSES = {
+    "FILLED",
+    "EXECUTED",
+    "CANCELED",
+    "REJECTED",
+    "REJECTED_BY_EXCHANGE",
+    "DENIED_BY_BROKER",
+    "EXPIRED",
+    "FAILED",
+    "DONE_FOR_DAY",
+}
+
+
+def _status_name(status: int) -> str:
+    try:
+        return orders_service_pb2.OrderStatus.Name(status).replace("ORDER_STATUS_", "")
+    except ValueError:
+        return str(status)
+
+
+def _float(d) -> float:
+    return float(d.value) if d.value else 0.0
+
+
+@dataclass(slots=True)
+class OrderTicket:
+    client_order_id: str
+    symbol: str
+    side: str                       # BUY / SELL
+    qty: float
+    limit_price: Optional[float] = None
+    signal_ts: float = 0.0          # perf_counter момента сигнала
+    submit_ts: float = 0.0
+    ack_ts: Optional[float] = None
+    fill_ts: Optional[float] = None
+    order_id: Optional[str] = None
+    status: str = "PENDING"
+    filled_qty: float = 0.0
+    traded_qty: float = 0.0         # сумма по сделкам (для VWAP)
+    avg_price: float = 0.0
+    error: Optional[str] = None
+    acked: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def is_filled(self) -> bool:
+        return self.fill_ts is not None
+
+
+class ExecutionPipeline:
+    def __init__(
+        self,
+        client,
+        *,
+        metrics: MetricsRegistry = METRICS,
+        clock: Callable[[], float] = time.perf_counter,
+        restart_backoff: float = 0.5,
+        max_restart_backoff: float = 30.0,
+        orphan_ttl: float = 60.0,
+        max_orphans: int = 1000,
+        max_seen_trades: int = 10_000,
+    ):
+        self.client = client
+        self.clock = clock
+        self.restart_backoff = float(restart_backoff)
+        self.max_restart_backoff = float(max_restart_backoff)
+        self.orphan_ttl = float(orphan_ttl)
+        self.max_orphans = int(max_orphans)
+        self.metrics = metrics
+        self.h_ack = metrics.histogram("exec.signal_to_ack")
+        self.h_fill = metrics.histogram("exec.ack_to_fill")
+        self.h_total = metrics.histogram("exec.signal_to_fill")
+
+        self.tickets: Dict[str, OrderTicket] = {}          # client_order_id -> ticket
+        self._by_order: Dict[str, OrderTicket] = {}        # order_id -> ticket
+        # order_id -> (время первой сделки, сделки до ack); в порядке появления
+        self._orphans: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+        self._seen_trades = BoundedSet(max_seen_trades)
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Set[asyncio.Task] = set()
+        self._received = 0          # сообщений из стримов (признак живой подписки)
+
+    # ------------------------- lifecycle -------------------------
+
+    async def start(self, *, warmup_timeout: float = 10.0) -> "ExecutionPipeline":
+        """
+        Подключение + ожидание READY канала до первого ордера
+        (TLS / HTTP2 handshake не попадает в латентность сигнала).
+        """
+        await self.client.connect()
+        await asyncio.wait_for(self.client.channel.channel_ready(), warmup_timeout)
+        self._tasks = [
+            asyncio.create_task(self._supervise("orders", self._consume_orders), name="exec-orders"),
+            asyncio.create_task(self._supervise("trades", self._consume_trades), name="exec-trades"),
+        ]
+        return self
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._pending)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+
+    async def __aenter__(self) -> "ExecutionPipeline":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    # ------------------------- submit -------------------------
+
+    def submit(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        limit_price: Optional[float] = None,
+        *,
+        signal_ts: Optional[float] = None,
+    ) -> OrderTicket:
+        """
+        Без ожидания: PlaceOrder выполняется в фоне, результат — в тикете.
+        signal_ts — perf_counter момента сигнала (по умолчанию — сейчас).
+        """
+        side = side.upper()
+        if side not in ("BUY", "SELL"):
+            raise ValueError(f"Unknown side: {side}")
+        if qty <= 0:
+            raise ValueError("qty must be positive")
+
+        now = self.clock()
+        ticket = OrderTicket(
+            client_order_id=uuid.uuid4().hex[:20],
+            symbol=symbol,
+            side=side,
+            qty=float(qty),
+            limit_price=limit_price,
+            signal_ts=now if signal_ts is None else signal_ts,
+            submit_ts=now,
+        )
+        self.tickets[ticket.client_order_id] = ticket
+
+        task = asyncio.create_task(self._place(ticket))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return ticket
+
+    async def wait(self, ticket: OrderTicket, timeout: Optional[float] = None) -> OrderTicket:
+        await asyncio.wait_for(ticket.done.wait(), timeout)
+        return ticket
+
+    def _build_order(self, ticket: OrderTicket) -> orders_service_pb2.Order:
+        order = orders_service_pb2.Order(
+            account_id=str(self.client.account_id),
+            symbol=ticket.symbol,
+            quantity=decimal_pb2.Decimal(value=str(ticket.qty)),
+            side=side_pb2.SIDE_BUY if ticket.side == "BUY" else side_pb2.SIDE_SELL,
+            type=orders_service_pb2.ORDER_TYPE_MARKET,
+            client_order_id=ticket.client_order_id,
+        )
+        if ticket.limit_price is not None:
+            order.type = orders_service_pb2.ORDER_TYPE_LIMIT
+            order.limit_price.value = str(ticket.limit_price)
+        return order
+
+    async def _place(self, ticket: OrderTicket) -> None:
+        try:
+            state = await self.client.place_order(self._build_order(ticket))
+        except Exception as e:
+            logger.error("PlaceOrder %s failed: %s", ticket.client_order_id, e)
+            self.metrics.inc("exec.place_errors")
+            ticket.status = "ERROR"
+            ticket.error = str(e)
+            ticket.acked.set()
+            ticket.done.set()
+            return
+        self._on_order_state(state, ticket)
+
+    # ------------------------- streams -------------------------
+
+    async def _supervise(self, name: str, consume) -> None:
+        """
+        Держит подписку живой: временные ошибки AsyncFinamClient._stream
+        переживает сам, сюда доходят неповторяемые / исчерпанные попытки.
+        После переподписки — сверка открытых тикетов по GetOrders.
+        """
+        attempt = 0
+        resubscribe = False
+        while True:
+            received = self._received
+            consumer = asyncio.ensure_future(consume())
+            try:
+                if resubscribe:
+                    # подписка уже открыта — то, что придёт после снимка, не потеряется
+                    await self._reconcile()
+                await consumer
+                logger.warning("%s stream closed by server, resubscribing", name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("%s stream failed: %s", name, e)
+                self.metrics.inc(f"exec.{name}_stream_errors")
+            finally:
+                consumer.cancel()
+            resubscribe = True
+            attempt = 1 if self._received != received else attempt + 1
+            delay = min(self.restart_backoff * (2 ** (attempt - 1)), self.max_restart_backoff)
+            await asyncio.sleep(delay)
+
+    async def _reconcile(self) -> None:
+        if all(t.done.is_set() for t in self.tickets.values()):
+            return
+        try:
+            resp = await self.client.get_orders()
+        except Exception as e:
+            logger.error("GetOrders reconcile failed: %s", e)
+            self.metrics.inc("exec.reconcile_errors")
+            return
+        for state in resp.orders:
+            self._on_order_state(state)
+        self.metrics.inc("exec.reconciles")
+
+    async def _consume_orders(self) -> None:
+        async for resp in self.client.subscribe_orders():
+            self._received += 1
+            for state in resp.orders:
+                self._on_order_state(state)
+
+    async def _consume_trades(self) -> None:
+        async for resp in self.client.subscribe_trades():
+            self._received += 1
+            for trade in resp.trades:
+                self._on_trade(trade)
+
+    # ------------------------- state -------------------------
+
+    def _match(self, state) -> Optional[OrderTicket]:
+        ticket = self._by_order.get(state.order_id)
+        if ticket is None and state.order.client_order_id:
+            ticket = self.tickets.get(state.order.client_order_id)
+        return ticket
+
+    def _ack(self, ticket: OrderTicket, order_id: str) -> None:
+        if ticket.ack_ts is not None:
+            return
+        ticket.ack_ts = self.clock()
+        ticket.order_id = order_id
+        self._by_order[order_id] = ticket
+        self.h_ack.observe(ticket.ack_ts - ticket.signal_ts)
+        ticket.acked.set()
+
+        _, trades = self._orphans.pop(order_id, (0.0, ()))
+        for trade in trades:
+            self._apply_trade(ticket, trade)
+
+    def _on_order_state(self, state, ticket: Optional[OrderTicket] = None) -> None:
+        ticket = ticket or self._match(state)
+        if ticket is None:
+            return  # чужой ордер (терминал / другой процесс)
+        if state.order_id:
+            self._ack(ticket, state.order_id)
+        if ticket.done.is_set():
+            return
+
+        ticket.status = _status_name(state.status)
+        executed = _float(state.executed_quantity)
+        if executed > ticket.filled_qty:
+            ticket.filled_qty = executed
+        if ticket.status in ("FILLED", "EXECUTED"):
+            self._mark_filled(ticket)
+        if ticket.status in TERMINAL_STATUSES:
+            ticket.done.set()
+
+    def _on_trade(self, trade) -> None:
+        if trade.trade_id in self._seen_trades:
+            return
+        ticket = self._by_order.get(trade.order_id)
+        if ticket is None:
+            # ack ещё не пришёл — сделка может быть нашей
+            self._add_orphan(trade)
+            return
+        self._apply_trade(ticket, trade)
+
+    def _add_orphan(self, trade) -> None:
+        now = self.clock()
+        entry = self._orphans.get(trade.order_id)
+        if entry is None:
+            entry = self._orphans[trade.order_id] = (now, [])
+        entry[1].append(trade)
+
+        # чужие ордера (терминал / другой процесс) ack здесь не получат никогда
+        orphans = self._orphans
+        while orphans:
+            order_id, (first_ts, _) = next(iter(orphans.items()))
+            if len(orphans) <= self.max_orphans and now - first_ts <= self.orphan_ttl:
+                break
+            del orphans[order_id]
+            self.metrics.inc("exec.orphans_evicted")
+
+    def _apply_trade(self, ticket: OrderTicket, trade) -> None:
+        if trade.trade_id in self._seen_trades:
+            return
+        self._seen_trades.add(trade.trade_id)
+
+        size = _float(trade.size)
+        price = _float(trade.price)
+        # VWAP по сделкам; filled_qty из OrderState не уменьшаем
+        traded = ticket.traded_qty + size
+        if traded > 0:
+            ticket.avg_price = (ticket.avg_price * ticket.traded_qty + price * size) / traded
+        ticket.traded_qty = traded
+        ticket.filled_qty = max(ticket.filled_qty, traded)
+
+        if ticket.filled_qty >= ticket.qty:
+            self._mark_filled(ticket)
+
+    def _mark_filled(self, ticket: OrderTicket) -> None:
+        if ticket.fill_ts is not None:
+            return
+        ticket.fill_ts = self.clock()
+        ack_ts = ticket.ack_ts if ticket.ack_ts is not None else ticket.fill_ts
+        self.h_fill.observe(ticket.fill_ts - ack_ts)
+        self.h_total.observe(ticket.fill_ts - ticket.signal_ts)
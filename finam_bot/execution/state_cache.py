@@ -0,0 +1,322 @@
+# finam_bot/execution/state_cache.py
+"""
+Локальное состояние счёта: ордера, сделки, позиции.
+
+Один раз засевается из GetOrders + GetAccount, дальше обновляется из
+двунаправленного стрима SubscribeOrderTrade. Чтение — из памяти, без RPC
+(risk-проверки, /status в Telegram).
+
+Гонка seed / stream: стрим запускается ДО seed, события копятся в backlog
+и применяются поверх снапшота. Сделки из backlog с timestamp раньше
+момента запроса GetAccount уже учтены в позициях снапшота и пропускаются.
+
+Упавший стрим переподписывается с экспоненциальной паузой, после чего
+кэш засевается заново (события из разрыва иначе потеряны). Пока стрима
+нет, данные могут отставать — это видно по cache.stale.
+
+Обновления идут из одного event loop, читатели из других потоков видят
+согласованные записи (dict / slotted-объекты заменяются целиком).
+
+    cache = await OrderStateCache(client).start()
+    cache.positions()            # как FinamClient.get_positions()
+    cache.active_orders()
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from finam_bot.execution.bounded import BoundedSet
+from finam_bot.execution.pipeline import TERMINAL_STATUSES, _float, _status_name
+from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2
+
+logger = logging.getLogger(__name__)
+
+
+def _split(symbol: str):
+    if "@" in symbol:
+        a, b = symbol.split("@", 1)
+        return a, b
+    return symbol, ""
+
+
+@dataclass(slots=True)
+class CachedOrder:
+    order_id: str
+    client_order_id: str
+    symbol: str
+    side: str
+    qty: float
+    status: str
+    executed_qty: float
+    remaining_qty: float
+    limit_price: float
+    updated_at: float
+
+    @property
+    def is_active(self) -> bool:
+        return self.status not in TERMINAL_STATUSES
+
+
+@dataclass(slots=True)
+class CachedTrade:
+    trade_id: str
+    order_id: str
+    symbol: str
+    side: str
+    qty: float
+    price: float
+    ts: float
+
+
+@dataclass(slots=True)
+class CachedPosition:
+    symbol: str               # SBER@MISX
+    qty: float                # > 0 long, < 0 short
+    avg_price: float
+    current_price: float = 0.0
+    unrealized_pnl: float = 0.0
+
+
+def order_from_proto(state) -> CachedOrder:
+    o = state.order
+    return CachedOrder(
+        order_id=state.order_id,
+        client_order_id=o.client_order_id,
+        symbol=o.symbol,
+        side="BUY" if o.side == side_pb2.SIDE_BUY else "SELL",
+        qty=_float(o.quantity),
+        status=_status_name(state.status),
+        executed_qty=_float(state.executed_quantity),
+        remaining_qty=_float(state.remaining_quantity),
+        limit_price=_float(o.limit_price),
+        updated_at=time.time(),
+    )
+
+
+def trade_from_proto(t) -> CachedTrade:
+    return CachedTrade(
+        trade_id=t.trade_id,
+        order_id=t.order_id,
+        symbol=t.symbol,
+        side="BUY" if t.side == side_pb2.SIDE_BUY else "SELL",
+        qty=_float(t.size),
+        price=_float(t.price),
+        ts=t.timestamp.seconds + t.timestamp.nanos / 1e9,
+    )
+
+
+class OrderStateCache:
+    def __init__(
+        self,
+        client,
+        *,
+        max_trades: int = 1000,
+        max_seen_trades: int = 10_000,
+        restart_backoff: float = 0.5,
+        max_restart_backoff: float = 30.0,
+    ):
+        self.client = client
+        self.account_id = str(client.account_id or "")
+        self.orders: Dict[str, CachedOrder] = {}
+        self.trades: Deque[CachedTrade] = deque(maxlen=max_trades)
+        self._positions: Dict[str, CachedPosition] = {}
+        self._seen_trades = BoundedSet(max_seen_trades)
+        self.equity = 0.0
+        self.seeded_at: Optional[float] = None
+        self.updated_at = 0.0
+
+        self.restart_backoff = float(restart_backoff)
+        self.max_restart_backoff = float(max_restart_backoff)
+        self._buffering = True       # события в backlog до снапшота
+        self._down = False           # стрим упал и ещё не восстановлен
+        self._received = 0
+
+        self._backlog: list = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stale(self) -> bool:
+        """
+        True — кэш не засеян или стрим обновлений сейчас не работает.
+        """
+        return self.seeded_at is None or self._down
+
+    # ------------------------- lifecycle -------------------------
+
+    async def start(self) -> "OrderStateCache":
+        await self.client.connect()
+        self._task = asyncio.create_task(self._supervise(), name="order-state-cache")
+        await self.seed()
+        return self
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self) -> "OrderStateCache":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def seed(self) -> None:
+        """
+        Снапшот GetOrders + GetAccount (параллельно), затем backlog стрима.
+        """
+        requested_at = time.time()
+        orders, account = await asyncio.gather(self.client.get_orders(), self.client.get_account())
+
+        self.orders = {s.order_id: order_from_proto(s) for s in orders.orders}
+        self._positions = {}
+        for p in account.positions:
+            self._positions[p.symbol] = CachedPosition(
+                symbol=p.symbol,
+                qty=_float(p.quantity),
+                avg_price=_float(p.average_price),
+                current_price=_float(p.current_price),
+                unrealized_pnl=_float(p.unrealized_pnl),
+            )
+        self.equity = _float(account.equity)
+        self.account_id = account.account_id or self.account_id
+
+        backlog, self._backlog = self._backlog, []
+        self.seeded_at = requested_at
+        self._buffering = False
+        for resp in backlog:
+            self.apply(resp)
+        self.updated_at = time.time()
+
+    async def _supervise(self) -> None:
+        """
+        Временные ошибки переживает AsyncFinamClient._stream, сюда доходят
+        неповторяемые / исчерпанные попытки и закрытие стрима сервером.
+        """
+        attempt = 0
+        reconnect = False
+        while True:
+            received = self._received
+            consumer = asyncio.ensure_future(self._consume())
+            try:
+                if reconnect:
+                    # подписка уже открыта: новые события копятся поверх снапшота
+                    self._buffering = True
+                    self._backlog = []
+                    await self.seed()
+                    self._down = False
+                await consumer
+                logger.warning("order-trade stream closed by server, resubscribing")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("order-trade stream failed: %s", e)
+            finally:
+                consumer.cancel()
+            self._down = True
+            reconnect = True
+            attempt = 1 if self._received != received else attempt + 1
+            delay = min(self.restart_backoff * (2 ** (attempt - 1)), self.max_restart_backoff)
+            await asyncio.sleep(delay)
+
+    async def _consume(self) -> None:
+        async for resp in self.client.subscribe_order_trade():
+            self._received += 1
+            if self._buffering:
+                self._backlog.append(resp)
+            else:
+                self.apply(resp)
+
+    # ------------------------- updates -------------------------
+
+    def apply(self, resp) -> None:
+        """
+        OrderTradeResponse (или SubscribeOrders/TradesResponse — те же поля).
+        """
+        for state in getattr(resp, "orders", ()):
+            self.orders[state.order_id] = order_from_proto(state)
+        for t in getattr(resp, "trades", ()):
+            self._on_trade(trade_from_proto(t))
+        self.updated_at = time.time()
+
+    def _on_trade(self, trade: CachedTrade) -> None:
+        if trade.trade_id in self._seen_trades:
+            return
+        self._seen_trades.add(trade.trade_id)
+        self.trades.append(trade)
+        if self.seeded_at is not None and trade.ts and trade.ts < self.seeded_at:
+            return  # уже в позициях снапшота GetAccount
+
+        signed = trade.qty if trade.side == "BUY" else -trade.qty
+        pos = self._positions.get(trade.symbol)
+        if pos is None:
+            self._positions[trade.symbol] = CachedPosition(trade.symbol, signed, trade.price)
+            return
+
+        qty = pos.qty + signed
+        if abs(qty) < 1e-12:
+            del self._positions[trade.symbol]
+            return
+        if pos.qty == 0 or (pos.qty > 0) == (signed > 0):
+            # наращивание — средняя взвешенная
+            avg = (pos.avg_price * abs(pos.qty) + trade.price * abs(signed)) / abs(qty)
+        elif (qty > 0) != (pos.qty > 0):
+            avg = trade.price        # переворот
+        else:
+            avg = pos.avg_price      # частичное закрытие
+        self._positions[trade.symbol] = CachedPosition(
+            trade.symbol, qty, avg, pos.current_price, pos.unrealized_pnl
+        )
+
+    # ------------------------- reads (без RPC) -------------------------
+
+    def order(self, order_id: str) -> Optional[CachedOrder]:
+        return self.orders.get(order_id)
+
+    def active_orders(self, symbol: Optional[str] = None) -> List[CachedOrder]:
+        return [
+            o for o in list(self.orders.values())
+            if o.is_active and (symbol is None or o.symbol == symbol)
+        ]
+
+    def position(self, symbol: str) -> Optional[CachedPosition]:
+        return self._positions.get(symbol)
+
+    def positions(self) -> List[dict]:
+        """
+        Формат schema.POSITION_FIELDS (как FinamClient.get_positions).
+        """
+        out = []
+        for p in list(self._positions.values()):
+            symbol, mic = _split(p.symbol)
+            out.append({
+                "account_id": self.account_id,
+                "symbol": symbol,
+                "mic": mic,
+                "qty": p.qty,
+                "avg_price": p.avg_price,
+                "current_price": p.current_price,
+                "unrealized_pnl": p.unrealized_pnl,
+            })
+        return out
+
+    def recent_trades(self, limit: int = 100) -> List[CachedTrade]:
+        return list(self.trades)[-limit:]
+
+    def summary(self) -> str:
+        """
+        Короткий текст для /status.
+        """
+        if self.seeded_at is None:
+            return "state: not seeded"
+        age = time.time() - self.updated_at
+        return (
+            f"account {self.account_id}: equity {self.equity:g}, "
+            f"positions {len(self._positions)}, active orders {len(self.active_orders())}, "
+            f"updated {age:.0f}s ago" + (" (STALE: stream down)" if self._down else "")
+        )
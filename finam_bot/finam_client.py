@@ -31,6 +31,9 @@ from finam_bot.grpc_api.grpc.tradeapi.v1.auth import (
 )
 from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2
 from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2
+from finam_bot.grpc.instrumentation import client_interceptors
+from finam_bot.grpc.resilience import ResilientCaller
+from finam_bot.grpc.token_manager import TokenManager
 from google.type import decimal_pb2
 
 
@@ -74,13 +77,18 @@ class FinamClient(BaseTradingClient):
             self.host = "api.finam.ru:443"
 
         creds = grpc.ssl_channel_credentials()
-        self.channel = grpc.secure_channel(self.host, creds)
+        # интерцептор метрик: латентность / размеры / ошибки по методам
+        self.channel = grpc.intercept_channel(grpc.secure_channel(self.host, creds), *client_interceptors())
 
         # --- Auth ---
+        # session JWT: общий для процессов файловый кэш + фоновое обновление до exp
         self._auth_stub = auth_service_pb2_grpc.AuthServiceStub(self.channel)
-        self.jwt_token = self._exchange_token()
-
-        self.metadata = [("authorization", f"Bearer {self.jwt_token}")]
+        self.tokens = TokenManager(self.api_token, self._exchange_token, scope=self.host).start()
+        self.rpc = ResilientCaller(
+            lambda: self.metadata,
+            # JWT отозван / истёк раньше exp — берём новый (или уже обновлённый другим процессом)
+            on_unauthenticated=lambda: self.tokens.refresh(stale=self.tokens.current()),
+        )
 
         # --- Services ---
         self.accounts = accounts_service_pb2_grpc.AccountsServiceStub(self.channel)
@@ -93,8 +101,8 @@ class FinamClient(BaseTradingClient):
         print("JWT length:", len(self.jwt_token))
 
     # -------------------------------------------------
-    def get_portfolios(self):
-        raw = self.get_portfolios_raw()
+    def get_portfolios(self, account=None):
+        raw = self.get_portfolios_raw(account)
         portfolios = raw["portfolios"]
 
         for p in portfolios:
@@ -102,7 +110,16 @@ class FinamClient(BaseTradingClient):
 
         return portfolios
 
-    def _exchange_token(self) -> str:
+    @property
+    def jwt_token(self) -> str:
+        return self.tokens.token()
+
+    @property
+    def metadata(self) -> list:
+        # читается на каждом вызове — после refresh новые RPC идут со свежим JWT
+        return self.tokens.metadata()
+
+    def _exchange_token(self, secret: Optional[str] = None) -> str:
         """
         Обменивает API токен на session JWT через AuthService
         С retry и backoff
@@ -111,7 +128,7 @@ class FinamClient(BaseTradingClient):
         max_attempts = 3
         delay = 1.0
 
-        req = auth_service_pb2.AuthRequest(secret=self.api_token)
+        req = auth_service_pb2.AuthRequest(secret=secret or self.api_token)
 
         for attempt in range(1, max_attempts + 1):
             try:
@@ -128,21 +145,8 @@ class FinamClient(BaseTradingClient):
                 delay *= 2  # экспоненциальный backoff
     # -------------------------------------------------
     def _rpc_call(self, fn, request):
-        max_attempts = 3
-        delay = 0.5
-
-        for attempt in range(1, max_attempts + 1):
-            try:
-                return fn(request, metadata=self.metadata)
-
-            except grpc.RpcError as e:
-                print(f"RPC attempt {attempt} failed:", e)
-
-                if attempt == max_attempts:
-                    raise
-
-                time.sleep(delay)
-                delay *= 2
+        # дедлайны / повторы только на временных кодах / hedging / circuit breaker
+        return self.rpc.call(fn, request)
 
     # -----------------------------
     # PUBLIC API
@@ -157,6 +161,35 @@ class FinamClient(BaseTradingClient):
 
         return trades
 
+    def fetch_trades(self, account_id: Optional[str] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, page_size: int = 500):
+        """
+        Все сделки с since (постранично, без потолка limit).
+        """
+        from finam_bot.portfolio.sync import fetch_paged
+
+        self._check_account(account_id)
+
+        def page(start, end, limit):
+            return self.normalize_trades(self.get_trades_raw(limit=limit, start=start, end=end))
+
+        return fetch_paged(page, since, until, page_size)
+
+    def fetch_transactions(self, account_id: Optional[str] = None, since: Optional[datetime] = None,
+                           until: Optional[datetime] = None, page_size: int = 500):
+        from finam_bot.portfolio.sync import fetch_paged
+
+        self._check_account(account_id)
+
+        def page(start, end, limit):
+            return self.normalize_transactions(self.get_transactions_raw(limit=limit, start=start, end=end))
+
+        return fetch_paged(page, since, until, page_size)
+
+    def _check_account(self, account_id: Optional[str]) -> None:
+        if account_id is not None and str(account_id) != str(self.account_id):
+            raise ValueError(f"Client is bound to account {self.account_id}, got {account_id}")
+
     def get_transactions(self, days: int = 7, limit: int = 100):
         resp = self.get_transactions_raw(days=days, limit=limit)
         tx = self.normalize_transactions(resp)
@@ -172,8 +205,8 @@ class FinamClient(BaseTradingClient):
         )
         return self._rpc_call(self.accounts.GetAccount, req)
 
-    def get_portfolios_raw(self):
-        account = self.get_account()
+    def get_portfolios_raw(self, account=None):
+        account = account if account is not None else self.get_account()
 
         balance = 0.0
 
@@ -200,14 +233,22 @@ class FinamClient(BaseTradingClient):
     # -------------------------------------------------
     # TRADES
     # -------------------------------------------------
-    def get_trades_raw(self, limit: int = 100, days: int = 7):
+    def get_trades_raw(
+        self,
+        limit: int = 100,
+        days: int = 7,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ):
+        """
+        [start, end] явно — для постраничной синхронизации, иначе последние days.
+        """
         from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2
         from google.type import interval_pb2
         from google.protobuf import timestamp_pb2
-        from datetime import datetime, timedelta, timezone
 
-        now = datetime.now(timezone.utc)
-        start = now - timedelta(days=int(days))
+        now = end or datetime.now(timezone.utc)
+        start = start or now - timedelta(days=int(days))
 
         interval = interval_pb2.Interval(
             start_time=timestamp_pb2.Timestamp(seconds=int(start.timestamp())),
@@ -224,14 +265,19 @@ class FinamClient(BaseTradingClient):
     # -------------------------------------------------
     # TRANSACTIONS
     # -------------------------------------------------
-    def get_transactions_raw(self, days: int = 7, limit: int = 100):
+    def get_transactions_raw(
+        self,
+        days: int = 7,
+        limit: int = 100,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ):
         from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2
         from google.type import interval_pb2
         from google.protobuf import timestamp_pb2
-        from datetime import datetime, timedelta, timezone
 
-        now = datetime.now(timezone.utc)
-        start = now - timedelta(days=int(days))
+        now = end or datetime.now(timezone.utc)
+        start = start or now - timedelta(days=int(days))
 
         interval = interval_pb2.Interval(
             start_time=timestamp_pb2.Timestamp(seconds=int(start.timestamp())),
@@ -281,7 +327,7 @@ class FinamClient(BaseTradingClient):
                 "currency": _money_currency(getattr(t, "change", None)),
                 "description": getattr(t, "transaction_name", "") or "",
             })
-            return out
+        return out
     def _build_order(
             self,
             symbol: str,
@@ -366,30 +412,38 @@ class FinamClient(BaseTradingClient):
     # ORDERS
     # -------------------------------------------------
 
-    def place_market_order(self, symbol: str, side: str, qty: float, mic: str):
-        from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2
-        from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2
-        from google.type import decimal_pb2
+    def _order_symbol(self, symbol: str, mic: Optional[str] = None) -> str:
+        """
+        Order не имеет поля mic — площадка передаётся в symbol ("SBER@MISX").
+        """
+        if "@" in symbol:
+            return symbol
+        if not mic:
+            raise ValueError(
+                "Symbol must include MIC suffix, e.g. SBER@MISX or BRH6@RTSX"
+            )
+        return f"{symbol}@{mic}"
+
+    def _submit_order(self, order):
+        if not self.execution_enabled:
+            # dry-run: EXECUTION_ENABLED != 1 — ордер только собирается
+            print("ORDER BUILT (dry-run):", order)
+            return order
+        return self._rpc_call(self.orders.PlaceOrder, order)
 
+    def place_market_order(self, symbol: str, side: str, qty: float, mic: Optional[str] = None):
         side_enum = side_pb2.SIDE_BUY if side.upper() == "BUY" else side_pb2.SIDE_SELL
 
         order = orders_service_pb2.Order(
             account_id=str(self.account_id),
-            symbol=str(symbol),
+            symbol=self._order_symbol(symbol, mic),
             quantity=decimal_pb2.Decimal(value=str(qty)),
             side=side_enum,
             type=orders_service_pb2.ORDER_TYPE_MARKET,
-            mic=str(mic),
         )
+        return self._submit_order(order)
 
-        #return self._rpc_call(self.orders.PlaceOrder, order)
-        print(order)
-        return order
-    def place_limit_order(self, symbol: str, side: str, qty: float, price: float):
-        from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2
-        from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2
-        from google.type import decimal_pb2
-
+    def place_limit_order(self, symbol: str, side: str, qty: float, price: float, mic: Optional[str] = None):
         side_enum = (
             side_pb2.SIDE_BUY
             if side.upper() == "BUY"
@@ -398,16 +452,13 @@ class FinamClient(BaseTradingClient):
 
         order = orders_service_pb2.Order(
             account_id=str(self.account_id),
-            symbol=str(symbol),
-            mic=str(mic),
+            symbol=self._order_symbol(symbol, mic),
             quantity=decimal_pb2.Decimal(value=str(qty)),
             side=side_enum,
             type=orders_service_pb2.ORDER_TYPE_LIMIT,
             limit_price=decimal_pb2.Decimal(value=str(price)),
         )
-        print("ORDER BUILT:", order)
-        return order
-        #return self._rpc_call(self.orders.PlaceOrder, order)
+        return self._submit_order(order)
 
     def normalize_trades(self, resp):
         def _money_to_float(m) -> float:
@@ -502,8 +553,8 @@ class FinamClient(BaseTradingClient):
 
         return 0.0
 
-    def get_positions(self):
-        account = self.get_account()
+    def get_positions(self, account=None):
+        account = account if account is not None else self.get_account()
 
         positions = []
 
@@ -541,12 +592,13 @@ class FinamClient(BaseTradingClient):
 
         return positions
 
-    def get_positions(self):
+    def get_positions(self, account=None):
         """
         Нормализованные позиции под schema.POSITION_FIELDS:
         account_id, symbol, mic, qty, avg_price, current_price, unrealized_pnl
+        account — уже полученный GetAccountResponse (без повторного RPC).
         """
-        account = self.get_account()
+        account = account if account is not None else self.get_account()
 
         positions = getattr(account, "positions", None) or []
         out = []
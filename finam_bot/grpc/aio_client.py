@@ -0,0 +1,411 @@
+# finam_bot/grpc/aio_client.py
+"""
+Асинхронный клиент Finam Trade API на grpc.aio.
+
+Один multiplexed канал на все сервисы (Auth / Accounts / Orders /
+MarketData / Assets): unary-вызовы и серверные стримы идут через него
+параллельно и не блокируют event loop (в отличие от FinamClient).
+
+- каждый unary-вызов — с дедлайном (timeout) и asyncio-ретраями
+  на временных кодах (UNAVAILABLE, DEADLINE_EXCEEDED, ...)
+- стримы переподключаются на тех же кодах, backoff сбрасывается
+  после первого полученного сообщения
+- UNAUTHENTICATED -> новый JWT (через TokenManager, если он задан) и повтор;
+  metadata собирается на каждом вызове, поэтому обновлённый фоновым
+  потоком токен подхватывается без пересоздания канала
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, Optional
+
+import grpc
+from google.protobuf import timestamp_pb2
+from google.type import interval_pb2
+
+from finam_bot.grpc.candle_adapter import Candle, candle_from_proto
+from finam_bot.grpc.instrumentation import aio_client_interceptors
+from finam_bot.grpc.resilience import NO_RETRY_METHODS, method_name
+from finam_bot.grpc.token_manager import TokenManager
+from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2, accounts_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.assets import assets_service_pb2, assets_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.auth import auth_service_pb2, auth_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2, marketdata_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2, orders_service_pb2_grpc
+from finam_bot.infra.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+})
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30_000),
+    ("grpc.keepalive_timeout_ms", 10_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.max_receive_message_length", 64 * 1024 * 1024),
+]
+
+_TF = marketdata_service_pb2
+TIMEFRAMES = {
+    "M1": _TF.TIME_FRAME_M1,
+    "M5": _TF.TIME_FRAME_M5,
+    "M15": _TF.TIME_FRAME_M15,
+    "M30": _TF.TIME_FRAME_M30,
+    "H1": _TF.TIME_FRAME_H1,
+    "H2": _TF.TIME_FRAME_H2,
+    "H4": _TF.TIME_FRAME_H4,
+    "H8": _TF.TIME_FRAME_H8,
+    "D1": _TF.TIME_FRAME_D,
+    "W1": _TF.TIME_FRAME_W,
+    "MN": _TF.TIME_FRAME_MN,
+}
+# формат config.TIMEFRAMES: "1m", "5m", "1h", "1d"
+_TF_ALIASES = {"1M": "M1", "5M": "M5", "15M": "M15", "30M": "M30", "1H": "H1", "4H": "H4", "1D": "D1", "D": "D1", "W": "W1"}
+
+
+def timeframe_to_proto(tf) -> int:
+    """
+    "M5" / "5m" / "TIME_FRAME_M5" / enum int -> marketdata.TimeFrame
+    """
+    if isinstance(tf, int):
+        return tf
+    key = (tf or "").strip().upper()
+    if key.startswith("TIME_FRAME_"):
+        return _TF.TimeFrame.Value(key)
+    key = _TF_ALIASES.get(key, key)
+    if key not in TIMEFRAMES:
+        raise ValueError(f"Unsupported timeframe={tf}. Use one of: {', '.join(TIMEFRAMES)}")
+    return TIMEFRAMES[key]
+
+
+def make_interval(start: datetime, end: datetime) -> interval_pb2.Interval:
+    return interval_pb2.Interval(
+        start_time=timestamp_pb2.Timestamp(seconds=int(start.timestamp())),
+        end_time=timestamp_pb2.Timestamp(seconds=int(end.timestamp())),
+    )
+
+
+class AsyncFinamClient:
+    """
+    Async-аналог FinamClient. Использование:
+
+        async with AsyncFinamClient() as client:
+            account = await client.get_account()
+            async for candle in client.stream_candles("SBER@MISX", "M5"):
+                ...
+    """
+
+    def __init__(
+        self,
+        *,
+        api_token: Optional[str] = None,
+        account_id: Optional[str] = None,
+        host: Optional[str] = None,
+        channel: Optional[grpc.aio.Channel] = None,
+        jwt_token: Optional[str] = None,
+        token_manager: Optional[TokenManager] = None,
+        timeout: float = 10.0,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+    ):
+        self.mode = os.getenv("MODE", "REAL").upper()
+        self.api_token = api_token or os.getenv("FINAM_TOKEN")
+        self.account_id = account_id or os.getenv("FINAM_ACCOUNT_ID")
+
+        if host is None:
+            host = "sandbox-api.finam.ru:443" if self.mode == "TEST" else "api.finam.ru:443"
+        self.host = host
+
+        self.timeout = float(timeout)
+        self.max_attempts = int(max_attempts)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+
+        self._own_channel = channel is None
+        self.channel = channel
+        self.jwt_token = jwt_token
+        self.token_manager = token_manager
+
+        if self.channel is not None:
+            self._init_stubs()
+
+    # ------------------------- lifecycle -------------------------
+
+    def _init_stubs(self) -> None:
+        ch = self.channel
+        self.auth = auth_service_pb2_grpc.AuthServiceStub(ch)
+        self.accounts = accounts_service_pb2_grpc.AccountsServiceStub(ch)
+        self.orders = orders_service_pb2_grpc.OrdersServiceStub(ch)
+        self.marketdata = marketdata_service_pb2_grpc.MarketDataServiceStub(ch)
+        self.assets = assets_service_pb2_grpc.AssetsServiceStub(ch)
+
+    async def connect(self) -> "AsyncFinamClient":
+        if self.channel is None:
+            self.channel = grpc.aio.secure_channel(
+                self.host,
+                grpc.ssl_channel_credentials(),
+                options=CHANNEL_OPTIONS,
+                interceptors=aio_client_interceptors(),
+            )
+            self._init_stubs()
+
+        if self.token_manager is not None:
+            self.jwt_token = await asyncio.to_thread(self.token_manager.token)
+        elif not self.jwt_token:
+            if not self.api_token:
+                raise RuntimeError("FINAM_TOKEN not set")
+            await self.authenticate()
+        return self
+
+    @property
+    def metadata(self) -> list:
+        token = self.token_manager.current() if self.token_manager is not None else None
+        token = token or self.jwt_token
+        return [("authorization", f"Bearer {token}")] if token else []
+
+    async def authenticate(self) -> str:
+        """
+        Обмен API токена на session JWT (AuthService.Auth).
+        """
+        resp = await self._unary(
+            self.auth.Auth,
+            auth_service_pb2.AuthRequest(secret=self.api_token),
+            with_metadata=False,
+        )
+        self.jwt_token = resp.token
+        return self.jwt_token
+
+    async def _reauthenticate(self) -> None:
+        if self.token_manager is not None:
+            stale = self.token_manager.current()
+            self.jwt_token = await asyncio.to_thread(self.token_manager.refresh, stale)
+        elif self.api_token:
+            await self.authenticate()
+        else:
+            raise RuntimeError("JWT rejected and FINAM_TOKEN not set")
+
+    async def close(self) -> None:
+        if self.channel is not None and self._own_channel:
+            await self.channel.close()
+            self.channel = None
+
+    async def __aenter__(self) -> "AsyncFinamClient":
+        return await self.connect()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # ------------------------- transport -------------------------
+
+    def _delay(self, attempt: int) -> float:
+        return min(self.backoff * (2 ** (attempt - 1)), self.max_backoff)
+
+    async def _unary(
+        self,
+        fn,
+        request,
+        *,
+        timeout: Optional[float] = None,
+        with_metadata: bool = True,
+        max_attempts: Optional[int] = None,
+    ):
+        """
+        max_attempts по умолчанию — self.max_attempts, для NO_RETRY_METHODS
+        (PlaceOrder / CancelOrder) — 1: ответ мог потеряться после того,
+        как брокер уже применил запрос.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if max_attempts is None:
+            max_attempts = 1 if method_name(fn) in NO_RETRY_METHODS else self.max_attempts
+        reauthed = False
+        attempt = 0
+
+        while True:
+            try:
+                return await fn(request, metadata=self.metadata if with_metadata else None, timeout=timeout)
+            except grpc.aio.AioRpcError as e:
+                if e.code() == grpc.StatusCode.UNAUTHENTICATED and with_metadata and not reauthed:
+                    # повтор после нового JWT не считается попыткой
+                    reauthed = True
+                    await self._reauthenticate()
+                    continue
+                attempt += 1
+                if e.code() not in RETRYABLE_CODES or attempt >= max_attempts:
+                    raise
+                delay = self._delay(attempt)
+                METRICS.inc(f"rpc.{method_name(fn)}.retries")
+                logger.warning("RPC attempt %s failed (%s), retry in %.2fs", attempt, e.code().name, delay)
+                await asyncio.sleep(delay)
+
+    async def _stream(self, fn, request, *, method: Optional[str] = None) -> AsyncIterator:
+        """
+        Серверный стрим с переподключением на временных ошибках.
+        Без дедлайна: подписка живёт, пока её не закроет вызывающий.
+        """
+        attempt = 0
+        reauthed = False
+        while True:
+            call = fn(request, metadata=self.metadata)
+            try:
+                async for msg in call:
+                    attempt = 0
+                    reauthed = False
+                    yield msg
+                return
+            except grpc.aio.AioRpcError as e:
+                if e.code() == grpc.StatusCode.UNAUTHENTICATED and not reauthed:
+                    # токен истёк на живом стриме — переподписываемся со свежим
+                    reauthed = True
+                    await self._reauthenticate()
+                    continue
+                attempt += 1
+                if e.code() not in RETRYABLE_CODES or attempt >= self.max_attempts:
+                    raise
+                delay = self._delay(attempt)
+                METRICS.inc(f"rpc.{method or method_name(fn)}.retries")
+                logger.warning("stream dropped (%s), reconnect in %.2fs", e.code().name, delay)
+                await asyncio.sleep(delay)
+            finally:
+                call.cancel()
+
+    # ------------------------- accounts -------------------------
+
+    async def get_account(self, *, timeout: Optional[float] = None):
+        req = accounts_service_pb2.GetAccountRequest(account_id=str(self.account_id))
+        return await self._unary(self.accounts.GetAccount, req, timeout=timeout)
+
+    async def get_trades_raw(self, limit: int = 100, days: int = 7, *, timeout: Optional[float] = None):
+        now = datetime.now(timezone.utc)
+        req = accounts_service_pb2.TradesRequest(
+            account_id=str(self.account_id),
+            limit=int(limit),
+            interval=make_interval(now - timedelta(days=int(days)), now),
+        )
+        return await self._unary(self.accounts.Trades, req, timeout=timeout)
+
+    async def get_transactions_raw(self, days: int = 7, limit: int = 100, *, timeout: Optional[float] = None):
+        now = datetime.now(timezone.utc)
+        req = accounts_service_pb2.TransactionsRequest(
+            account_id=str(self.account_id),
+            limit=int(limit),
+            interval=make_interval(now - timedelta(days=int(days)), now),
+        )
+        return await self._unary(self.accounts.Transactions, req, timeout=timeout)
+
+    # ------------------------- orders -------------------------
+
+    async def place_order(self, order, *, timeout: Optional[float] = None):
+        return await self._unary(self.orders.PlaceOrder, order, timeout=timeout)
+
+    async def get_orders(self, *, timeout: Optional[float] = None):
+        req = orders_service_pb2.OrdersRequest(account_id=str(self.account_id))
+        return await self._unary(self.orders.GetOrders, req, timeout=timeout)
+
+    async def get_order(self, order_id: str, *, timeout: Optional[float] = None):
+        req = orders_service_pb2.GetOrderRequest(account_id=str(self.account_id), order_id=str(order_id))
+        return await self._unary(self.orders.GetOrder, req, timeout=timeout)
+
+    async def cancel_order(self, order_id: str, *, timeout: Optional[float] = None):
+        req = orders_service_pb2.CancelOrderRequest(account_id=str(self.account_id), order_id=str(order_id))
+        return await self._unary(self.orders.CancelOrder, req, timeout=timeout)
+
+    def subscribe_orders(self) -> AsyncIterator:
+        req = orders_service_pb2.SubscribeOrdersRequest(account_id=str(self.account_id))
+        return self._stream(self.orders.SubscribeOrders, req)
+
+    def subscribe_trades(self) -> AsyncIterator:
+        req = orders_service_pb2.SubscribeTradesRequest(account_id=str(self.account_id))
+        return self._stream(self.orders.SubscribeTrades, req)
+
+    def subscribe_order_trade(
+        self, data_type: int = orders_service_pb2.OrderTradeRequest.DATA_TYPE_ALL
+    ) -> AsyncIterator:
+        """
+        Bidi SubscribeOrderTrade: ордера и сделки счёта одним стримом.
+        Поток запросов создаётся заново при каждом переподключении.
+        """
+        account_id = str(self.account_id)
+
+        async def requests():
+            yield orders_service_pb2.OrderTradeRequest(
+                action=orders_service_pb2.OrderTradeRequest.ACTION_SUBSCRIBE,
+                data_type=data_type,
+                account_id=account_id,
+            )
+            await asyncio.Event().wait()    # держим поток запросов открытым
+
+        def call(_request, metadata=None):
+            return self.orders.SubscribeOrderTrade(requests(), metadata=metadata)
+
+        return self._stream(call, None, method="SubscribeOrderTrade")
+
+    # ------------------------- assets -------------------------
+
+    async def get_exchanges(self, *, timeout: Optional[float] = None):
+        return await self._unary(self.assets.Exchanges, assets_service_pb2.ExchangesRequest(), timeout=timeout)
+
+    async def get_assets(self, *, timeout: Optional[float] = None):
+        return await self._unary(self.assets.Assets, assets_service_pb2.AssetsRequest(), timeout=timeout)
+
+    async def get_asset(self, symbol: str, *, timeout: Optional[float] = None):
+        req = assets_service_pb2.GetAssetRequest(symbol=symbol, account_id=str(self.account_id))
+        return await self._unary(self.assets.GetAsset, req, timeout=timeout)
+
+    async def get_schedule(self, symbol: str, *, timeout: Optional[float] = None):
+        req = assets_service_pb2.ScheduleRequest(symbol=symbol)
+        return await self._unary(self.assets.Schedule, req, timeout=timeout)
+
+    # ------------------------- market data -------------------------
+
+    async def get_bars(self, symbol: str, timeframe, start: datetime, end: datetime, *, timeout: Optional[float] = None):
+        req = marketdata_service_pb2.BarsRequest(
+            symbol=symbol,
+            timeframe=timeframe_to_proto(timeframe),
+            interval=make_interval(start, end),
+        )
+        return await self._unary(self.marketdata.Bars, req, timeout=timeout)
+
+    async def get_last_quote(self, symbol: str, *, timeout: Optional[float] = None):
+        req = marketdata_service_pb2.QuoteRequest(symbol=symbol)
+        return await self._unary(self.marketdata.LastQuote, req, timeout=timeout)
+
+    async def get_order_book(self, symbol: str, *, timeout: Optional[float] = None):
+        req = marketdata_service_pb2.OrderBookRequest(symbol=symbol)
+        return await self._unary(self.marketdata.OrderBook, req, timeout=timeout)
+
+    async def get_latest_trades(self, symbol: str, *, timeout: Optional[float] = None):
+        req = marketdata_service_pb2.LatestTradesRequest(symbol=symbol)
+        return await self._unary(self.marketdata.LatestTrades, req, timeout=timeout)
+
+    def subscribe_quotes(self, symbols: Iterable[str]) -> AsyncIterator:
+        req = marketdata_service_pb2.SubscribeQuoteRequest(symbols=list(symbols))
+        return self._stream(self.marketdata.SubscribeQuote, req)
+
+    def subscribe_order_book(self, symbol: str) -> AsyncIterator:
+        req = marketdata_service_pb2.SubscribeOrderBookRequest(symbol=symbol)
+        return self._stream(self.marketdata.SubscribeOrderBook, req)
+
+    def subscribe_latest_trades(self, symbol: str) -> AsyncIterator:
+        req = marketdata_service_pb2.SubscribeLatestTradesRequest(symbol=symbol)
+        return self._stream(self.marketdata.SubscribeLatestTrades, req)
+
+    def subscribe_bars(self, symbol: str, timeframe) -> AsyncIterator:
+        req = marketdata_service_pb2.SubscribeBarsRequest(symbol=symbol, timeframe=timeframe_to_proto(timeframe))
+        return self._stream(self.marketdata.SubscribeBars, req)
+
+    async def stream_candles(self, symbol: str, timeframe="M5") -> AsyncIterator[Candle]:
+        """
+        Совместимо с FinamGrpcClient.stream_candles (app.market_loop).
+        """
+        async for resp in self.subscribe_bars(symbol, timeframe):
+            for bar in resp.bars:
+                yield candle_from_proto(bar)
@@ -14,16 +14,38 @@ class Candle:
     timestamp: Optional[int] = None
 
 
+def _num(v) -> Optional[float]:
+    """
+    google.type.Decimal (value="...") или уже число.
+    """
+    if v is None:
+        return None
+    if hasattr(v, "value"):
+        return float(v.value or 0)
+    return float(v)
+
+
+def _ts(v) -> Optional[int]:
+    """
+    google.protobuf.Timestamp -> epoch seconds.
+    """
+    if v is None:
+        return None
+    if hasattr(v, "seconds"):
+        return int(v.seconds)
+    return int(v)
+
+
 def candle_from_proto(proto) -> Candle:
     """
-    Adapter: Finam gRPC Candle → internal Candle
+    Adapter: Finam gRPC Bar → internal Candle
     """
 
     return Candle(
-        open=proto.open,
-        high=proto.high,
-        low=proto.low,
-        close=proto.close,
-        volume=getattr(proto, "volume", None),
-        timestamp=getattr(proto, "timestamp", None),
+        open=_num(proto.open),
+        high=_num(proto.high),
+        low=_num(proto.low),
+        close=_num(proto.close),
+        volume=_num(getattr(proto, "volume", None)),
+        timestamp=_ts(getattr(proto, "timestamp", None)),
     )
@@ -13,6 +13,39 @@ def create_client():
     return FinamGrpcClient()
 
 
+def create_async_client(**kwargs):
+    """
+    REAL: AsyncFinamClient на grpc.aio (нужен await client.connect()).
+    JWT берётся из общего кэша TokenManager и обновляется в фоне.
+    """
+    from finam_bot.grpc.aio_client import AsyncFinamClient
+    from finam_bot.grpc.token_manager import TokenManager, grpc_auth_exchange
+
+    client = AsyncFinamClient(**kwargs)
+    if client.token_manager is None and not client.jwt_token and client.api_token:
+        client.token_manager = TokenManager(
+            client.api_token,
+            grpc_auth_exchange(client.host),
+            scope=client.host,
+        ).start()
+    return client
+
+
+def create_market_client():
+    """
+    Клиент рыночных данных для asyncio-цикла (app.market_loop):
+    REAL — AsyncFinamClient, TEST — FinamGrpcClient.
+    """
+    mode = os.getenv("MODE", "TEST").upper()
+    print("FACTORY MODE:", mode)
+
+    if mode == "REAL":
+        return create_async_client()
+
+    from finam_bot.grpc.finam_grpc_client import FinamGrpcClient
+    return FinamGrpcClient()
+
+
 # если где-то уже используется make_client — оставь совместимость
 def make_client():
     return create_client()
\ No newline at end of file
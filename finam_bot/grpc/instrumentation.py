@@ -0,0 +1,203 @@
+# finam_bot/grpc/instrumentation.py
+"""
+Клиентские интерцепторы gRPC: метрики по каждому методу.
+
+    grpc.<Method>                  латентность одной попытки (гистограмма)
+    grpc.<Method>.requests         число вызовов / открытых стримов
+    grpc.<Method>.errors           завершения с кодом != OK
+    grpc.<Method>.req_bytes        суммарный размер запросов (unary)
+    grpc.<Method>.resp_bytes       суммарный размер ответов (unary)
+    grpc.<Method>.stream_msgs      сообщений, принятых из стрима
+    grpc.<Method>.stream_rate      гейдж: сообщений/с за последнее окно
+
+Повторы считает вызывающий слой (resilience / AsyncFinamClient) —
+rpc.<Method>.retries в том же реестре. Экспорт — infra.exporters.
+
+Sync:  grpc.intercept_channel(channel, *client_interceptors())
+Aio:   grpc.aio.secure_channel(..., interceptors=aio_client_interceptors())
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional
+
+import grpc
+
+from finam_bot.infra.metrics import METRICS, MetricsRegistry
+
+RATE_WINDOW = 1.0      # сек, окно для stream_rate
+
+
+def _method(details) -> str:
+    m = details.method
+    if isinstance(m, bytes):
+        m = m.decode()
+    return m.rsplit("/", 1)[-1]
+
+
+class MetricsRecorder:
+    """
+    Общее ядро для sync / aio интерцепторов.
+    sizes=False — не считать ByteSize() (горячие пути).
+    """
+
+    def __init__(self, metrics: MetricsRegistry = METRICS, *, sizes: bool = True):
+        self.metrics = metrics
+        self.sizes = sizes
+        # method -> [начало окна, сообщений в окне]
+        self._windows: Dict[str, list] = {}
+
+    def started(self, method: str, request=None) -> float:
+        m = self.metrics
+        m.inc(f"grpc.{method}.requests")
+        if self.sizes and request is not None:
+            m.inc(f"grpc.{method}.req_bytes", request.ByteSize())
+        return time.perf_counter()
+
+    def finished(self, method: str, t0: float, code, response=None) -> None:
+        m = self.metrics
+        m.histogram(f"grpc.{method}").observe(time.perf_counter() - t0)
+        if code != grpc.StatusCode.OK:
+            m.inc(f"grpc.{method}.errors")
+        elif self.sizes and response is not None:
+            m.inc(f"grpc.{method}.resp_bytes", response.ByteSize())
+
+    def message(self, method: str) -> None:
+        self.metrics.inc(f"grpc.{method}.stream_msgs")
+        now = time.monotonic()
+        w = self._windows.get(method)
+        if w is None:
+            self._windows[method] = [now, 1]
+            return
+        w[1] += 1
+        elapsed = now - w[0]
+        if elapsed >= RATE_WINDOW:
+            self.metrics.set_gauge(f"grpc.{method}.stream_rate", w[1] / elapsed)
+            w[0], w[1] = now, 0
+
+
+# ------------------------- sync -------------------------
+
+class _CountingStream:
+    """
+    Итератор ответов стрима + делегирование методов Call (cancel, code, ...).
+    """
+
+    def __init__(self, call, recorder: MetricsRecorder, method: str, t0: float):
+        self._call = call
+        self._recorder = recorder
+        self._method = method
+        self._t0 = t0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            msg = next(self._call)
+        except StopIteration:
+            self._recorder.finished(self._method, self._t0, grpc.StatusCode.OK)
+            raise
+        except grpc.RpcError as e:
+            self._recorder.finished(self._method, self._t0, e.code())
+            raise
+        self._recorder.message(self._method)
+        return msg
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class MetricsClientInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    def __init__(self, recorder: Optional[MetricsRecorder] = None):
+        self.recorder = recorder or MetricsRecorder()
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method(client_call_details)
+        t0 = self.recorder.started(method, request)
+        outcome = continuation(client_call_details, request)
+
+        def _done(f):
+            code = f.code()
+            self.recorder.finished(method, t0, code, f.result() if code == grpc.StatusCode.OK else None)
+
+        outcome.add_done_callback(_done)
+        return outcome
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method(client_call_details)
+        t0 = self.recorder.started(method)
+        return _CountingStream(continuation(client_call_details, request), self.recorder, method, t0)
+
+
+def client_interceptors(metrics: MetricsRegistry = METRICS, *, sizes: bool = True) -> List:
+    return [MetricsClientInterceptor(MetricsRecorder(metrics, sizes=sizes))]
+
+
+# ------------------------- aio -------------------------
+
+class _AioStreamMixin:
+    recorder: MetricsRecorder
+
+    async def _iterate(self, call, method: str, t0: float):
+        code = grpc.StatusCode.OK
+        try:
+            async for msg in call:
+                self.recorder.message(method)
+                yield msg
+        except grpc.aio.AioRpcError as e:
+            code = e.code()
+            raise
+        except BaseException:
+            code = grpc.StatusCode.CANCELLED
+            raise
+        finally:
+            self.recorder.finished(method, t0, code)
+
+
+class AioMetricsUnaryUnary(grpc.aio.UnaryUnaryClientInterceptor):
+    def __init__(self, recorder: MetricsRecorder):
+        self.recorder = recorder
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method(client_call_details)
+        t0 = self.recorder.started(method, request)
+        call = await continuation(client_call_details, request)
+        try:
+            response = await call
+        except grpc.aio.AioRpcError as e:
+            self.recorder.finished(method, t0, e.code())
+            return call         # вызывающий получит ту же ошибку при await
+        self.recorder.finished(method, t0, grpc.StatusCode.OK, response)
+        return call
+
+
+class AioMetricsUnaryStream(_AioStreamMixin, grpc.aio.UnaryStreamClientInterceptor):
+    def __init__(self, recorder: MetricsRecorder):
+        self.recorder = recorder
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method(client_call_details)
+        t0 = self.recorder.started(method)
+        call = await continuation(client_call_details, request)
+        return self._iterate(call, method, t0)
+
+
+class AioMetricsStreamStream(_AioStreamMixin, grpc.aio.StreamStreamClientInterceptor):
+    def __init__(self, recorder: MetricsRecorder):
+        self.recorder = recorder
+
+    async def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        method = _method(client_call_details)
+        t0 = self.recorder.started(method)
+        call = await continuation(client_call_details, request_iterator)
+        return self._iterate(call, method, t0)
+
+
+def aio_client_interceptors(metrics: MetricsRegistry = METRICS, *, sizes: bool = True) -> List:
+    recorder = MetricsRecorder(metrics, sizes=sizes)
+    return [
+        AioMetricsUnaryUnary(recorder),
+        AioMetricsUnaryStream(recorder),
+        AioMetricsStreamStream(recorder),
+    ]
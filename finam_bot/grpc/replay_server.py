@@ -0,0 +1,814 @@
+# finam_bot/grpc/replay_server.py
+"""
+Локальный replay-сервер Finam Trade API (Auth / MarketData / Orders)
+для офлайн-бенчмарка живого контура без sandbox.
+
+Данные — каталог бинарных файлов candle_store:
+    <symbol>.<TF>.candles   бары (CANDLE_DTYPE), например SBER@MISX.M1.candles
+    <symbol>.ticks          лента сделок (TICK_DTYPE)
+    <symbol>.book           инкрементальный стакан (BOOK_DTYPE), необязательно
+
+- один драйвер проигрывает общую временную шкалу всех файлов со скоростью
+  1x / Nx / максимальной (speed=None) и раздаёт сообщения подписчикам,
+  поэтому бары, сделки, стакан, котировки и исполнения согласованы по времени
+- бар уходит в SubscribeBars в момент закрытия (ts + длительность TF)
+- сделки с одинаковым ts одного символа идут одним сообщением
+- без .book стакан выводится из ленты: агрессор SELL -> строка buy_size
+  по цене сделки, BUY -> sell_size; bid/ask котировки — так же
+- очереди подписчиков ограничены: медленный клиент тормозит проигрывание
+  (backpressure), а не теряет сообщения
+- заявки: ack ORDER_STATUS_NEW, MARKET исполняется по last,
+  LIMIT — по цене лимита на первой сделке, которая её пересекла;
+  исполнение всегда полное, прочие типы отклоняются (REJECTED)
+
+    server = ReplayServer(ReplayData.from_dir("data/replay"), speed=10)
+    port = await server.start()
+    ... клиент подписывается на 127.0.0.1:port ...
+    await server.wait_subscribers(1)
+    server.play()
+    await server.join()
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import grpc
+import numpy as np
+from google.protobuf import timestamp_pb2
+from google.type import decimal_pb2
+
+from finam_bot.backtest.candle_store import load_book, load_candles_array, load_ticks
+from finam_bot.backtest.resample import TIMEFRAME_SECONDS
+from finam_bot.core.orderflow_accumulator import SIDE_BUY, SIDE_SELL
+from finam_bot.grpc.aio_client import TIMEFRAMES, timeframe_to_proto
+from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2, trade_pb2
+from finam_bot.grpc_api.grpc.tradeapi.v1.auth import auth_service_pb2, auth_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2 as md
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2 as od
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+# TimeFrame enum -> "M1" / "H1" ...
+_TF_NAMES = {v: k for k, v in TIMEFRAMES.items()}
+
+_ROW = md.StreamOrderBook.Row
+_PROTO_SIDE = {SIDE_BUY: side_pb2.SIDE_BUY, SIDE_SELL: side_pb2.SIDE_SELL}
+
+# порядок событий с одинаковым ts: стакан, закрытие бара, сделки
+EVENT_BOOK, EVENT_BAR, EVENT_TICK = 0, 1, 2
+
+
+def _dec(x: float) -> decimal_pb2.Decimal:
+    return decimal_pb2.Decimal(value=repr(float(x)))
+
+
+def _ts(t: float) -> timestamp_pb2.Timestamp:
+    sec = int(t // 1)
+    return timestamp_pb2.Timestamp(seconds=sec, nanos=int(round((t - sec) * 1e9)) % 1_000_000_000)
+
+
+def _tf_name(tf) -> str:
+    return _TF_NAMES[timeframe_to_proto(tf)]
+
+
+# ------------------------- data -------------------------
+
+@dataclass
+class ReplayData:
+    bars: Dict[Tuple[str, str], np.ndarray] = field(default_factory=dict)   # (symbol, "M1") -> CANDLE_DTYPE
+    ticks: Dict[str, np.ndarray] = field(default_factory=dict)              # symbol -> TICK_DTYPE
+    book: Dict[str, np.ndarray] = field(default_factory=dict)               # symbol -> BOOK_DTYPE
+
+    @classmethod
+    def from_dir(cls, root) -> "ReplayData":
+        data = cls()
+        for path in sorted(Path(root).iterdir()):
+            if path.suffix == ".candles":
+                symbol, _, tf = path.stem.rpartition(".")
+                if not symbol:
+                    raise ValueError(f"Candle file name must be <symbol>.<TF>.candles: {path}")
+                data.bars[(symbol, _tf_name(tf))] = load_candles_array(path)
+            elif path.suffix == ".ticks":
+                data.ticks[path.stem] = load_ticks(path)
+            elif path.suffix == ".book":
+                data.book[path.stem] = load_book(path)
+        return data
+
+    @property
+    def symbols(self) -> List[str]:
+        out = {s for s, _ in self.bars} | set(self.ticks) | set(self.book)
+        return sorted(out)
+
+
+# ------------------------- clock -------------------------
+
+class ReplayClock:
+    """
+    Отображение времени данных на wall clock.
+    speed=1 — реальное время, N — в N раз быстрее, None / 0 — без пауз.
+    """
+
+    def __init__(self, speed: Optional[float] = 1.0):
+        self.speed = float(speed) if speed else None
+        self._t0: Optional[float] = None
+        self._wall0 = 0.0
+        self.max_lag = 0.0      # насколько драйвер отставал от расписания, сек
+
+    def reset(self) -> None:
+        self._t0 = None
+        self.max_lag = 0.0
+
+    async def wait(self, data_ts: float) -> None:
+        if self.speed is None:
+            await asyncio.sleep(0)
+            return
+        if self._t0 is None:
+            self._t0 = data_ts
+            self._wall0 = time.monotonic()
+            return
+
+        delay = (data_ts - self._t0) / self.speed - (time.monotonic() - self._wall0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif -delay > self.max_lag:
+            self.max_lag = -delay
+
+
+# ------------------------- market state -------------------------
+
+class _SymbolState:
+    __slots__ = ("ts", "last", "last_size", "bid", "bid_size", "ask", "ask_size", "volume", "levels", "tick_pos")
+
+    def __init__(self):
+        self.ts = 0.0
+        self.last = 0.0
+        self.last_size = 0.0
+        self.bid = 0.0
+        self.bid_size = 0.0
+        self.ask = 0.0
+        self.ask_size = 0.0
+        self.volume = 0.0
+        self.levels: Dict[float, Tuple[float, float]] = {}   # price -> (buy_size, sell_size)
+        self.tick_pos = 0                                   # сколько сделок уже проиграно
+
+    def quote(self, symbol: str) -> md.Quote:
+        return md.Quote(
+            symbol=symbol,
+            timestamp=_ts(self.ts),
+            bid=_dec(self.bid),
+            bid_size=_dec(self.bid_size),
+            ask=_dec(self.ask),
+            ask_size=_dec(self.ask_size),
+            last=_dec(self.last),
+            last_size=_dec(self.last_size),
+            volume=_dec(self.volume),
+        )
+
+
+# ------------------------- exchange (orders) -------------------------
+
+class ReplayExchange:
+    """
+    Имитация исполнения заявок по проигрываемой ленте.
+    Слушатели получают ("orders", OrderState) / ("trades", AccountTrade).
+    """
+
+    def __init__(self, market: Dict[str, _SymbolState], account_id: str = "REPLAY"):
+        self.market = market
+        self.account_id = account_id
+        self.now = 0.0
+        self.orders: Dict[str, od.OrderState] = {}
+        self._working: Dict[str, Dict[str, od.OrderState]] = defaultdict(dict)
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self.listeners: List[asyncio.Queue] = []
+
+    def _publish(self, kind: str, msg) -> None:
+        for q in self.listeners:
+            q.put_nowait((kind, msg))
+
+    def _snapshot(self, state: od.OrderState) -> od.OrderState:
+        out = od.OrderState()
+        out.CopyFrom(state)
+        return out
+
+    def place(self, order: od.Order) -> od.OrderState:
+        order_id = f"R{next(self._order_ids)}"
+        qty = float(order.quantity.value or 0)
+        state = od.OrderState(
+            order_id=order_id,
+            order=order,
+            accept_at=_ts(self.now),
+            transact_at=_ts(self.now),
+            initial_quantity=_dec(qty),
+            executed_quantity=_dec(0),
+            remaining_quantity=_dec(qty),
+        )
+        if not state.order.account_id:
+            state.order.account_id = self.account_id
+        self.orders[order_id] = state
+
+        market = self.market.get(order.symbol)
+        if (
+            market is None
+            or qty <= 0
+            or order.side not in (side_pb2.SIDE_BUY, side_pb2.SIDE_SELL)
+            or order.type not in (od.ORDER_TYPE_MARKET, od.ORDER_TYPE_LIMIT)
+        ):
+            state.status = od.ORDER_STATUS_REJECTED
+            state.withdraw_at.CopyFrom(_ts(self.now))
+            ack = self._snapshot(state)
+            self._publish("orders", ack)
+            return ack
+
+        state.status = od.ORDER_STATUS_NEW
+        ack = self._snapshot(state)
+        self._publish("orders", ack)
+
+        price = self._marketable_price(state, market)
+        if price is None:
+            self._working[order.symbol][order_id] = state
+        else:
+            self._fill(state, price, self.now)
+        return ack
+
+    def _marketable_price(self, state: od.OrderState, market: _SymbolState) -> Optional[float]:
+        if market.last <= 0:
+            return None                  # цены ещё нет
+        order = state.order
+        if order.type == od.ORDER_TYPE_MARKET:
+            return market.last
+        limit = float(order.limit_price.value)
+        if order.side == side_pb2.SIDE_BUY:
+            return market.last if market.last <= limit else None
+        return market.last if market.last >= limit else None
+
+    def cancel(self, order_id: str) -> Optional[od.OrderState]:
+        state = self.orders.get(order_id)
+        if state is None:
+            return None
+        working = self._working.get(state.order.symbol, {})
+        if working.pop(order_id, None) is not None:
+            state.status = od.ORDER_STATUS_CANCELED
+            state.withdraw_at.CopyFrom(_ts(self.now))
+            state.transact_at.CopyFrom(_ts(self.now))
+            self._publish("orders", self._snapshot(state))
+        return self._snapshot(state)
+
+    def on_ticks(self, symbol: str, ticks: np.ndarray) -> None:
+        working = self._working.get(symbol)
+        if not working:
+            return
+        prices = ticks["price"]
+        for order_id, state in list(working.items()):
+            order = state.order
+            if order.type == od.ORDER_TYPE_MARKET:
+                idx, price = 0, float(prices[0])
+            else:
+                limit = float(order.limit_price.value)
+                hit = prices <= limit if order.side == side_pb2.SIDE_BUY else prices >= limit
+                if not hit.any():
+                    continue
+                idx, price = int(np.argmax(hit)), limit
+            del working[order_id]
+            self._fill(state, price, float(ticks["ts"][idx]))
+
+    def _fill(self, state: od.OrderState, price: float, ts: float) -> None:
+        order = state.order
+        trade_id = f"RT{next(self._trade_ids)}"
+
+        state.status = od.ORDER_STATUS_FILLED
+        state.exec_id = trade_id
+        state.executed_quantity.CopyFrom(state.initial_quantity)
+        state.remaining_quantity.CopyFrom(_dec(0))
+        state.transact_at.CopyFrom(_ts(ts))
+        self._publish("orders", self._snapshot(state))
+
+        self._publish(
+            "trades",
+            trade_pb2.AccountTrade(
+                trade_id=trade_id,
+                symbol=order.symbol,
+                price=_dec(price),
+                size=state.initial_quantity,
+                side=order.side,
+                timestamp=_ts(ts),
+                order_id=state.order_id,
+                account_id=order.account_id,
+                comment=order.comment,
+            ),
+        )
+
+
+# ------------------------- servicers -------------------------
+
+class ReplayAuthServicer(auth_service_pb2_grpc.AuthServiceServicer):
+    async def Auth(self, request, context):
+        return auth_service_pb2.AuthResponse(token="replay")
+
+
+class ReplayMarketDataServicer(marketdata_service_pb2_grpc.MarketDataServiceServicer):
+    def __init__(self, server: "ReplayServer"):
+        self.server = server
+
+    async def _state(self, symbol: str, context) -> _SymbolState:
+        state = self.server.market.get(symbol)
+        if state is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"no replay data for {symbol}")
+        return state
+
+    async def Bars(self, request, context):
+        """
+        История из записанных баров в пределах interval (без учёта позиции драйвера).
+        """
+        key = (request.symbol, _TF_NAMES.get(request.timeframe, ""))
+        arr = self.server.data.bars.get(key)
+        if arr is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"no replay bars for {key}")
+
+        ts = arr["ts"]
+        mask = np.ones(len(arr), dtype=bool)
+        if request.interval.HasField("start_time"):
+            mask &= ts >= request.interval.start_time.seconds
+        if request.interval.HasField("end_time"):
+            mask &= ts < request.interval.end_time.seconds
+        return md.BarsResponse(symbol=request.symbol, bars=[_bar(r) for r in arr[mask]])
+
+    async def LastQuote(self, request, context):
+        state = await self._state(request.symbol, context)
+        return md.QuoteResponse(symbol=request.symbol, quote=state.quote(request.symbol))
+
+    async def OrderBook(self, request, context):
+        state = await self._state(request.symbol, context)
+        rows = [
+            md.OrderBook.Row(
+                price=_dec(price),
+                **({"buy_size": _dec(buy)} if buy else {"sell_size": _dec(sell)}),
+                action=md.OrderBook.Row.ACTION_UPDATE,
+                timestamp=_ts(state.ts),
+            )
+            for price, (buy, sell) in sorted(state.levels.items(), reverse=True)
+        ]
+        return md.OrderBookResponse(symbol=request.symbol, orderbook=md.OrderBook(rows=rows))
+
+    async def LatestTrades(self, request, context):
+        state = await self._state(request.symbol, context)
+        ticks = self.server.data.ticks.get(request.symbol)
+        if ticks is None:
+            return md.LatestTradesResponse(symbol=request.symbol)
+        lo = max(0, state.tick_pos - self.server.latest_trades)
+        return md.LatestTradesResponse(symbol=request.symbol, trades=_trades(request.symbol, ticks, lo, state.tick_pos))
+
+    async def _serve(self, keys, context):
+        q = self.server._subscribe(keys)
+        try:
+            while True:
+                msg = await q.get()
+                if msg is None:
+                    return
+                yield msg
+        finally:
+            self.server._unsubscribe(keys, q)
+
+    async def SubscribeBars(self, request, context):
+        key = ("bars", request.symbol, _TF_NAMES.get(request.timeframe, ""))
+        if key[1:] not in self.server.data.bars:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"no replay bars for {key[1:]}")
+        async for msg in self._serve([key], context):
+            yield msg
+
+    async def SubscribeLatestTrades(self, request, context):
+        await self._state(request.symbol, context)
+        async for msg in self._serve([("trades", request.symbol)], context):
+            yield msg
+
+    async def SubscribeOrderBook(self, request, context):
+        await self._state(request.symbol, context)
+        async for msg in self._serve([("book", request.symbol)], context):
+            yield msg
+
+    async def SubscribeQuote(self, request, context):
+        for s in request.symbols:
+            await self._state(s, context)
+        async for msg in self._serve([("quote", s) for s in request.symbols], context):
+            yield msg
+
+
+class ReplayOrdersServicer(orders_service_pb2_grpc.OrdersServiceServicer):
+    def __init__(self, exchange: ReplayExchange):
+        self.exchange = exchange
+
+    async def PlaceOrder(self, request, context):
+        return self.exchange.place(request)
+
+    async def CancelOrder(self, request, context):
+        state = self.exchange.cancel(request.order_id)
+        if state is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"order {request.order_id} not found")
+        return state
+
+    async def GetOrders(self, request, context):
+        return od.OrdersResponse(orders=list(self.exchange.orders.values()))
+
+    async def GetOrder(self, request, context):
+        state = self.exchange.orders.get(request.order_id)
+        if state is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"order {request.order_id} not found")
+        return state
+
+    async def _events(self, wanted: set):
+        q: asyncio.Queue = asyncio.Queue()
+        self.exchange.listeners.append(q)
+        try:
+            while True:
+                kind, msg = await q.get()
+                if kind is None:
+                    return
+                if kind in wanted:
+                    yield kind, msg
+        finally:
+            self.exchange.listeners.remove(q)
+
+    async def SubscribeOrders(self, request, context):
+        async for _, msg in self._events({"orders"}):
+            yield od.SubscribeOrdersResponse(orders=[msg])
+
+    async def SubscribeTrades(self, request, context):
+        async for _, msg in self._events({"trades"}):
+            yield od.SubscribeTradesResponse(trades=[msg])
+
+    async def SubscribeOrderTrade(self, request_iterator, context):
+        wanted: set = set()
+        types = {
+            od.OrderTradeRequest.DATA_TYPE_ALL: {"orders", "trades"},
+            od.OrderTradeRequest.DATA_TYPE_ORDERS: {"orders"},
+            od.OrderTradeRequest.DATA_TYPE_TRADES: {"trades"},
+        }
+
+        async def read_requests():
+            async for req in request_iterator:
+                if req.action == od.OrderTradeRequest.ACTION_SUBSCRIBE:
+                    wanted.update(types.get(req.data_type, ()))
+                else:
+                    wanted.difference_update(types.get(req.data_type, ()))
+
+        reader = asyncio.create_task(read_requests())
+        try:
+            # фильтр — по текущему (изменяемому) набору wanted
+            async for kind, msg in self._events({"orders", "trades"}):
+                if kind not in wanted:
+                    continue
+                if kind == "orders":
+                    yield od.OrderTradeResponse(orders=[msg])
+                else:
+                    yield od.OrderTradeResponse(trades=[msg])
+        finally:
+            reader.cancel()
+
+
+# ------------------------- proto builders -------------------------
+
+def _bar(r) -> md.Bar:
+    return md.Bar(
+        timestamp=_ts(float(r["ts"])),
+        open=_dec(r["open"]),
+        high=_dec(r["high"]),
+        low=_dec(r["low"]),
+        close=_dec(r["close"]),
+        volume=_dec(r["volume"]),
+    )
+
+
+def _trades(symbol: str, ticks: np.ndarray, lo: int, hi: int) -> List[md.Trade]:
+    out = []
+    for i in range(lo, hi):
+        ts, price, qty, side = ticks[i].tolist()
+        out.append(
+            md.Trade(
+                trade_id=f"{symbol}:{i}",
+                timestamp=_ts(ts),
+                price=_dec(price),
+                size=_dec(qty),
+                side=_PROTO_SIDE.get(side, side_pb2.SIDE_UNSPECIFIED),
+            )
+        )
+    return out
+
+
+# ------------------------- server -------------------------
+
+class ReplayServer:
+    """
+    grpc.aio сервер + драйвер проигрывания.
+    Подписки, открытые после окончания данных, сразу завершаются.
+    """
+
+    def __init__(
+        self,
+        data: ReplayData,
+        *,
+        speed: Optional[float] = 1.0,
+        queue_size: int = 10_000,
+        account_id: str = "REPLAY",
+        latest_trades: int = 100,
+    ):
+        self.data = data
+        self.clock = ReplayClock(speed)
+        self.queue_size = int(queue_size)
+        self.latest_trades = int(latest_trades)
+
+        self.market: Dict[str, _SymbolState] = {s: _SymbolState() for s in data.symbols}
+        self.exchange = ReplayExchange(self.market, account_id)
+
+        self._subs: Dict[tuple, List[asyncio.Queue]] = defaultdict(list)
+        self._sub_count = 0
+        self._sub_changed = asyncio.Event()
+        self._server: Optional[grpc.aio.Server] = None
+        self._driver: Optional[asyncio.Task] = None
+        self.done = False
+
+        self.events = 0
+        self.messages = 0
+
+    # --- grpc ---
+
+    async def start(self, address: str = "127.0.0.1:0") -> int:
+        server = grpc.aio.server()
+        auth_service_pb2_grpc.add_AuthServiceServicer_to_server(ReplayAuthServicer(), server)
+        marketdata_service_pb2_grpc.add_MarketDataServiceServicer_to_server(ReplayMarketDataServicer(self), server)
+        orders_service_pb2_grpc.add_OrdersServiceServicer_to_server(ReplayOrdersServicer(self.exchange), server)
+        port = server.add_insecure_port(address)
+        await server.start()
+        self._server = server
+        return port
+
+    async def stop(self, grace: Optional[float] = None) -> None:
+        if self._driver is not None:
+            self._driver.cancel()
+            await asyncio.gather(self._driver, return_exceptions=True)
+        self._finish()
+        for q in self.exchange.listeners:
+            q.put_nowait((None, None))
+        if self._server is not None:
+            await self._server.stop(grace)
+            self._server = None
+
+    # --- subscriptions ---
+
+    def _subscribe(self, keys) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        if self.done:
+            q.put_nowait(None)
+            return q
+        for key in keys:
+            self._subs[key].append(q)
+        self._sub_count += 1
+        self._sub_changed.set()
+        return q
+
+    def _unsubscribe(self, keys, q: asyncio.Queue) -> None:
+        removed = False
+        for key in keys:
+            subs = self._subs.get(key)
+            if subs and q in subs:
+                subs.remove(q)
+                removed = True
+        if removed:
+            self._sub_count -= 1
+            self._sub_changed.set()
+
+    async def wait_subscribers(self, n: int = 1, timeout: float = 5.0) -> None:
+        """
+        Ждём, пока клиенты откроют n стримов рыночных данных (до play()).
+        """
+        async def _wait():
+            while self._sub_count < n:
+                self._sub_changed.clear()
+                await self._sub_changed.wait()
+
+        await asyncio.wait_for(_wait(), timeout)
+
+    async def _send(self, key: tuple, msg) -> None:
+        for q in self._subs.get(key, ()):
+            await q.put(msg)
+            self.messages += 1
+
+    def _finish(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        for subs in self._subs.values():
+            for q in subs:
+                # конец данных: освобождаем место под sentinel, если клиент отстал
+                while q.full():
+                    q.get_nowait()
+                q.put_nowait(None)
+
+    # --- driver ---
+
+    def play(self) -> asyncio.Task:
+        if self._driver is not None:
+            raise RuntimeError("replay already started")
+        self._driver = asyncio.create_task(self._run(), name="replay-driver")
+        return self._driver
+
+    async def join(self) -> None:
+        if self._driver is not None:
+            await self._driver
+
+    def _timeline(self):
+        """
+        Склеивает все ряды в одну шкалу: (ts, kind, series, row), отсортировано
+        по ts, затем kind, затем series — строки одной группы идут подряд.
+        """
+        series: List[Tuple[int, tuple, np.ndarray]] = []
+        parts = []
+        for (symbol, tf), arr in self.data.bars.items():
+            emit = arr["ts"].astype(np.float64) + TIMEFRAME_SECONDS.get(tf, 0)
+            parts.append((emit, EVENT_BAR, len(series)))
+            series.append((EVENT_BAR, (symbol, tf), arr))
+        for symbol, arr in self.data.ticks.items():
+            parts.append((arr["ts"], EVENT_TICK, len(series)))
+            series.append((EVENT_TICK, (symbol,), arr))
+        for symbol, arr in self.data.book.items():
+            parts.append((arr["ts"], EVENT_BOOK, len(series)))
+            series.append((EVENT_BOOK, (symbol,), arr))
+
+        if not parts:
+            empty = np.empty(0)
+            return series, empty, empty, empty, empty
+
+        ts = np.concatenate([p[0] for p in parts])
+        kind = np.concatenate([np.full(len(p[0]), p[1], dtype=np.int8) for p in parts])
+        sid = np.concatenate([np.full(len(p[0]), p[2], dtype=np.int32) for p in parts])
+        row = np.concatenate([np.arange(len(p[0]), dtype=np.int64) for p in parts])
+
+        order = np.lexsort((row, sid, kind, ts))
+        return series, ts[order], kind[order], sid[order], row[order]
+
+    async def _run(self) -> None:
+        series, ts, kind, sid, row = self._timeline()
+        self.clock.reset()
+        try:
+            n = len(ts)
+            if n:
+                change = np.ones(n, dtype=bool)
+                change[1:] = (ts[1:] != ts[:-1]) | (kind[1:] != kind[:-1]) | (sid[1:] != sid[:-1])
+                starts = np.flatnonzero(change).tolist()
+                ends = starts[1:] + [n]
+                for s, e in zip(starts, ends):
+                    t = float(ts[s])
+                    await self.clock.wait(t)
+                    self.exchange.now = t
+                    self.events += e - s
+
+                    k, key, arr = series[int(sid[s])]
+                    chunk = arr[int(row[s]):int(row[e - 1]) + 1]
+                    if k == EVENT_TICK:
+                        await self._on_ticks(key[0], int(row[s]), chunk, t)
+                    elif k == EVENT_BAR:
+                        await self._on_bars(key, chunk)
+                    else:
+                        await self._on_book(key[0], chunk, t)
+        finally:
+            self._finish()
+        logger.info("replay finished: events=%s messages=%s max_lag=%.3fs", self.events, self.messages, self.clock.max_lag)
+
+    async def _on_bars(self, key: tuple, chunk: np.ndarray) -> None:
+        symbol, tf = key
+        if symbol not in self.data.ticks:
+            # без ленты last берём из закрытия бара (для MARKET заявок)
+            state = self.market[symbol]
+            state.last = float(chunk["close"][-1])
+            state.ts = self.exchange.now
+        sub_key = ("bars", symbol, tf)
+        if self._subs.get(sub_key):
+            await self._send(sub_key, md.SubscribeBarsResponse(symbol=symbol, bars=[_bar(r) for r in chunk]))
+
+    async def _on_ticks(self, symbol: str, lo: int, chunk: np.ndarray, t: float) -> None:
+        state = self.market[symbol]
+        derive_book = symbol not in self.data.book
+        rows = []
+
+        for _, price, qty, side in chunk.tolist():
+            state.last = price
+            state.last_size = qty
+            state.volume += qty
+            if side == SIDE_SELL:
+                state.bid, state.bid_size = price, qty
+            elif side == SIDE_BUY:
+                state.ask, state.ask_size = price, qty
+
+            if derive_book and side in (SIDE_BUY, SIDE_SELL):
+                if side == SIDE_SELL:
+                    state.levels[price] = (qty, 0.0)
+                    size = {"buy_size": _dec(qty)}
+                else:
+                    state.levels[price] = (0.0, qty)
+                    size = {"sell_size": _dec(qty)}
+                rows.append(_ROW(price=_dec(price), action=_ROW.ACTION_UPDATE, timestamp=_ts(t), **size))
+
+        state.ts = t
+        state.tick_pos = lo + len(chunk)
+
+        self.exchange.on_ticks(symbol, chunk)
+
+        key = ("trades", symbol)
+        if self._subs.get(key):
+            trades = _trades(symbol, self.data.ticks[symbol], lo, state.tick_pos)
+            await self._send(key, md.SubscribeLatestTradesResponse(symbol=symbol, trades=trades))
+        if rows:
+            await self._send_book(symbol, rows)
+        await self._send_quote(symbol, state)
+
+    async def _on_book(self, symbol: str, chunk: np.ndarray, t: float) -> None:
+        state = self.market[symbol]
+        rows = []
+        for ts, price, buy, sell, action in chunk.tolist():
+            if action == _ROW.ACTION_REMOVE:
+                state.levels.pop(price, None)
+            else:
+                state.levels[price] = (buy, sell)
+            size = {"buy_size": _dec(buy)} if buy else {"sell_size": _dec(sell)}
+            rows.append(_ROW(price=_dec(price), action=action, timestamp=_ts(ts), **size))
+
+        bids = [p for p, (b, _) in state.levels.items() if b > 0]
+        asks = [p for p, (_, s) in state.levels.items() if s > 0]
+        if bids:
+            state.bid = max(bids)
+            state.bid_size = state.levels[state.bid][0]
+        if asks:
+            state.ask = min(asks)
+            state.ask_size = state.levels[state.ask][1]
+        state.ts = t
+
+        await self._send_book(symbol, rows)
+        await self._send_quote(symbol, state)
+
+    async def _send_book(self, symbol: str, rows) -> None:
+        key = ("book", symbol)
+        if self._subs.get(key):
+            book = md.StreamOrderBook(symbol=symbol, rows=rows)
+            await self._send(key, md.SubscribeOrderBookResponse(order_book=[book]))
+
+    async def _send_quote(self, symbol: str, state: _SymbolState) -> None:
+        key = ("quote", symbol)
+        if self._subs.get(key):
+            await self._send(key, md.SubscribeQuoteResponse(quote=[state.quote(symbol)]))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "events": self.events,
+            "messages": self.messages,
+            "subscribers": self._sub_count,
+            "orders": len(self.exchange.orders),
+            "max_lag": self.clock.max_lag,
+        }
+
+
+# ------------------------- cli -------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="finam_bot.grpc.replay_server")
+    p.add_argument("data_dir", help="Directory with <symbol>.<TF>.candles / <symbol>.ticks / <symbol>.book")
+    p.add_argument("--address", default="127.0.0.1:50051")
+    p.add_argument("--speed", type=float, default=1.0, help="1 = realtime, N = N times faster, 0 = max speed")
+    p.add_argument("--subscribers", type=int, default=1, help="Wait for N market data streams before replay")
+    p.add_argument("--wait", type=float, default=60.0, help="Seconds to wait for subscribers")
+    p.add_argument("--log", default="INFO")
+    return p
+
+
+async def _serve(args) -> None:
+    server = ReplayServer(ReplayData.from_dir(args.data_dir), speed=args.speed or None)
+    port = await server.start(args.address)
+    logger.info("replay server on port %s, symbols=%s", port, server.data.symbols)
+    try:
+        if args.subscribers > 0:
+            await server.wait_subscribers(args.subscribers, timeout=args.wait)
+        server.play()
+        await server.join()
+        logger.info("stats: %s", server.stats())
+    finally:
+        await server.stop(grace=1.0)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(list(argv) if argv is not None else None)
+    logging.basicConfig(level=getattr(logging, args.log.upper(), logging.INFO), format="%(levelname)s:%(name)s:%(message)s")
+    asyncio.run(_serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,283 @@
+# finam_bot/grpc/resilience.py
+"""
+Устойчивый слой вызова unary RPC для sync-клиента (FinamClient).
+
+- дедлайн на каждый метод (CallPolicy.deadline), общий бюджет на все попытки
+- повтор только на временных кодах (UNAVAILABLE / DEADLINE_EXCEEDED / ...),
+  backoff с full jitter
+- hedging для идемпотентных чтений (LastQuote / GetAccount / ...): если
+  ответа нет за hedge_delay, уходит второй запрос, берётся первый успешный
+- circuit breaker: после N подряд отказов по деградации API — fail fast
+  (CircuitOpenError) до истечения reset_timeout, затем одна пробная попытка
+- счётчики и гистограммы латентности по методам — в infra.metrics:
+    rpc.<Method>                 латентность вызова целиком (с повторами)
+    rpc.<Method>.calls / .errors / .retries / .hedged
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import grpc
+
+from finam_bot.infra.metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+})
+
+# коды, которые говорят о деградации API (а не об ошибке запроса)
+BREAKER_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.INTERNAL,
+})
+
+
+# ордер-мутирующие RPC: ответ мог потеряться после того, как брокер уже
+# применил запрос — повтор может задвоить заявку / действие. Без повторов
+# ни в sync (POLICIES), ни в async (AsyncFinamClient._unary) клиенте;
+# исход неизвестен — вызывающий сверяется через GetOrder / GetOrders.
+NO_RETRY_METHODS = frozenset({"PlaceOrder", "CancelOrder"})
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    deadline: float = 10.0                 # сек на весь вызов, включая повторы
+    max_attempts: int = 3
+    backoff: float = 0.2
+    max_backoff: float = 2.0
+    hedge_delay: Optional[float] = None    # только для идемпотентных методов
+
+
+DEFAULT_POLICY = CallPolicy()
+
+POLICIES: Dict[str, CallPolicy] = {
+    "Auth": CallPolicy(deadline=5.0),
+    "GetAccount": CallPolicy(deadline=5.0, hedge_delay=0.3),
+    "LastQuote": CallPolicy(deadline=2.0, hedge_delay=0.15),
+    "OrderBook": CallPolicy(deadline=2.0, hedge_delay=0.15),
+    "GetOrders": CallPolicy(deadline=5.0, hedge_delay=0.3),
+    "GetOrder": CallPolicy(deadline=3.0, hedge_delay=0.2),
+    "Bars": CallPolicy(deadline=15.0),
+    "Trades": CallPolicy(deadline=15.0),
+    "Transactions": CallPolicy(deadline=15.0),
+    # NO_RETRY_METHODS
+    "PlaceOrder": CallPolicy(deadline=5.0, max_attempts=1),
+    "CancelOrder": CallPolicy(deadline=5.0, max_attempts=1),
+}
+
+
+def method_name(fn) -> str:
+    """
+    '/grpc.tradeapi.v1.accounts.AccountsService/GetAccount' -> 'GetAccount'
+    """
+    raw = getattr(fn, "_method", None) or getattr(fn, "__name__", "rpc")
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    return str(raw).rsplit("/", 1)[-1]
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True      # одна пробная попытка
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+    def release(self) -> None:
+        """
+        Вызов завершился без вердикта о здоровье API (исключение вне gRPC) —
+        пробная попытка освобождается, состояние не меняется.
+        """
+        with self._lock:
+            self._trial = False
+
+
+class ResilientCaller:
+    """
+        rpc = ResilientCaller(lambda: client.metadata, on_unauthenticated=refresh)
+        rpc.call(stub.GetAccount, request)
+    """
+
+    def __init__(
+        self,
+        metadata: Callable[[], list],
+        *,
+        policies: Optional[Dict[str, CallPolicy]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        metrics: MetricsRegistry = METRICS,
+        on_unauthenticated: Optional[Callable[[], None]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.metadata = metadata
+        self.policies = dict(POLICIES if policies is None else policies)
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics
+        self.on_unauthenticated = on_unauthenticated
+        self.sleep = sleep
+        self.rng = rng
+
+    def policy(self, method: str) -> CallPolicy:
+        return self.policies.get(method, DEFAULT_POLICY)
+
+    def _delay(self, policy: CallPolicy, attempt: int) -> float:
+        # full jitter: U(0, min(cap, base * 2^n))
+        return self.rng() * min(policy.max_backoff, policy.backoff * (2 ** (attempt - 1)))
+
+    def call(self, fn, request, *, method: Optional[str] = None):
+        method = method or method_name(fn)
+        policy = self.policy(method)
+        m = self.metrics
+
+        if not self.breaker.allow():
+            m.inc(f"rpc.{method}.rejected")
+            raise CircuitOpenError(f"{method}: circuit open, API degraded")
+
+        m.inc(f"rpc.{method}.calls")
+        t0 = time.perf_counter()
+        deadline_at = time.monotonic() + policy.deadline
+        attempt = 0
+        reauthed = False
+        healthy: Optional[bool] = None     # вердикт для breaker; None — нет вердикта
+
+        try:
+            while True:
+                remaining = deadline_at - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise _DeadlineExceeded(method)
+                    if policy.hedge_delay is not None:
+                        resp = self._hedged(fn, request, method, policy.hedge_delay, remaining)
+                    else:
+                        resp = fn(request, metadata=self.metadata(), timeout=remaining)
+                except grpc.RpcError as e:
+                    code = e.code()
+                    if code == grpc.StatusCode.UNAUTHENTICATED and self.on_unauthenticated and not reauthed:
+                        reauthed = True
+                        self.on_unauthenticated()
+                        continue
+
+                    attempt += 1
+                    retry = code in RETRYABLE_CODES and attempt < policy.max_attempts
+                    delay = self._delay(policy, attempt) if retry else 0.0
+                    if retry and time.monotonic() + delay < deadline_at:
+                        m.inc(f"rpc.{method}.retries")
+                        logger.warning("%s attempt %s failed (%s), retry in %.2fs", method, attempt, code.name, delay)
+                        self.sleep(delay)
+                        continue
+
+                    m.inc(f"rpc.{method}.errors")
+                    m.histogram(f"rpc.{method}").observe(time.perf_counter() - t0)
+                    # NOT_FOUND / INVALID_ARGUMENT / ... — API ответил, он жив
+                    healthy = code not in BREAKER_CODES
+                    raise
+
+                healthy = True
+                m.histogram(f"rpc.{method}").observe(time.perf_counter() - t0)
+                return resp
+        finally:
+            # пробная попытка half-open освобождается при любом исходе
+            if healthy is True:
+                self.breaker.record_success()
+            elif healthy is False:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+
+    def _hedged(self, fn, request, method: str, hedge_delay: float, timeout: float):
+        """
+        Первый запрос; если за hedge_delay нет ответа — второй такой же.
+        Возвращает первый успешный, иначе поднимает ошибку последнего.
+        """
+        done = threading.Event()
+        calls = [fn.future(request, metadata=self.metadata(), timeout=timeout)]
+        calls[0].add_done_callback(lambda _f: done.set())
+
+        if not done.wait(min(hedge_delay, timeout)):
+            self.metrics.inc(f"rpc.{method}.hedged")
+            hedge = fn.future(request, metadata=self.metadata(), timeout=max(timeout - hedge_delay, 0.001))
+            hedge.add_done_callback(lambda _f: done.set())
+            calls.append(hedge)
+
+        while True:
+            done.wait()
+            done.clear()
+            finished = [c for c in calls if c.done()]
+            for c in finished:
+                if c.exception() is None:
+                    for other in calls:
+                        if other is not c:
+                            other.cancel()
+                    return c.result()
+            if len(finished) == len(calls):
+                return calls[-1].result()     # все упали — поднимет RpcError
+
+
+class _DeadlineExceeded(grpc.RpcError):
+    """
+    Бюджет дедлайна исчерпан до очередной попытки.
+    """
+
+    def __init__(self, method: str):
+        super().__init__(f"{method}: deadline exceeded")
+
+    def code(self):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+
+    def details(self):
+        return str(self)
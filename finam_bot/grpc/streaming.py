@@ -0,0 +1,359 @@
+# finam_bot/grpc/streaming.py
+"""
+Стриминг рыночных данных: SubscribeBars / SubscribeLatestTrades /
+SubscribeOrderBook / SubscribeQuote -> компактные записи -> очереди по символам.
+
+- одна подписка SubscribeQuote на все символы (repeated symbols),
+  остальные стримы — по одному на символ, все через общий канал клиента
+- protobuf разбирается сразу в slotted-записи (float / int, без Decimal)
+- каждая очередь ограничена maxsize, при переполнении — политика:
+    drop_oldest  — выкидываем самую старую запись
+    drop_newest  — выкидываем пришедшую
+    coalesce     — бар с тем же ts / котировка / стакан заменяют ещё
+                   не прочитанную запись того же вида (сделки не склеиваются);
+                   если места всё равно нет — drop_oldest
+- упавший или закрытый сервером стрим переподписывается с экспоненциальной
+  паузой (временные ошибки до этого переживает AsyncFinamClient._stream)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Literal, Tuple
+
+from finam_bot.core.orderflow_accumulator import SIDE_BUY, SIDE_SELL, SIDE_UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+OverflowPolicy = Literal["drop_oldest", "drop_newest", "coalesce"]
+
+
+# ------------------------- records -------------------------
+
+@dataclass(slots=True)
+class BarRecord:
+    symbol: str
+    ts: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+    @property
+    def key(self) -> Hashable:
+        return ("bar", self.ts)
+
+
+@dataclass(slots=True)
+class TradeRecord:
+    symbol: str
+    ts: float
+    price: float
+    qty: float
+    side: int            # SIDE_BUY / SIDE_SELL / SIDE_UNKNOWN (как в OrderFlowAccumulator)
+    trade_id: str = ""
+
+    @property
+    def key(self) -> Hashable:
+        return None
+
+
+@dataclass(slots=True)
+class QuoteRecord:
+    symbol: str
+    ts: float
+    bid: float
+    bid_size: float
+    ask: float
+    ask_size: float
+    last: float
+    last_size: float
+
+    @property
+    def key(self) -> Hashable:
+        return "quote"
+
+
+@dataclass(slots=True)
+class BookRecord:
+    """
+    Инкрементальное обновление стакана: строки (price, buy_size, sell_size, action).
+    """
+    symbol: str
+    ts: float
+    rows: Tuple[Tuple[float, float, float, int], ...]
+
+    @property
+    def key(self) -> Hashable:
+        return "book"
+
+    def merge(self, newer: "BookRecord") -> "BookRecord":
+        """
+        Склейка двух обновлений: по каждой цене побеждает более новая строка.
+        """
+        levels = {r[0]: r for r in self.rows}
+        for r in newer.rows:
+            levels[r[0]] = r
+        return BookRecord(symbol=newer.symbol, ts=newer.ts, rows=tuple(levels.values()))
+
+
+# ------------------------- decoding -------------------------
+
+def _dec(d) -> float:
+    v = d.value
+    return float(v) if v else 0.0
+
+
+def _ts(t) -> float:
+    return t.seconds + t.nanos * 1e-9
+
+
+_PROTO_SIDES = {1: SIDE_BUY, 2: SIDE_SELL}
+
+
+def decode_bars(resp) -> List[BarRecord]:
+    symbol = resp.symbol
+    return [
+        BarRecord(
+            symbol=symbol,
+            ts=int(b.timestamp.seconds),
+            open=_dec(b.open),
+            high=_dec(b.high),
+            low=_dec(b.low),
+            close=_dec(b.close),
+            volume=_dec(b.volume),
+        )
+        for b in resp.bars
+    ]
+
+
+def decode_trades(resp) -> List[TradeRecord]:
+    symbol = resp.symbol
+    return [
+        TradeRecord(
+            symbol=symbol,
+            ts=_ts(t.timestamp),
+            price=_dec(t.price),
+            qty=_dec(t.size),
+            side=_PROTO_SIDES.get(t.side, SIDE_UNKNOWN),
+            trade_id=t.trade_id,
+        )
+        for t in resp.trades
+    ]
+
+
+def decode_quotes(resp) -> List[QuoteRecord]:
+    return [
+        QuoteRecord(
+            symbol=q.symbol,
+            ts=_ts(q.timestamp),
+            bid=_dec(q.bid),
+            bid_size=_dec(q.bid_size),
+            ask=_dec(q.ask),
+            ask_size=_dec(q.ask_size),
+            last=_dec(q.last),
+            last_size=_dec(q.last_size),
+        )
+        for q in resp.quote
+    ]
+
+
+def decode_order_book(resp) -> List[BookRecord]:
+    out = []
+    for book in resp.order_book:
+        rows = tuple((_dec(r.price), _dec(r.buy_size), _dec(r.sell_size), int(r.action)) for r in book.rows)
+        ts = max((_ts(r.timestamp) for r in book.rows), default=0.0)
+        out.append(BookRecord(symbol=book.symbol, ts=ts, rows=rows))
+    return out
+
+
+# ------------------------- queues -------------------------
+
+class SymbolQueue:
+    """
+    Ограниченная очередь записей одного символа с политикой переполнения.
+    Один потребитель: get() / async for.
+    """
+
+    def __init__(self, maxsize: int = 1000, policy: OverflowPolicy = "drop_oldest"):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        if policy not in ("drop_oldest", "drop_newest", "coalesce"):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.maxsize = maxsize
+        self.policy: OverflowPolicy = policy
+        self._items: deque = deque()        # ячейки [record]
+        self._pending: Dict[Hashable, list] = {}
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put_nowait(self, record) -> None:
+        if self.policy == "coalesce":
+            key = record.key
+            if key is not None:
+                cell = self._pending.get(key)
+                if cell is not None:
+                    old = cell[0]
+                    cell[0] = old.merge(record) if isinstance(old, BookRecord) else record
+                    self.coalesced += 1
+                    return
+
+        if len(self._items) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == "drop_newest":
+                return
+            self._forget(self._items.popleft())
+
+        cell = [record]
+        self._items.append(cell)
+        if self.policy == "coalesce" and record.key is not None:
+            self._pending[record.key] = cell
+        self._ready.set()
+
+    def _forget(self, cell: list) -> None:
+        if self._pending:
+            key = cell[0].key
+            if self._pending.get(key) is cell:
+                del self._pending[key]
+
+    def get_nowait(self):
+        if not self._items:
+            raise asyncio.QueueEmpty
+        cell = self._items.popleft()
+        self._forget(cell)
+        if not self._items:
+            self._ready.clear()
+        return cell[0]
+
+    async def get(self):
+        while not self._items:
+            await self._ready.wait()
+        return self.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+
+# ------------------------- streamer -------------------------
+
+class MarketDataStreamer:
+    """
+    Мультиплексор подписок поверх AsyncFinamClient (или любого объекта
+    с теми же методами subscribe_*).
+
+        streamer = MarketDataStreamer(client, policy="coalesce")
+        streamer.subscribe_bars(["SBER@MISX", "GAZP@MISX"], "M1")
+        streamer.subscribe_trades(["SBER@MISX"])
+        await streamer.start()
+        async for rec in streamer.queue("SBER@MISX"):
+            ...
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        maxsize: int = 1000,
+        policy: OverflowPolicy = "drop_oldest",
+        restart_backoff: float = 0.5,
+        max_restart_backoff: float = 30.0,
+    ):
+        self.client = client
+        self.maxsize = maxsize
+        self.policy: OverflowPolicy = policy
+        self.restart_backoff = float(restart_backoff)
+        self.max_restart_backoff = float(max_restart_backoff)
+        self.restarts: Dict[str, int] = {}
+        self._queues: Dict[str, SymbolQueue] = {}
+        self._specs: List[Tuple[str, object, object]] = []   # (name, factory, decoder)
+        self._tasks: List[asyncio.Task] = []
+        self.received = 0
+
+    def queue(self, symbol: str) -> SymbolQueue:
+        q = self._queues.get(symbol)
+        if q is None:
+            q = self._queues[symbol] = SymbolQueue(self.maxsize, self.policy)
+        return q
+
+    # --- подписки (регистрируются до start()) ---
+
+    def subscribe_bars(self, symbols: Iterable[str], timeframe="M1") -> None:
+        for s in symbols:
+            self.queue(s)
+            self._specs.append((f"bars:{s}", lambda s=s: self.client.subscribe_bars(s, timeframe), decode_bars))
+
+    def subscribe_trades(self, symbols: Iterable[str]) -> None:
+        for s in symbols:
+            self.queue(s)
+            self._specs.append((f"trades:{s}", lambda s=s: self.client.subscribe_latest_trades(s), decode_trades))
+
+    def subscribe_order_book(self, symbols: Iterable[str]) -> None:
+        for s in symbols:
+            self.queue(s)
+            self._specs.append((f"book:{s}", lambda s=s: self.client.subscribe_order_book(s), decode_order_book))
+
+    def subscribe_quotes(self, symbols: Iterable[str]) -> None:
+        symbols = list(symbols)
+        for s in symbols:
+            self.queue(s)
+        self._specs.append(("quotes", lambda: self.client.subscribe_quotes(symbols), decode_quotes))
+
+    # --- жизненный цикл ---
+
+    async def _pump(self, name: str, factory, decoder) -> None:
+        attempt = 0
+        while True:
+            received = self.received
+            try:
+                async for resp in factory():
+                    for rec in decoder(resp):
+                        self.received += 1
+                        q = self._queues.get(rec.symbol)
+                        if q is None:
+                            q = self.queue(rec.symbol)
+                        q.put_nowait(rec)
+                logger.warning("market data stream %s closed by server, resubscribing", name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("market data stream %s failed", name)
+            self.restarts[name] = self.restarts.get(name, 0) + 1
+            # данные шли — пауза с начала, иначе растёт
+            attempt = 1 if self.received != received else attempt + 1
+            delay = min(self.restart_backoff * (2 ** (attempt - 1)), self.max_restart_backoff)
+            await asyncio.sleep(delay)
+
+    async def start(self) -> None:
+        if self._tasks:
+            raise RuntimeError("streamer already started")
+        self._tasks = [asyncio.create_task(self._pump(*spec), name=spec[0]) for spec in self._specs]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def __aenter__(self) -> "MarketDataStreamer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            s: {"pending": len(q), "dropped": q.dropped, "coalesced": q.coalesced}
+            for s, q in self._queues.items()
+        }
@@ -0,0 +1,251 @@
+# finam_bot/grpc/token_manager.py
+"""
+Кэш session JWT, общий для всех процессов бота.
+
+- токен хранится с exp (из payload JWT) в файле ~/.cache/finam_bot/jwt.json
+  (FINAM_JWT_CACHE), ключ — хэш секрета, сам секрет в файл не пишется
+- обмен секрета на JWT — под flock, поэтому параллельно стартующие скрипты
+  делают один Auth, остальные берут токен из файла
+- фоновый поток обновляет токен за refresh_margin секунд до истечения
+  (но не раньше половины срока жизни — короткий токен иначе «несвежий»
+  сразу после выдачи);
+  клиенты читают metadata() на каждом вызове, так что новые RPC и
+  переподключённые стримы уходят уже со свежим токеном
+- refresh(stale=...) после UNAUTHENTICATED: если другой процесс уже обновил
+  файл, новый Auth не делаем
+- scope (хост API) отделяет токены sandbox и боевого контура
+
+    tokens = TokenManager(secret, exchange=lambda s: auth_stub.Auth(AuthRequest(secret=s)).token)
+    stub.GetAccount(req, metadata=tokens.metadata())
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки нет, кэш всё равно работает
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "finam_bot" / "jwt.json"
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """
+    exp (epoch seconds) из payload JWT без проверки подписи; None, если не JWT.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+def _cache_key(secret: str, scope: str) -> str:
+    return hashlib.sha256(f"{scope}\0{secret}".encode("utf-8")).hexdigest()[:16]
+
+
+def grpc_auth_exchange(host: str, credentials=None, timeout: float = 10.0) -> Callable[[str], str]:
+    """
+    Обмен через AuthService.Auth на отдельном коротком sync-канале
+    (для async-клиента: поток обновления не трогает event loop).
+    """
+    def exchange(secret: str) -> str:
+        import grpc
+        from finam_bot.grpc_api.grpc.tradeapi.v1.auth import auth_service_pb2, auth_service_pb2_grpc
+
+        creds = credentials or grpc.ssl_channel_credentials()
+        with grpc.secure_channel(host, creds) as channel:
+            stub = auth_service_pb2_grpc.AuthServiceStub(channel)
+            return stub.Auth(auth_service_pb2.AuthRequest(secret=secret), timeout=timeout).token
+
+    return exchange
+
+
+class TokenManager:
+    # не чаще раза в секунду, даже если сервер выдаёт токен короче refresh_margin
+    min_wait = 1.0
+
+    def __init__(
+        self,
+        secret: str,
+        exchange: Callable[[str], str],
+        *,
+        scope: str = "",
+        cache_path: Optional[os.PathLike] = None,
+        refresh_margin: float = 120.0,
+        default_ttl: float = 15 * 60,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not secret:
+            raise RuntimeError("FINAM_TOKEN not set")
+        self.secret = secret
+        self.exchange = exchange
+        self.refresh_margin = float(refresh_margin)
+        self.default_ttl = float(default_ttl)
+        self.clock = clock
+
+        if cache_path is None:
+            cache_path = os.getenv("FINAM_JWT_CACHE") or DEFAULT_CACHE_PATH
+        self.cache_path = Path(cache_path)
+        self.scope = scope
+        self._key = _cache_key(secret, scope)
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._ttl: Optional[float] = None     # срок жизни текущего токена при выдаче
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.exchanges = 0
+
+    # ------------------------- public -------------------------
+
+    @property
+    def expires_at(self) -> float:
+        return self._expires_at
+
+    def token(self) -> str:
+        """
+        Действующий токен: память -> файл -> Auth.
+        """
+        token, expires_at, ttl = self._token, self._expires_at, self._ttl
+        if token and self._fresh(expires_at, ttl):
+            return token
+        with self._lock:
+            if self._token and self._fresh(self._expires_at, self._ttl):
+                return self._token
+            return self._load_or_exchange(stale=None)
+
+    def refresh(self, stale: Optional[str] = None) -> str:
+        """
+        Принудительное обновление (stale — токен, который сервер отверг).
+        """
+        with self._lock:
+            return self._load_or_exchange(stale=stale or self._token)
+
+    def current(self) -> Optional[str]:
+        """
+        Последний известный токен без I/O (для event loop; свежесть
+        обеспечивает фоновый поток start()).
+        """
+        return self._token
+
+    def metadata(self) -> list:
+        return [("authorization", f"Bearer {self.token()}")]
+
+    def __call__(self, context, callback) -> None:
+        """
+        grpc.AuthMetadataPlugin: grpc.metadata_call_credentials(tokens).
+        """
+        try:
+            callback(tuple(self.metadata()), None)
+        except Exception as e:
+            callback((), e)
+
+    # ------------------------- background refresh -------------------------
+
+    def start(self) -> "TokenManager":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="jwt-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.token()
+                wait = self._expires_at - self._margin(self._ttl) - self.clock()
+                if wait <= 0:
+                    self.refresh()
+                    wait = self._expires_at - self._margin(self._ttl) - self.clock()
+            except Exception:
+                logger.exception("JWT refresh failed")
+                wait = 5.0
+            self._stop.wait(min(max(wait, self.min_wait), 300.0))
+
+    # ------------------------- internals -------------------------
+
+    def _margin(self, ttl: Optional[float]) -> float:
+        if ttl is None or ttl <= 0:
+            return self.refresh_margin
+        return min(self.refresh_margin, ttl / 2)
+
+    def _fresh(self, expires_at: float, ttl: Optional[float]) -> bool:
+        return expires_at - self._margin(ttl) > self.clock()
+
+    def _load_or_exchange(self, stale: Optional[str]) -> str:
+        with self._file_lock():
+            cached = self._read_cache()
+            if cached is not None:
+                token, expires_at, ttl = cached
+                if token != stale and self._fresh(expires_at, ttl):
+                    self._token, self._expires_at, self._ttl = token, expires_at, ttl
+                    return token
+
+            token = self.exchange(self.secret)
+            self.exchanges += 1
+            issued_at = self.clock()
+            expires_at = jwt_expiry(token) or (issued_at + self.default_ttl)
+            ttl = expires_at - issued_at
+            self._write_cache(token, expires_at, ttl)
+
+        self._token, self._expires_at, self._ttl = token, expires_at, ttl
+        logger.info("JWT refreshed, expires in %.0fs", expires_at - self.clock())
+        return token
+
+    @contextmanager
+    def _file_lock(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.cache_path.with_name(self.cache_path.name + ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_cache(self) -> Optional[Tuple[str, float, Optional[float]]]:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            entry = data[self._key]
+            ttl = entry.get("ttl")      # в старых кэшах нет — обычный refresh_margin
+            return str(entry["token"]), float(entry["expires_at"]), None if ttl is None else float(ttl)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_cache(self, token: str, expires_at: float, ttl: Optional[float] = None) -> None:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            if not isinstance(data, dict):
+                data = {}
+        except (OSError, ValueError):
+            data = {}
+        data[self._key] = {"token": token, "expires_at": expires_at, "ttl": ttl}
+
+        tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        tmp.replace(self.cache_path)
@@ -0,0 +1,151 @@
+# finam_bot/infra/exporters.py
+"""
+Экспорт infra.metrics во внешние форматы.
+
+- PrometheusFileExporter — text exposition format (для node_exporter
+  textfile collector), гистограммы с кумулятивными бакетами
+- JsonFileExporter       — снапшот MetricsRegistry.snapshot() + бакеты
+- MetricsReporter        — фоновый поток, раз в interval пишет во все
+                           экспортёры (запись атомарная: tmp + replace)
+
+Экспортёр — любой объект с export(registry).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Protocol
+
+from finam_bot.infra.metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class Exporter(Protocol):
+    def export(self, registry: MetricsRegistry) -> None: ...
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+def prom_name(name: str, prefix: str = "finam") -> str:
+    """
+    'grpc.GetAccount.errors' -> 'finam_grpc_GetAccount_errors'
+    """
+    return f"{prefix}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def render_prometheus(registry: MetricsRegistry, prefix: str = "finam") -> str:
+    lines: List[str] = []
+    for name, value in sorted(dict(registry.counters).items()):
+        n = prom_name(name, prefix) + "_total"
+        lines += [f"# TYPE {n} counter", f"{n} {value:g}"]
+    for name, value in sorted(dict(registry.gauges).items()):
+        n = prom_name(name, prefix)
+        lines += [f"# TYPE {n} gauge", f"{n} {value:g}"]
+    for name, h in sorted(dict(registry.histograms).items()):
+        n = prom_name(name, prefix) + "_seconds"
+        counts, count, total = h.buckets()
+        lines.append(f"# TYPE {n} histogram")
+        cum = 0
+        for bound, c in zip(h.bounds, counts):
+            cum += c
+            lines.append(f'{n}_bucket{{le="{bound:g}"}} {cum}')
+        lines.append(f'{n}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{n}_sum {total:g}")
+        lines.append(f"{n}_count {count}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusFileExporter:
+    def __init__(self, path: os.PathLike, prefix: str = "finam"):
+        self.path = Path(path)
+        self.prefix = prefix
+
+    def export(self, registry: MetricsRegistry) -> None:
+        _atomic_write(self.path, render_prometheus(registry, self.prefix))
+
+
+class JsonFileExporter:
+    def __init__(self, path: os.PathLike, buckets: bool = False):
+        self.path = Path(path)
+        self.buckets = buckets
+
+    def export(self, registry: MetricsRegistry) -> None:
+        data = registry.snapshot()
+        data["ts"] = time.time()
+        if self.buckets:
+            data["buckets"] = {
+                name: {"bounds": h.bounds, "counts": h.buckets()[0]}
+                for name, h in dict(registry.histograms).items()
+            }
+        _atomic_write(self.path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+class MetricsReporter:
+    """
+        reporter = MetricsReporter([PrometheusFileExporter("metrics/finam.prom")]).start()
+        ...
+        reporter.stop()      # финальный flush
+    """
+
+    def __init__(
+        self,
+        exporters: Iterable[Exporter],
+        registry: MetricsRegistry = METRICS,
+        interval: float = 15.0,
+    ):
+        self.exporters = list(exporters)
+        self.registry = registry
+        self.interval = float(interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def flush(self) -> None:
+        for e in self.exporters:
+            try:
+                e.export(self.registry)
+            except Exception as err:
+                logger.warning("metrics export %s failed: %s", type(e).__name__, err)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def start(self) -> "MetricsReporter":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+def reporter_from_env(registry: MetricsRegistry = METRICS) -> Optional[MetricsReporter]:
+    """
+    FINAM_METRICS_PROM / FINAM_METRICS_JSON — пути файлов,
+    FINAM_METRICS_INTERVAL — период (сек). Нет путей — None.
+    """
+    exporters: List[Exporter] = []
+    if os.getenv("FINAM_METRICS_PROM"):
+        exporters.append(PrometheusFileExporter(os.environ["FINAM_METRICS_PROM"]))
+    if os.getenv("FINAM_METRICS_JSON"):
+        exporters.append(JsonFileExporter(os.environ["FINAM_METRICS_JSON"]))
+    if not exporters:
+        return None
+    return MetricsReporter(exporters, registry, float(os.getenv("FINAM_METRICS_INTERVAL", "15")))
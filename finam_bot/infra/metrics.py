@@ -0,0 +1,146 @@
+# finam_bot/infra/metrics.py
+"""
+Лёгкие in-process метрики: счётчики, гейджи и гистограммы латентности.
+
+Гистограмма — фиксированные геометрические бакеты (x2 от 50 мкс до ~105 с),
+observe() — bisect + инкремент, без аллокаций; перцентили — по верхней
+границе бакета (точность в пределах x2, для p50/p99 латентности достаточно).
+
+observe() зовут gRPC worker-потоки, snapshot() — поток репортера: гистограмма
+под своим lock, как счётчики реестра.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# верхние границы бакетов в секундах
+DEFAULT_BOUNDS: List[float] = [50e-6 * 2 ** i for i in range(22)]
+
+
+class LatencyHistogram:
+    __slots__ = ("name", "bounds", "counts", "count", "sum", "min", "max", "_lock")
+
+    def __init__(self, name: str, bounds: Optional[Sequence[float]] = None):
+        self._lock = threading.Lock()
+        self.name = name
+        self.bounds = list(bounds or DEFAULT_BOUNDS)
+        self.counts = [0] * (len(self.bounds) + 1)     # последний — +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        if seconds < 0:
+            seconds = 0.0
+        i = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """
+        p в [0, 100] -> оценка сверху (граница бакета, не больше max).
+        """
+        with self._lock:
+            return self._percentile(p)
+
+    def _percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                bound = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.sum = 0.0
+            self.min = float("inf")
+            self.max = 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "mean": self.sum / self.count if self.count else 0.0,
+                "min": self.min if self.count else 0.0,
+                "p50": self._percentile(50),
+                "p90": self._percentile(90),
+                "p99": self._percentile(99),
+                "max": self.max,
+            }
+
+    def buckets(self) -> Tuple[List[int], int, float]:
+        """
+        Согласованная копия (counts, count, sum) для экспортёров.
+        """
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+
+class MetricsRegistry:
+    """
+    Именованные гистограммы, счётчики и гейджи процесса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+
+    def histogram(self, name: str, bounds: Optional[Sequence[float]] = None) -> LatencyHistogram:
+        h = self.histograms.get(name)
+        if h is None:
+            with self._lock:
+                h = self.histograms.get(name)
+                if h is None:
+                    h = self.histograms[name] = LatencyHistogram(name, bounds)
+        return h
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = float(value)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": {name: h.snapshot() for name, h in histograms.items()},
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+
+# общий реестр процесса
+METRICS = MetricsRegistry()
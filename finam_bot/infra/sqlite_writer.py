@@ -0,0 +1,187 @@
+# finam_bot/infra/sqlite_writer.py
+"""
+Фоновый писатель SQLite с group commit.
+
+- своё соединение в отдельном потоке, WAL + synchronous=NORMAL
+- операции (callable(conn)) приходят через ограниченную очередь;
+  вызывающий не ждёт fsync — только постановку в очередь (при
+  переполнении — backpressure: put блокируется)
+- всё, что накопилось за commit_interval (или max_batch операций),
+  коммитится одной транзакцией: один fsync на пачку
+- каждая операция в своём SAVEPOINT: ошибка одной не откатывает пачку
+- ошибка BEGIN / COMMIT (SQLITE_BUSY, диск, I/O) откатывает пачку,
+  пишется в лог и stats["errors"]; поток продолжает работу
+- flush() — дождаться, пока всё поставленное до него будет обработано
+  (закоммичено или откачено с ошибкой, см. stats["errors"])
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WAL_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",       # в WAL: fsync на checkpoint, не на каждый commit
+    "PRAGMA cache_size=-32000",        # ~32 МБ
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+Op = Callable[[sqlite3.Connection], None]
+
+_STOP = object()
+
+
+def apply_wal_pragmas(conn: sqlite3.Connection) -> sqlite3.Connection:
+    for p in WAL_PRAGMAS:
+        conn.execute(p)
+    return conn
+
+
+class _Flush:
+    __slots__ = ("event",)
+
+    def __init__(self):
+        self.event = threading.Event()
+
+
+class SQLiteWriter:
+    def __init__(
+        self,
+        db_path: str,
+        *,
+        commit_interval: float = 0.05,
+        max_batch: int = 1000,
+        max_queue: int = 10_000,
+    ):
+        self.db_path = str(db_path)
+        self.commit_interval = float(commit_interval)
+        self.max_batch = int(max_batch)
+        self._q: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"ops": 0, "batches": 0, "errors": 0, "max_batch": 0}
+
+    # ------------------------- lifecycle -------------------------
+
+    def start(self) -> "SQLiteWriter":
+        if self._thread is None:
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name="sqlite-writer", daemon=True)
+            self._thread.start()
+            ready.wait()
+        return self
+
+    def stop(self) -> None:
+        """
+        Дописывает очередь и закрывает соединение.
+        """
+        if self._thread is None:
+            return
+        self._q.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    # ------------------------- API -------------------------
+
+    def submit(self, op: Op, timeout: Optional[float] = None) -> None:
+        if self._thread is None:
+            raise RuntimeError("SQLiteWriter is not started")
+        self._q.put(op, timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        self._q.put(marker, timeout=timeout)
+        return marker.event.wait(timeout)
+
+    @property
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    # ------------------------- thread -------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return apply_wal_pragmas(conn)
+
+    def _run(self, ready: threading.Event) -> None:
+        conn = self._connect()
+        ready.set()
+
+        stop = False
+        while not stop:
+            batch = [self._q.get()]
+            if batch[0] is _STOP:
+                break
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(conn, batch)
+
+        # остаток очереди после STOP
+        rest = []
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                rest.append(item)
+        if rest:
+            self._commit(conn, rest)
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch) -> None:
+        flushes = [item for item in batch if isinstance(item, _Flush)]
+        ops = len(batch) - len(flushes)
+        try:
+            self._apply(conn, batch)
+        except Exception as e:
+            # пачка потеряна целиком — но поток жив, flush() не виснет
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            self.stats["errors"] += 1
+            logger.error("sqlite batch of %s ops failed, rolled back: %s", ops, e)
+        else:
+            self.stats["ops"] += ops
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], ops)
+        finally:
+            for f in flushes:
+                f.event.set()
+
+    def _apply(self, conn: sqlite3.Connection, batch) -> None:
+        conn.execute("BEGIN")
+        for item in batch:
+            if isinstance(item, _Flush):
+                continue
+            conn.execute("SAVEPOINT op")
+            try:
+                item(conn)
+            except Exception as e:
+                conn.execute("ROLLBACK TO op")
+                self.stats["errors"] += 1
+                logger.error("sqlite write failed: %s", e)
+            conn.execute("RELEASE op")
+        conn.execute("COMMIT")
@@ -1,11 +1,29 @@
-def asset_class_by_symbol(symbol: str) -> str:
-    s = symbol.upper()
-    if s.startswith("NG") or s.endswith(".F") or "-" in s:
-        return "futures"
-    if s.endswith(".B"):
-        return "bonds"
-    return "stocks"
 # finam_bot/instruments.py
+"""
+Справочник инструментов.
+
+InstrumentRegistry загружает метаданные (лот, шаг цены, MIC, класс актива,
+экспирация) и расписание сессий из AssetsService один раз, хранит их в
+локальном JSON-кэше с TTL и отдаёт O(1) lookup по symbol ("SBER@MISX")
+или тикеру ("SBER"). Пер-ордерных RPC за метаданными нет.
+
+INSTRUMENTS — ручные записи на случай, когда кэша нет (офлайн / тесты).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from finam_bot.qty.rules import QtyRule
+
+logger = logging.getLogger(__name__)
 
 INSTRUMENTS = {
     "NG-2.26": {
@@ -17,13 +35,290 @@ INSTRUMENTS = {
     # добавляй по мере необходимости
 }
 
+DEFAULT_CACHE_PATH = Path(__file__).parent / "data" / "instruments.json"
+DEFAULT_TTL = 12 * 3600
+
+# Asset.type из AssetsService -> класс актива RiskEngineV22
+ASSET_TYPE_TO_CLASS = {
+    "EQUITIES": "EQUITY",
+    "FUTURES": "FUTURES",
+    "BONDS": "BOND",
+    "FUNDS": "ETF",
+    "CURRENCIES": "CURRENCY",
+}
+
+
+@dataclass(frozen=True)
+class InstrumentInfo:
+    symbol: str                  # SBER@MISX
+    ticker: str
+    mic: str
+    type: str                    # как в AssetsService: EQUITIES / FUTURES / ...
+    asset_class: str             # FUTURES / EQUITY / BOND / ETF / CURRENCY / OTHER
+    lot_size: Optional[float] = None   # None — GetAsset не запрашивался
+    min_step: float = 0.0        # шаг цены
+    decimals: int = 0
+    expiration: Optional[str] = None   # YYYY-MM-DD
+    quote_currency: str = ""
+    name: str = ""
+
+    @property
+    def qty_rule(self) -> Optional[QtyRule]:
+        """
+        Правило по лоту; None, если деталей нет (инструмент только из bulk
+        Assets) — тогда QtyCalculator берёт правило класса из QTY_RULES.
+        """
+        if self.lot_size is None:
+            return None
+        lot = self.lot_size if self.lot_size > 0 else 1.0
+        return QtyRule(step=lot, min_qty=lot)
+
+    def round_price(self, price: float) -> float:
+        if self.min_step <= 0:
+            return price
+        return round(round(price / self.min_step) * self.min_step, self.decimals)
+
+
+def _date_iso(d) -> Optional[str]:
+    if d is None or not getattr(d, "year", 0):
+        return None
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}"
+
+
+def info_from_proto(asset, details=None) -> InstrumentInfo:
+    """
+    Asset (bulk Assets) + GetAssetResponse (детали, может не быть).
+    """
+    type_ = (details.type if details is not None and details.type else asset.type) or ""
+    info = dict(
+        symbol=asset.symbol,
+        ticker=asset.ticker,
+        mic=asset.mic,
+        type=type_,
+        asset_class=ASSET_TYPE_TO_CLASS.get(type_.upper(), "OTHER"),
+        name=asset.name,
+    )
+    if details is not None:
+        decimals = int(details.decimals)
+        info.update(
+            lot_size=float(details.lot_size.value or 1),
+            min_step=int(details.min_step) / (10 ** decimals),
+            decimals=decimals,
+            expiration=_date_iso(details.expiration_date if details.HasField("expiration_date") else None),
+            quote_currency=details.quote_currency,
+        )
+    return InstrumentInfo(**info)
+
+
+class InstrumentRegistry:
+    """
+        registry = InstrumentRegistry.load()
+        if registry.is_stale():
+            await registry.refresh(client, ["SBER@MISX", "NG-2.26@RTSX"])
+        registry.get("SBER").lot_size
+    """
+
+    def __init__(self, cache_path: Optional[os.PathLike] = None, ttl: float = DEFAULT_TTL):
+        self.cache_path = Path(cache_path or os.getenv("FINAM_INSTRUMENTS_CACHE") or DEFAULT_CACHE_PATH)
+        self.ttl = float(ttl)
+        self.loaded_at = 0.0
+        self._by_symbol: Dict[str, InstrumentInfo] = {}
+        self._by_ticker: Dict[str, InstrumentInfo] = {}
+        # symbol -> (starts, ends, types), отсортировано по start
+        self._sessions: Dict[str, Tuple[List[float], List[float], List[str]]] = {}
+
+    # ------------------------- lookup -------------------------
+
+    def __len__(self) -> int:
+        return len(self._by_symbol)
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+
+    def get(self, symbol: str) -> Optional[InstrumentInfo]:
+        return self._by_symbol.get(symbol) or self._by_ticker.get(symbol)
+
+    def asset_class(self, symbol: str) -> str:
+        info = self.get(symbol)
+        if info is None:
+            raise KeyError(f"Unknown instrument: {symbol}")
+        return info.asset_class
+
+    def qty_rule(self, symbol: str) -> Optional[QtyRule]:
+        info = self.get(symbol)
+        return info.qty_rule if info is not None else None
+
+    def session_at(self, symbol: str, ts: Optional[float] = None) -> Optional[str]:
+        """
+        Тип сессии, в которую попадает ts (epoch), или None — торгов нет.
+        Вне загруженного окна ответ ничего не значит — см. has_schedule(symbol, ts).
+        """
+        info = self.get(symbol)
+        sessions = self._sessions.get(info.symbol if info else symbol)
+        if not sessions:
+            return None
+        ts = time.time() if ts is None else ts
+        starts, ends, types = sessions
+        i = bisect_right(starts, ts) - 1
+        if i >= 0 and ts < ends[i]:
+            return types[i]
+        return None
+
+    def has_schedule(self, symbol: str, ts: Optional[float] = None) -> bool:
+        """
+        Расписание известно и покрывает ts. Schedule отдаёт конечное окно:
+        за его концом (устаревший кэш) статус сессии неизвестен, а не «закрыто».
+        """
+        info = self.get(symbol)
+        sessions = self._sessions.get(info.symbol if info else symbol)
+        if not sessions:
+            return False
+        ts = time.time() if ts is None else ts
+        starts, ends, _ = sessions
+        return starts[0] <= ts <= ends[-1]
+
+    def is_open(self, symbol: str, ts: Optional[float] = None) -> bool:
+        return self.session_at(symbol, ts) is not None
+
+    # ------------------------- populate -------------------------
+
+    def add(self, info: InstrumentInfo) -> None:
+        self._by_symbol[info.symbol] = info
+        # тикер неоднозначен между площадками — первый загруженный побеждает
+        self._by_ticker.setdefault(info.ticker, info)
+
+    def set_schedule(self, symbol: str, sessions: Iterable[Tuple[str, float, float]]) -> None:
+        rows = sorted(sessions, key=lambda s: s[1])
+        self._sessions[symbol] = (
+            [float(s[1]) for s in rows],
+            [float(s[2]) for s in rows],
+            [str(s[0]) for s in rows],
+        )
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return not self._by_symbol or now - self.loaded_at > self.ttl
+
+    async def refresh(self, client, symbols: Iterable[str] = (), *, concurrency: int = 8) -> "InstrumentRegistry":
+        """
+        Assets (все инструменты) + GetAsset / Schedule для рабочего списка
+        символов параллельно, затем запись кэша.
+        client — AsyncFinamClient (get_assets / get_asset / get_schedule).
+        """
+        assets = (await client.get_assets()).assets
+        by_symbol = {a.symbol: a for a in assets}
+        by_ticker: Dict[str, object] = {}
+        for a in assets:
+            by_ticker.setdefault(a.ticker, a)
+
+        wanted = []
+        for s in symbols:
+            a = by_symbol.get(s) or by_ticker.get(s)
+            if a is None:
+                logger.warning("instrument %s not found in Assets", s)
+                continue
+            wanted.append(a)
+
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _details(a):
+            async with sem:
+                return await asyncio.gather(client.get_asset(a.symbol), client.get_schedule(a.symbol))
+
+        details = await asyncio.gather(*(_details(a) for a in wanted))
+
+        self._by_symbol.clear()
+        self._by_ticker.clear()
+        self._sessions.clear()
+        # сначала рабочий список — ему принадлежат тикеры при коллизиях
+        for a, (asset, schedule) in zip(wanted, details):
+            self.add(info_from_proto(a, asset))
+            self.set_schedule(
+                a.symbol,
+                [(s.type, s.interval.start_time.seconds, s.interval.end_time.seconds) for s in schedule.sessions],
+            )
+        for a in assets:
+            if a.symbol not in self._by_symbol:
+                self.add(info_from_proto(a))
+
+        self.loaded_at = time.time()
+        self.save()
+        return self
+
+    # ------------------------- cache -------------------------
+
+    def save(self) -> None:
+        data = {
+            "loaded_at": self.loaded_at,
+            "instruments": [asdict(i) for i in self._by_symbol.values()],
+            "schedules": {
+                s: [list(row) for row in zip(types, starts, ends)]
+                for s, (starts, ends, types) in self._sessions.items()
+            },
+        }
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.cache_path)
+
+    @classmethod
+    def load(cls, cache_path: Optional[os.PathLike] = None, ttl: float = DEFAULT_TTL) -> "InstrumentRegistry":
+        """
+        Из кэша (без сети). Нет файла — пустой реестр (is_stale() == True).
+        """
+        registry = cls(cache_path, ttl)
+        try:
+            data = json.loads(registry.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return registry
+
+        registry.loaded_at = float(data.get("loaded_at", 0.0))
+        for row in data.get("instruments", []):
+            registry.add(InstrumentInfo(**row))
+        for symbol, rows in data.get("schedules", {}).items():
+            registry.set_schedule(symbol, [tuple(r) for r in rows])
+        return registry
+
+
+_default_registry: Optional[InstrumentRegistry] = None
+
+
+def default_registry() -> InstrumentRegistry:
+    """
+    Общий реестр процесса (из кэша, загружается один раз).
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = InstrumentRegistry.load()
+    return _default_registry
+
 
 def get_asset_class(symbol: str) -> str:
     """
     Return asset_class for symbol.
     Raises KeyError if symbol is unknown (это правильно).
     """
+    info = default_registry().get(symbol)
+    if info is not None:
+        return info.asset_class
     try:
         return INSTRUMENTS[symbol]["asset_class"]
     except KeyError:
-        raise KeyError(f"Unknown instrument: {symbol}")
\ No newline at end of file
+        raise KeyError(f"Unknown instrument: {symbol}")
+
+
+def asset_class_by_symbol(symbol: str) -> str:
+    """
+    Класс актива без исключений (скрипты бэкфилла): реестр / INSTRUMENTS,
+    для неизвестных — прежняя эвристика по тикеру.
+    """
+    try:
+        return get_asset_class(symbol)
+    except KeyError:
+        pass
+    s = symbol.upper()
+    if s.startswith("NG") or s.endswith(".F") or "-" in s:
+        return "FUTURES"
+    if s.endswith(".B"):
+        return "BOND"
+    return "EQUITY"
@@ -0,0 +1,101 @@
+# finam_bot/portfolio/exposure.py
+"""
+Агрегаты открытых позиций по классу активов в памяти.
+
+RiskEngineV22 на каждый сигнал спрашивает count / risk / exposure по классу —
+раньше это были три SUM/COUNT по positions. Здесь они поддерживаются
+инкрементально: позиция хранит свой вклад, изменение позиции
+вычитает старый и добавляет новый — O(1) и на запись, и на чтение.
+
+Источник истины — таблица positions; StorageSQLite сверяет кэш с ней
+на старте (load) и пишет итоги в exposure_summary.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+# (instrument, asset_class, qty, avg_price)
+PositionRow = Tuple[str, Optional[str], float, float]
+
+
+@dataclass(frozen=True)
+class ClassExposure:
+    count: int = 0
+    risk: float = 0.0          # SUM(|qty * avg_price|), модель v2.2
+    exposure: float = 0.0      # SUM(|qty * avg_price|)
+
+
+EMPTY = ClassExposure()
+
+
+def position_value(qty: float, avg_price: float) -> float:
+    return abs(float(qty) * float(avg_price))
+
+
+class ExposureCache:
+    def __init__(self, rows: Iterable[PositionRow] = ()):
+        self._lock = threading.Lock()
+        self._positions: Dict[str, Tuple[str, float]] = {}     # instrument -> (asset_class, value)
+        self._totals: Dict[str, ClassExposure] = {}
+        self.load(rows)
+
+    def load(self, rows: Iterable[PositionRow]) -> None:
+        """
+        Полная перестройка (старт / сверка с positions).
+        """
+        positions: Dict[str, Tuple[str, float]] = {}
+        for instrument, asset_class, qty, avg_price in rows:
+            if not qty or not asset_class:
+                continue
+            positions[instrument] = (asset_class, position_value(qty, avg_price))
+
+        totals: Dict[str, ClassExposure] = {}
+        for asset_class, value in positions.values():
+            t = totals.get(asset_class, EMPTY)
+            totals[asset_class] = ClassExposure(t.count + 1, t.risk + value, t.exposure + value)
+
+        with self._lock:
+            self._positions = positions
+            self._totals = totals
+
+    def set(self, instrument: str, asset_class: Optional[str], qty: float, avg_price: float) -> None:
+        """
+        Новая / изменённая позиция. qty == 0 — то же, что remove.
+        """
+        with self._lock:
+            self._remove(instrument)
+            if not qty or not asset_class:
+                return
+            value = position_value(qty, avg_price)
+            self._positions[instrument] = (asset_class, value)
+            t = self._totals.get(asset_class, EMPTY)
+            self._totals[asset_class] = ClassExposure(t.count + 1, t.risk + value, t.exposure + value)
+
+    def remove(self, instrument: str) -> None:
+        with self._lock:
+            self._remove(instrument)
+
+    def _remove(self, instrument: str) -> None:
+        old = self._positions.pop(instrument, None)
+        if old is None:
+            return
+        asset_class, value = old
+        t = self._totals[asset_class]
+        if t.count <= 1:
+            # без накопленной ошибки float
+            del self._totals[asset_class]
+        else:
+            self._totals[asset_class] = ClassExposure(t.count - 1, t.risk - value, t.exposure - value)
+
+    def get(self, asset_class: str) -> ClassExposure:
+        # ClassExposure неизменяемый — отдаём как есть
+        return self._totals.get(asset_class, EMPTY)
+
+    def totals(self) -> Dict[str, ClassExposure]:
+        with self._lock:
+            return dict(self._totals)
+
+    def __len__(self) -> int:
+        return len(self._positions)
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Protocol
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
 
 
 class ClientLike(Protocol):
@@ -19,6 +22,7 @@ class PortfolioSnapshot:
     positions: List[Dict[str, Any]]
     trades: List[Dict[str, Any]]
     transactions: List[Dict[str, Any]]
+    built_at: float = field(default=0.0, compare=False)     # time.monotonic()
 
 
 def build_snapshot(
@@ -32,4 +36,123 @@ def build_snapshot(
         positions=client.get_positions(),
         trades=client.get_trades(limit=trades_limit),
         transactions=client.get_transactions(days=tx_days, limit=tx_limit),
-    )
\ No newline at end of file
+    )
+
+
+class SnapshotBuilder:
+    """
+    Снапшот портфеля за одну "волну" RPC:
+
+    - GetAccount один раз, portfolios и positions строятся из него
+      (client.get_portfolios(account=...) / get_positions(account=...));
+      клиент без get_account — по-старому, отдельными вызовами
+    - GetAccount / Trades / Transactions параллельно в пуле потоков
+    - результат кэшируется на ttl секунд; одновременные вызовы get()
+      ждут один и тот же запрос (single-flight), а не шлют свои
+    - invalidate() начинает новое поколение: сборка, стартовавшая до него,
+      не попадает в кэш и к ней не присоединяются; get(force=True) тоже
+      не ждёт чужую обычную сборку — только свежий запрос
+
+        builder = SnapshotBuilder(client, ttl=1.0)
+        snap = builder.get()          # /status, risk gate — в пределах ttl из кэша
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        ttl: float = 1.0,
+        trades_limit: int = 100,
+        tx_days: int = 7,
+        tx_limit: int = 100,
+        max_workers: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.ttl = float(ttl)
+        self.trades_limit = trades_limit
+        self.tx_days = tx_days
+        self.tx_limit = tx_limit
+        self.clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snapshot")
+        self._lock = threading.Lock()
+        self._cached: Optional[PortfolioSnapshot] = None
+        self._cached_seq = 0
+        self._generation = 0
+        self._seq = 0
+        # (future, поколение, порядковый номер сборки, force)
+        self._inflight: Optional[Tuple[Future, int, int, bool]] = None
+
+    def get(self, *, force: bool = False) -> PortfolioSnapshot:
+        with self._lock:
+            snap = self._cached
+            if not force and snap is not None and self.clock() - snap.built_at < self.ttl:
+                return snap
+            inflight = self._inflight
+            if (
+                inflight is not None
+                and inflight[1] == self._generation
+                and (inflight[3] or not force)
+            ):
+                fut = inflight[0]
+                owner = False
+            else:
+                self._seq += 1
+                fut = Future()
+                gen, seq, owner = self._generation, self._seq, True
+                self._inflight = (fut, gen, seq, force)
+
+        if not owner:
+            return fut.result()
+
+        try:
+            snap = self._build()
+        except BaseException as e:
+            with self._lock:
+                if self._inflight is not None and self._inflight[0] is fut:
+                    self._inflight = None
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            # сборка из старого поколения или обогнанная более новой — не в кэш
+            if gen == self._generation and seq > self._cached_seq:
+                self._cached = snap
+                self._cached_seq = seq
+            if self._inflight is not None and self._inflight[0] is fut:
+                self._inflight = None
+        fut.set_result(snap)
+        return snap
+
+    def invalidate(self) -> None:
+        """
+        После собственной сделки / ордера — следующий get() идёт в API,
+        даже если сборка, начатая до сделки, ещё в полёте.
+        """
+        with self._lock:
+            self._generation += 1
+            self._cached = None
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+    def _build(self) -> PortfolioSnapshot:
+        c = self.client
+        trades = self._pool.submit(c.get_trades, limit=self.trades_limit)
+        transactions = self._pool.submit(c.get_transactions, days=self.tx_days, limit=self.tx_limit)
+
+        if hasattr(c, "get_account"):
+            account = c.get_account()
+            portfolios = c.get_portfolios(account=account)
+            positions = c.get_positions(account=account)
+        else:
+            positions_f = self._pool.submit(c.get_positions)
+            portfolios = c.get_portfolios()
+            positions = positions_f.result()
+
+        return PortfolioSnapshot(
+            portfolios=portfolios,
+            positions=positions,
+            trades=trades.result(),
+            transactions=transactions.result(),
+            built_at=self.clock(),
+        )
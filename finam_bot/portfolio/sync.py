@@ -0,0 +1,110 @@
+# finam_bot/portfolio/sync.py
+"""
+Инкрементальная синхронизация сделок и операций счёта в SQLite.
+
+- high-water mark по (account_id, trades|transactions) хранится в
+  sync_state; выгрузка идёт с hwm - overlap (дедуп по id), первый запуск —
+  SYNC_INITIAL_DAYS назад
+- Trades / Transactions принимают только interval + limit (ни курсора,
+  ни гарантированного порядка): полная страница означает, что окно надо
+  поделить пополам и перезапросить; окна обходятся по времени
+- всё, что пришло, пишется одной транзакцией executemany вместе с новыми
+  метками — стоимость запуска O(новых строк), а не 7 дней заново
+
+    report = AccountSync(FinamClient(), StorageSQLite()).run()
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from finam_bot.storage_sqlite import parse_iso
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+MIN_WINDOW = timedelta(seconds=1)
+
+# (start, end, limit) -> нормализованные строки
+PageFetcher = Callable[[datetime, datetime, int], List[dict]]
+
+
+def fetch_paged(
+    fetch_page: PageFetcher,
+    start: datetime,
+    end: Optional[datetime] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    *,
+    min_window: timedelta = MIN_WINDOW,
+) -> List[dict]:
+    """
+    Все строки из [start, end], сколько бы их ни было.
+    Дубли на границах окон отбрасываются по trade_id / id.
+    """
+    end = end or datetime.now(timezone.utc)
+    out: List[dict] = []
+    seen = set()
+    stack = [(start, end)]
+
+    while stack:
+        a, b = stack.pop()
+        rows = fetch_page(a, b, limit)
+        if len(rows) >= limit and b - a > min_window:
+            mid = a + (b - a) / 2
+            stack.append((mid, b))
+            stack.append((a, mid))      # левая половина — первой
+            continue
+        if len(rows) >= limit:
+            logger.warning("page [%s, %s] still full at min window, rows may be truncated", a, b)
+        for r in rows:
+            key = r.get("trade_id") or r.get("id")
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(r)
+    return out
+
+
+@dataclass(frozen=True)
+class SyncReport:
+    account_id: str
+    trades_since: str
+    transactions_since: str
+    trades: int
+    transactions: int
+
+
+class AccountSync:
+    def __init__(self, client, storage, *, page_size: int = DEFAULT_PAGE_SIZE):
+        """
+        client — FinamClient (fetch_trades / fetch_transactions),
+        storage — StorageSQLite.
+        """
+        self.client = client
+        self.storage = storage
+        self.page_size = int(page_size)
+
+    def run(self, until: Optional[datetime] = None) -> SyncReport:
+        account_id = str(self.client.account_id)
+        until = until or datetime.now(timezone.utc)
+
+        trades_since = self.storage.get_since_trades(account_id)
+        tx_since = self.storage.get_since_transactions(account_id)
+
+        trades = self.client.fetch_trades(
+            since=parse_iso(trades_since), until=until, page_size=self.page_size
+        )
+        transactions = self.client.fetch_transactions(
+            since=parse_iso(tx_since), until=until, page_size=self.page_size
+        )
+
+        counts = self.storage.save_sync_batch(account_id, trades=trades, transactions=transactions)
+        return SyncReport(
+            account_id=account_id,
+            trades_since=trades_since,
+            transactions_since=tx_since,
+            trades=counts["trades"],
+            transactions=counts["transactions"],
+        )
@@ -2,18 +2,28 @@
 
 import math
 from dataclasses import dataclass
-from finam_bot.qty.rules import QTY_RULES
+from typing import Optional, Sequence
+
+import numpy as np
+
+from finam_bot.qty.rules import QTY_RULES, QtyRule
 
 
 class QtyCalculator:
-    def __init__(self, max_risk_per_trade: float):
+    def __init__(self, max_risk_per_trade: float, registry=None):
+        """
+        registry : InstrumentRegistry (опционально) — шаг и минимум по лоту
+                   инструмента вместо общих QTY_RULES
+        """
         self.max_risk = float(max_risk_per_trade)
+        self.registry = registry
 
     def calc(
         self,
         entry_price: float,
         stop_price: float,
-        asset_class: str,
+        asset_class: str | None = None,
+        symbol: str | None = None,
     ) -> float:
         """
         Расчёт количества позиции по risk-based логике.
@@ -21,12 +31,11 @@ class QtyCalculator:
         entry_price : цена входа
         stop_price  : цена стопа
         asset_class : FUTURES / STOCKS / BONDS / etc
+        symbol      : инструмент для lookup в registry
         """
 
-        # 1️⃣ правила для класса актива
-        rules = QTY_RULES.get(asset_class)
-        if rules is None:
-            raise ValueError(f"Unknown asset_class: {asset_class}")
+        # 1️⃣ правила: лот инструмента из реестра, иначе класс актива
+        rules = self._rule(asset_class, symbol)
 
         # 2️⃣ риск на 1 контракт / акцию
         risk_per_unit = abs(entry_price - stop_price)
@@ -43,4 +52,52 @@ class QtyCalculator:
         if stepped_qty < rules.min_qty:
             return 0.0
 
-        return float(stepped_qty)
\ No newline at end of file
+        return float(stepped_qty)
+
+    def calc_batch(
+        self,
+        entry_prices: Sequence[float],
+        stop_prices: Sequence[float],
+        asset_classes: Optional[Sequence[Optional[str]]] = None,
+        symbols: Optional[Sequence[Optional[str]]] = None,
+    ) -> np.ndarray:
+        """
+        calc() для массива сигналов: правила ищутся один раз на
+        (asset_class, symbol), арифметика — векторно. Результат
+        поэлементно совпадает с calc().
+        """
+        entry = np.asarray(entry_prices, dtype=np.float64)
+        stop = np.asarray(stop_prices, dtype=np.float64)
+        n = len(entry)
+        if len(stop) != n:
+            raise ValueError("entry_prices and stop_prices must have the same length")
+        asset_classes = list(asset_classes) if asset_classes is not None else [None] * n
+        symbols = list(symbols) if symbols is not None else [None] * n
+
+        step = np.empty(n, dtype=np.float64)
+        min_qty = np.empty(n, dtype=np.float64)
+        cache = {}
+        for i, key in enumerate(zip(asset_classes, symbols)):
+            rule = cache.get(key)
+            if rule is None:
+                rule = cache[key] = self._rule(*key)
+            step[i] = rule.step
+            min_qty[i] = rule.min_qty
+
+        risk_per_unit = np.abs(entry - stop)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            qty = np.floor(self.max_risk / risk_per_unit / step) * step
+        qty[~(risk_per_unit > 0) | (qty < min_qty)] = 0.0
+        return qty
+
+    def _rule(self, asset_class: str | None, symbol: str | None) -> QtyRule:
+        rules = None
+        if self.registry is not None and symbol is not None:
+            rules = self.registry.qty_rule(symbol)
+            if asset_class is None and symbol in self.registry:
+                asset_class = self.registry.asset_class(symbol)
+        if rules is None:
+            rules = QTY_RULES.get(asset_class)
+        if rules is None:
+            raise ValueError(f"Unknown asset_class: {asset_class}")
+        return rules
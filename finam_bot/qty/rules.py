@@ -27,4 +27,10 @@ QTY_RULES = {
         step=1000.0,
         min_qty=1000.0,
     ),
-}
\ No newline at end of file
+}
+
+# имена классов RiskEngineV22 / InstrumentRegistry
+QTY_RULES["EQUITY"] = QTY_RULES["STOCKS"]
+QTY_RULES["BOND"] = QTY_RULES["BONDS"]
+QTY_RULES["ETF"] = QTY_RULES["STOCKS"]
+QTY_RULES["CURRENCY"] = QTY_RULES["FX"]
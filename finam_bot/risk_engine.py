@@ -1,5 +1,8 @@
-from datetime import date
+import time
+from datetime import datetime, timezone
 from decimal import Decimal
+from typing import Callable, Dict, Optional, Tuple
+
 from finam_bot.storage_sqlite import StorageSQLite
 from finam_bot.risk_config import (
     MAX_DAILY_LOSS,
@@ -10,20 +13,83 @@ from finam_bot.risk_config import (
 
 
 class RiskEngine:
-    def __init__(self, storage: StorageSQLite, capital: Decimal):
+    """
+    Дневные лимиты: kill switch, число сделок, дневной убыток.
+
+    Счётчик сделок и cashflow-PnL за день держатся в памяти:
+    - в начале дня (UTC, как trades.ts) обнуляются и берутся из
+      daily_trade_stats — одна строка по PK, без скана trades
+    - не чаще refresh_interval секунд перечитываются оттуда же
+      (сделки, записанные синхронизацией / другим процессом)
+    - record_trade() — собственная сделка сразу; её вклад держится поверх
+      daily_trade_stats, пока сделка с тем же trade_id не появится в trades
+      (refresh не затирает сделку, которую синхронизация ещё не записала).
+      Без trade_id сверять не с чем — сделка учитывается до конца дня
+      (для лимитов лучше посчитать дважды, чем не посчитать)
+
+    Граница дня — полночь UTC: daily_trade_stats группирует trades по
+    дате из trades.ts (UTC), и счётчики обязаны резаться там же.
+    """
+
+    def __init__(
+        self,
+        storage: StorageSQLite,
+        capital: Decimal,
+        *,
+        refresh_interval: float = 1.0,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        monotonic: Callable[[], float] = time.monotonic,
+    ):
         self.storage = storage
         self.capital = capital
+        self.refresh_interval = float(refresh_interval)
+        self.clock = clock
+        self.monotonic = monotonic
+        self._day: Optional[str] = None
+        self._loaded_at = 0.0
+        self._trades = 0
+        self._pnl = Decimal(0)
+        # свои сделки, ещё не видимые в БД: ("id", trade_id) / ("local", n) -> cashflow
+        self._pending: Dict[Tuple[str, str], Decimal] = {}
+        self._anon = 0
+
+    def _roll(self) -> None:
+        day = self.clock().date().isoformat()
+        now = self.monotonic()
+        if day != self._day or now - self._loaded_at >= self.refresh_interval:
+            if day != self._day:
+                self._pending.clear()
+            elif self._pending:
+                ids = [tid for kind, tid in self._pending if kind == "id"]
+                for tid in self.storage.existing_trade_ids(ids):
+                    del self._pending[("id", tid)]      # уже в daily_trade_stats
+            count, pnl = self.storage.get_daily_trade_stats(day)
+            self._day = day
+            self._loaded_at = now
+            self._trades = count + len(self._pending)
+            self._pnl = Decimal(str(pnl)) + sum(self._pending.values(), Decimal(0))
+
+    def record_trade(self, side: str, qty, price, trade_id: Optional[str] = None) -> None:
+        self._roll()
+        if trade_id is not None:
+            key = ("id", str(trade_id))
+            if key in self._pending:
+                return
+        else:
+            self._anon += 1
+            key = ("local", str(self._anon))
+        flow = Decimal(str(qty)) * Decimal(str(price))
+        flow = flow if str(side).upper() in ("SELL", "SIDE_SELL") else -flow
+        self._pending[key] = flow
+        self._trades += 1
+        self._pnl += flow
 
     def is_killed(self) -> bool:
         return self.storage.get_risk_flag(KILL_SWITCH_KEY, default="OFF") == "ON"
 
     def trades_today(self) -> int:
-        today = date.today().isoformat()
-        row = self.storage.conn.execute(
-            "SELECT COUNT(*) AS cnt FROM trades WHERE substr(ts,1,10) = ?",
-            (today,),
-        ).fetchone()
-        return int(row["cnt"])
+        self._roll()
+        return self._trades
 
     def daily_pnl(self) -> Decimal:
         """
@@ -31,19 +97,8 @@ class RiskEngine:
         BUY -> минус, SELL -> плюс.
         Для лимитов потерь этого достаточно на старте.
         """
-        today = date.today().isoformat()
-        row = self.storage.conn.execute(
-            """
-            SELECT SUM(
-                qty * price *
-                CASE WHEN side IN ('SELL','SIDE_SELL') THEN 1 ELSE -1 END
-            ) AS pnl
-            FROM trades
-            WHERE substr(ts,1,10) = ?
-            """,
-            (today,),
-        ).fetchone()
-        return Decimal(str(row["pnl"] or 0))
+        self._roll()
+        return self._pnl
 
     def allow_trade(self, risk_amount: Decimal) -> tuple[bool, str]:
         if self.is_killed():
@@ -60,4 +115,37 @@ class RiskEngine:
         if risk_amount > self.capital * MAX_TRADE_RISK:
             return False, "TRADE_RISK_TOO_HIGH"
 
-        return True, "OK"
\ No newline at end of file
+        return True, "OK"
+
+    def allow_trades(self, risk_amounts) -> list[tuple[bool, str]]:
+        """
+        allow_trade для пачки: kill switch, сделки и PnL за день читаются
+        один раз; каждая разрешённая сделка занимает место в дневном лимите.
+        """
+        killed = self.is_killed()
+        trades = self.trades_today()
+        daily_loss = self.daily_pnl()
+
+        out = []
+        for risk_amount in risk_amounts:
+            if killed:
+                out.append((False, "KILL_SWITCH_ACTIVE"))
+                continue
+
+            if trades >= MAX_TRADES_PER_DAY:
+                out.append((False, "MAX_TRADES_EXCEEDED"))
+                continue
+
+            if daily_loss < -self.capital * MAX_DAILY_LOSS:
+                self.storage.set_risk_flag(KILL_SWITCH_KEY, "ON")
+                killed = True
+                out.append((False, "MAX_DAILY_LOSS"))
+                continue
+
+            if risk_amount > self.capital * MAX_TRADE_RISK:
+                out.append((False, "TRADE_RISK_TOO_HIGH"))
+                continue
+
+            trades += 1
+            out.append((True, "OK"))
+        return out
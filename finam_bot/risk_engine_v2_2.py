@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Callable, Dict, Iterable, List, Mapping, Tuple
+
+from finam_bot.portfolio.exposure import ClassExposure
 
 # --- Конфигурация (ЗАФИКСИРОВАНА) ---
 
@@ -47,11 +49,90 @@ class RiskEngineV22:
     asset_class — ОБЯЗАТЕЛЬНО.
     """
 
-    def __init__(self, storage, equity: float):
+    def __init__(self, storage, equity: float, registry=None):
         self.storage = storage
         self.equity = equity
+        # InstrumentRegistry: asset_class по symbol и проверка торговой сессии
+        self.registry = registry
+
+    def _totals(self, asset_class: str) -> ClassExposure:
+        """
+        StorageSQLite отдаёт агрегаты класса из ExposureCache одним
+        обращением; для прочих storage — три отдельных запроса.
+        """
+        if hasattr(self.storage, "exposure_totals"):
+            return self.storage.exposure_totals(asset_class)
+        return ClassExposure(
+            self.storage.count_open_positions(asset_class=asset_class),
+            self.storage.sum_open_risk(asset_class=asset_class),
+            self.storage.sum_exposure(asset_class=asset_class),
+        )
+
+    def check(
+        self,
+        *,
+        qty: float,
+        entry: float,
+        stop: float,
+        asset_class: str | None = None,
+        symbol: str | None = None,
+        ts: float | None = None,
+    ) -> RiskVerdict:
+        return self._check(
+            self._totals, qty=qty, entry=entry, stop=stop,
+            asset_class=asset_class, symbol=symbol, ts=ts,
+        )
+
+    def check_batch(self, candidates: Iterable[Mapping]) -> List[RiskVerdict]:
+        """
+        Пачка кандидатов (dict с аргументами check) против одного снимка
+        агрегатов. Кандидаты проверяются по порядку; принятый сразу
+        занимает лимиты класса так, как его учтёт storage после открытия
+        позиции: +1 позиция, +|qty * entry| к риску и экспозиции.
+        Для одиночного кандидата результат тот же, что у check().
+        """
+        snapshot: Dict[str, ClassExposure] = {}
+
+        def totals_for(asset_class: str) -> ClassExposure:
+            t = snapshot.get(asset_class)
+            if t is None:
+                t = snapshot[asset_class] = self._totals(asset_class)
+            return t
+
+        verdicts = []
+        for c in candidates:
+            verdict = self._check(totals_for, **c)
+            if verdict.allowed:
+                t = snapshot[verdict.asset_class]
+                value = abs(c["qty"] * c["entry"])
+                snapshot[verdict.asset_class] = ClassExposure(
+                    t.count + 1, t.risk + value, t.exposure + value
+                )
+            verdicts.append(verdict)
+        return verdicts
+
+    def _check(
+        self,
+        totals_for: Callable[[str], ClassExposure],
+        *,
+        qty: float,
+        entry: float,
+        stop: float,
+        asset_class: str | None = None,
+        symbol: str | None = None,
+        ts: float | None = None,
+    ) -> RiskVerdict:
+        if symbol is not None and self.registry is not None:
+            info = self.registry.get(symbol)
+            if info is not None:
+                asset_class = asset_class or info.asset_class
+                if self.registry.has_schedule(symbol, ts) and not self.registry.is_open(symbol, ts):
+                    return RiskVerdict(
+                        False,
+                        "MARKET_CLOSED",
+                        asset_class
+                    )
 
-    def check(self, *, qty: float, entry: float, stop: float, asset_class: str) -> RiskVerdict:
         if asset_class not in MAX_POSITIONS_BY_CLASS:
             return RiskVerdict(
                 False,
@@ -59,8 +140,10 @@ class RiskEngineV22:
                 asset_class
             )
 
+        totals = totals_for(asset_class)
+
         # 1. Количество позиций по классу
-        open_positions = self.storage.count_open_positions(asset_class=asset_class)
+        open_positions = totals.count
         limit_positions = MAX_POSITIONS_BY_CLASS[asset_class]
 
         if open_positions >= limit_positions:
@@ -88,7 +171,7 @@ class RiskEngineV22:
             )
 
         # 3. Совокупный риск по классу
-        current_risk = self.storage.sum_open_risk(asset_class=asset_class)
+        current_risk = totals.risk
         total_risk_pct = (current_risk + trade_risk) / self.equity
 
         if total_risk_pct > max_risk_pct:
@@ -101,7 +184,7 @@ class RiskEngineV22:
             )
 
         # 4. Экспозиция по классу
-        exposure = self.storage.sum_exposure(asset_class=asset_class)
+        exposure = totals.exposure
         exposure_pct = (exposure + qty * entry) / self.equity
 
         max_exposure_pct = MAX_EXPOSURE_PCT_BY_CLASS[asset_class]
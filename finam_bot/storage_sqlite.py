@@ -1,31 +1,119 @@
 # finam_bot/storage_sqlite.py
 
+import logging
+import os
 import sqlite3
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set
+
+from finam_bot.infra.sqlite_writer import SQLiteWriter, apply_wal_pragmas
+from finam_bot.portfolio.exposure import ClassExposure, ExposureCache
+
+logger = logging.getLogger(__name__)
+
+# откат high-water mark при инкрементальной синхронизации:
+# сделки, пришедшие с опозданием в пределах окна, не теряются (дедуп по id)
+SYNC_OVERLAP_SECONDS = 300
+SYNC_INITIAL_DAYS = 7
+
+# cashflow сделки для daily_trade_stats (RiskEngine.daily_pnl): BUY -> минус, SELL -> плюс
+_CASH_FLOW = "{t}.qty * {t}.price * CASE WHEN {t}.side IN ('SELL','SIDE_SELL') THEN 1 ELSE -1 END"
 
 
 class StorageSQLite:
-    def __init__(self, db_path: Optional[str] = None):
+    """
+    mode="default" — одно соединение, commit на каждую запись (как раньше).
+    mode="wal"     — WAL + pragmas, записи уходят в фоновый SQLiteWriter
+                     (group commit раз в commit_interval), чтение — через
+                     отдельное соединение на поток. Записи видны читателям
+                     после commit пачки; flush() — дождаться.
+    По умолчанию mode берётся из FINAM_DB_MODE.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        *,
+        mode: Optional[str] = None,
+        commit_interval: float = 0.05,
+        max_queue: int = 10_000,
+    ):
         if db_path is None:
             db_path = Path(__file__).parent / "data" / "finam.db"
         self.db_path = str(db_path)
+        self.mode = (mode or os.getenv("FINAM_DB_MODE") or "default").lower()
+        if self.mode not in ("default", "wal"):
+            raise ValueError(f"Unknown storage mode: {self.mode}")
 
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        self.writer: Optional[SQLiteWriter] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        if self.mode == "wal":
+            conn = apply_wal_pragmas(sqlite3.connect(self.db_path))
+            self._init_db(conn)
+            conn.close()
+            self.writer = SQLiteWriter(
+                self.db_path, commit_interval=commit_interval, max_queue=max_queue
+            ).start()
+        else:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.row_factory = sqlite3.Row
+            self._init_db(self._conn)
 
-        self._init_db()
+        self.exposure = ExposureCache()
+        self.reconcile_exposure()
+
+    # ------------------------------------------------------------------
+    # CONNECTIONS
+    # ------------------------------------------------------------------
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Соединение для чтения: общее (default) или своё на поток (wal).
+        """
+        if self._conn is not None:
+            return self._conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA cache_size=-8000")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _write(self, op) -> None:
+        """
+        op(conn) — только SQL, без commit.
+        """
+        if self.writer is not None:
+            self.writer.submit(op)
+            return
+        with self._conn:
+            op(self._conn)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        if self.writer is not None:
+            return self.writer.flush(timeout)
+        return True
 
     # ------------------------------------------------------------------
     # INIT
     # ------------------------------------------------------------------
 
-    def _init_db(self):
+    def _init_db(self, conn: sqlite3.Connection):
         # TRADES
-        self.conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS trades (
                 id TEXT PRIMARY KEY,
@@ -42,12 +130,48 @@ class StorageSQLite:
             """
         )
 
-        self.conn.execute(
+        conn.execute(
             "CREATE INDEX IF NOT EXISTS idx_trades_symbol_ts ON trades(symbol, ts)"
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_trades_account_ts ON trades(account_id, ts)"
+        )
+
+        # TRANSACTIONS
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transactions (
+                id TEXT PRIMARY KEY,
+                account_id TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                symbol TEXT,
+                kind TEXT,
+                amount REAL,
+                currency TEXT,
+                description TEXT,
+                raw_json TEXT
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_account_ts ON transactions(account_id, ts)"
+        )
+
+        # SYNC STATE: high-water mark по счёту и потоку (trades / transactions)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                account_id TEXT NOT NULL,
+                stream TEXT NOT NULL,
+                hwm_ts TEXT NOT NULL,
+                updated_ts TEXT NOT NULL,
+                PRIMARY KEY (account_id, stream)
+            )
+            """
+        )
 
         # POSITIONS
-        self.conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS positions (
                 instrument TEXT NOT NULL,
@@ -60,9 +184,88 @@ class StorageSQLite:
             )
             """
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_positions_asset_class ON positions(asset_class)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_positions_instrument ON positions(instrument)"
+        )
+
+        # DAILY TRADE STATS: счётчик и cashflow-PnL сделок по дню (UTC),
+        # ведётся триггерами — RiskEngine читает одну строку по PK вместо
+        # substr(ts,1,10) по всей trades
+        created = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='daily_trade_stats'"
+        ).fetchone() is None
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_trade_stats (
+                trade_date TEXT PRIMARY KEY,
+                trade_count INTEGER NOT NULL,
+                cash_pnl REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_trades_daily_ins AFTER INSERT ON trades
+            BEGIN
+                INSERT INTO daily_trade_stats (trade_date, trade_count, cash_pnl)
+                VALUES (substr(NEW.ts, 1, 10), 1, {_CASH_FLOW.format(t="NEW")})
+                ON CONFLICT(trade_date) DO UPDATE SET
+                    trade_count = trade_count + 1,
+                    cash_pnl = cash_pnl + excluded.cash_pnl;
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_trades_daily_del AFTER DELETE ON trades
+            BEGIN
+                UPDATE daily_trade_stats SET
+                    trade_count = trade_count - 1,
+                    cash_pnl = cash_pnl - {_CASH_FLOW.format(t="OLD")}
+                WHERE trade_date = substr(OLD.ts, 1, 10);
+            END
+            """
+        )
+        if created:
+            # миграция существующей БД: один проход по trades
+            conn.execute(
+                f"""
+                INSERT INTO daily_trade_stats (trade_date, trade_count, cash_pnl)
+                SELECT substr(ts, 1, 10), COUNT(*), SUM({_CASH_FLOW.format(t="trades")})
+                FROM trades
+                GROUP BY substr(ts, 1, 10)
+                """
+            )
+
+        # RISK STATE: флаги RiskEngine (KILL_SWITCH и т.п.)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS risk_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_ts TEXT NOT NULL
+            )
+            """
+        )
+
+        # EXPOSURE SUMMARY (агрегаты positions по классу, см. ExposureCache)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS exposure_summary (
+                asset_class TEXT PRIMARY KEY,
+                open_count INTEGER NOT NULL,
+                open_risk REAL NOT NULL,
+                exposure REAL NOT NULL,
+                updated_ts TEXT NOT NULL
+            )
+            """
+        )
 
         # DECISIONS (Risk v2.2)
-        self.conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS decisions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -80,7 +283,7 @@ class StorageSQLite:
             """
         )
 
-        self.conn.commit()
+        conn.commit()
 
     # ------------------------------------------------------------------
     # HELPERS
@@ -94,25 +297,72 @@ class StorageSQLite:
     # TRADES
     # ------------------------------------------------------------------
 
-    def insert_trades(self, trades, account_id: str):
-        rows = []
-        for t in trades:
-            rows.append(
-                (
-                    t.id,
-                    account_id,
-                    str(t.timestamp),
-                    t.symbol,
-                    t.side,
-                    float(t.qty),
-                    float(t.price),
-                    float(t.commission) if t.commission is not None else None,
-                    getattr(t, "currency", None),
-                    str(t),
-                )
+    @staticmethod
+    def _trade_row(t, account_id: Optional[str]) -> tuple:
+        if isinstance(t, dict):
+            # нормализованная сделка (schema.TRADE_FIELDS) или строка таблицы
+            symbol = t.get("symbol") or ""
+            if t.get("mic") and "@" not in symbol:
+                symbol = f"{symbol}@{t['mic']}"
+            commission = t.get("commission")
+            return (
+                str(t.get("id") or t.get("trade_id")),
+                t.get("account_id") or account_id,
+                _row_ts(t),
+                symbol,
+                t.get("side") or "",
+                float(t.get("qty") or 0.0),
+                float(t.get("price") or 0.0),
+                float(commission) if commission is not None else None,
+                t.get("currency"),
+                t.get("raw_json") or str(t),
             )
+        return (
+            t.id,
+            account_id,
+            str(t.timestamp),
+            t.symbol,
+            t.side,
+            float(t.qty),
+            float(t.price),
+            float(t.commission) if t.commission is not None else None,
+            getattr(t, "currency", None),
+            str(t),
+        )
+
+    @staticmethod
+    def _transaction_row(t: dict, account_id: Optional[str]) -> tuple:
+        return (
+            str(t["id"]),
+            t.get("account_id") or account_id,
+            _row_ts(t),
+            t.get("symbol") or None,
+            t.get("kind") or t.get("category"),
+            float(t.get("amount") or 0.0),
+            t.get("currency"),
+            t.get("description"),
+            t.get("raw_json") or str(t),
+        )
+
+    @staticmethod
+    def _build_rows(build, items, account_id: Optional[str], stream: str) -> List[tuple]:
+        """
+        Строки без ts (FinamClient._ts_to_iso -> None) или с неразбираемым ts
+        пропускаются с предупреждением: иначе падает вся пачка и
+        high-water mark не двигается.
+        """
+        rows = []
+        for item in items:
+            try:
+                rows.append(build(item, account_id))
+            except ValueError as e:
+                key = item.get("trade_id") or item.get("id") if isinstance(item, dict) else item
+                logger.warning("skip %s row %s: %s", stream, key, e)
+        return rows
 
-        self.conn.executemany(
+    @staticmethod
+    def _insert_trade_rows(conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        conn.executemany(
             """
             INSERT OR IGNORE INTO trades (
                 id, account_id, ts, symbol, side,
@@ -122,52 +372,351 @@ class StorageSQLite:
             """,
             rows,
         )
-        self.conn.commit()
+
+    @staticmethod
+    def _insert_transaction_rows(conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO transactions (
+                id, account_id, ts, symbol, kind,
+                amount, currency, description, raw_json
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+    def insert_trades(self, trades, account_id: Optional[str] = None):
+        rows = self._build_rows(self._trade_row, trades, account_id, "trades")
+        self._write(lambda conn: self._insert_trade_rows(conn, rows))
+
+    def get_trades(self, account_id: str, since: Optional[str] = None, limit: Optional[int] = None):
+        sql = "SELECT * FROM trades WHERE account_id = ?"
+        args: list = [account_id]
+        if since is not None:
+            sql += " AND ts >= ?"
+            args.append(normalize_ts(since))
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return [dict(r) for r in self.conn.execute(sql, args).fetchall()]
+
+    def existing_trade_ids(self, trade_ids: Iterable[str]) -> Set[str]:
+        """
+        Какие из trade_ids уже записаны в trades.
+        """
+        ids = list(trade_ids)
+        if not ids:
+            return set()
+        marks = ",".join("?" * len(ids))
+        rows = self.conn.execute(f"SELECT id FROM trades WHERE id IN ({marks})", ids).fetchall()
+        return {r["id"] for r in rows}
 
     # ------------------------------------------------------------------
-    # POSITIONS (used by Risk)
+    # TRANSACTIONS
     # ------------------------------------------------------------------
 
-    def count_open_positions(self, asset_class: str) -> int:
+    def insert_transactions(self, transactions, account_id: Optional[str] = None):
+        rows = self._build_rows(self._transaction_row, transactions, account_id, "transactions")
+        self._write(lambda conn: self._insert_transaction_rows(conn, rows))
+
+    def get_transactions(self, account_id: str, since: Optional[str] = None, limit: Optional[int] = None):
+        sql = "SELECT * FROM transactions WHERE account_id = ?"
+        args: list = [account_id]
+        if since is not None:
+            sql += " AND ts >= ?"
+            args.append(normalize_ts(since))
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return [dict(r) for r in self.conn.execute(sql, args).fetchall()]
+
+    # ------------------------------------------------------------------
+    # DAILY STATS / RISK STATE (used by RiskEngine)
+    # ------------------------------------------------------------------
+
+    def get_daily_trade_stats(self, trade_date: str) -> tuple:
+        """
+        (trade_count, cash_pnl) за день YYYY-MM-DD (UTC, как trades.ts).
+        cash_pnl: BUY -> минус, SELL -> плюс.
+        """
         row = self.conn.execute(
-            """
-            SELECT COUNT(*) AS cnt
-            FROM positions
-            WHERE qty != 0 AND asset_class = ?
-            """,
-            (asset_class,),
+            "SELECT trade_count, cash_pnl FROM daily_trade_stats WHERE trade_date = ?",
+            (trade_date,),
         ).fetchone()
-        return int(row["cnt"] or 0)
+        if row is None:
+            return 0, 0.0
+        return int(row["trade_count"]), float(row["cash_pnl"] or 0.0)
 
-    def sum_exposure(self, asset_class: str) -> float:
+    def get_risk_flag(self, key: str, default: Optional[str] = None) -> Optional[str]:
         row = self.conn.execute(
+            "SELECT value FROM risk_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row is not None else default
+
+    def set_risk_flag(self, key: str, value: str) -> None:
+        ts = self._now_iso()
+        self._write(lambda conn: conn.execute(
             """
-            SELECT SUM(ABS(qty * avg_price)) AS exposure
-            FROM positions
-            WHERE qty != 0 AND asset_class = ?
+            INSERT INTO risk_state (key, value, updated_ts) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                updated_ts = excluded.updated_ts
             """,
-            (asset_class,),
+            (key, value, ts),
+        ))
+
+    # ------------------------------------------------------------------
+    # SYNC (high-water marks)
+    # ------------------------------------------------------------------
+
+    def get_watermark(self, account_id: str, stream: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT hwm_ts FROM sync_state WHERE account_id = ? AND stream = ?",
+            (account_id, stream),
+        ).fetchone()
+        if row is not None:
+            return row["hwm_ts"]
+        # БД, наполненная до sync_state, — берём максимум по таблице
+        table = "trades" if stream == "trades" else "transactions"
+        row = self.conn.execute(
+            f"SELECT MAX(ts) AS ts FROM {table} WHERE account_id = ?", (account_id,)
         ).fetchone()
-        return float(row["exposure"] or 0.0)
+        return row["ts"]
+
+    def _since(self, account_id: str, stream: str) -> str:
+        hwm = self.get_watermark(account_id, stream)
+        start = None
+        if hwm is not None:
+            try:
+                start = parse_iso(hwm) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            except ValueError:
+                pass    # legacy-формат ts — как без метки
+        if start is None:
+            # первичная загрузка
+            start = datetime.now(timezone.utc) - timedelta(days=SYNC_INITIAL_DAYS)
+        return to_iso(start)
+
+    def get_since_trades(self, account_id: str) -> str:
+        """
+        ISO (UTC, 'Z') начала следующей выгрузки: hwm - overlap,
+        первый запуск — SYNC_INITIAL_DAYS назад.
+        """
+        return self._since(account_id, "trades")
+
+    def get_since_transactions(self, account_id: str) -> str:
+        return self._since(account_id, "transactions")
+
+    def save_sync_batch(
+        self,
+        account_id: str,
+        trades: Iterable[dict] = (),
+        transactions: Iterable[dict] = (),
+    ) -> dict:
+        """
+        Сделки + операции + новые high-water marks — одной транзакцией:
+        метка не может уехать вперёд строк, которые не записались.
+        """
+        trade_rows = self._build_rows(self._trade_row, trades, account_id, "trades")
+        tx_rows = self._build_rows(self._transaction_row, transactions, account_id, "transactions")
+        now = self._now_iso()
+
+        def op(conn):
+            self._insert_trade_rows(conn, trade_rows)
+            self._insert_transaction_rows(conn, tx_rows)
+            for stream, rows in (("trades", trade_rows), ("transactions", tx_rows)):
+                if not rows:
+                    continue
+                hwm = max(r[2] for r in rows)
+                conn.execute(
+                    """
+                    INSERT INTO sync_state (account_id, stream, hwm_ts, updated_ts)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(account_id, stream) DO UPDATE SET
+                        hwm_ts = MAX(hwm_ts, excluded.hwm_ts),
+                        updated_ts = excluded.updated_ts
+                    """,
+                    (account_id, stream, hwm, now),
+                )
+
+        self._write(op)
+        return {"trades": len(trade_rows), "transactions": len(tx_rows)}
+
+    # ------------------------------------------------------------------
+    # POSITIONS (used by Risk)
+    # ------------------------------------------------------------------
+
+    def upsert_position(
+        self,
+        instrument: str,
+        *,
+        side: str,
+        qty: float,
+        avg_price: float,
+        asset_class: Optional[str],
+        realized_pnl: float = 0.0,
+    ) -> None:
+        """
+        Одна строка на instrument; qty == 0 — позиция закрыта (удаляется).
+        Кэш агрегатов обновляется сразу; positions и exposure_summary —
+        одной транзакцией (итоги берутся из кэша в момент записи).
+        """
+        self.exposure.set(instrument, asset_class, qty, avg_price)
+        ts = self._now_iso()
+
+        def op(conn):
+            conn.execute("DELETE FROM positions WHERE instrument = ?", (instrument,))
+            if qty:
+                conn.execute(
+                    """
+                    INSERT INTO positions (instrument, side, qty, avg_price, realized_pnl, updated_ts, asset_class)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (instrument, side, qty, avg_price, realized_pnl, ts, asset_class),
+                )
+            self._write_summary(conn, self._summary_rows(), ts)
+
+        self._write(op)
+
+    def delete_position(self, instrument: str) -> None:
+        self.exposure.remove(instrument)
+        ts = self._now_iso()
+
+        def op(conn):
+            conn.execute("DELETE FROM positions WHERE instrument = ?", (instrument,))
+            self._write_summary(conn, self._summary_rows(), ts)
+
+        self._write(op)
+
+    def replace_positions(self, positions: Iterable[dict]) -> int:
+        """
+        Полная замена positions (пересчёт из сделок / выгрузка брокера).
+        dict: instrument, side, qty, avg_price, asset_class[, realized_pnl].
+        """
+        ts = self._now_iso()
+        rows = [
+            (p["instrument"], p["side"], float(p["qty"]), float(p["avg_price"]),
+             float(p.get("realized_pnl") or 0.0), ts, p.get("asset_class"))
+            for p in positions
+            if float(p["qty"]) != 0
+        ]
+        self.exposure.load((r[0], r[6], r[2], r[3]) for r in rows)
+
+        def op(conn):
+            conn.execute("DELETE FROM positions")
+            conn.executemany(
+                """
+                INSERT INTO positions (instrument, side, qty, avg_price, realized_pnl, updated_ts, asset_class)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            self._write_summary(conn, self._summary_rows(), ts)
+
+        self._write(op)
+        return len(rows)
+
+    def reconcile_exposure(self) -> bool:
+        """
+        Перестраивает кэш из positions (их могли менять в обход storage —
+        скрипты, ручные правки) и переписывает exposure_summary, если
+        сохранённые итоги разошлись. True — итоги совпали.
+        """
+        rows = self.conn.execute(
+            "SELECT instrument, asset_class, qty, avg_price FROM positions WHERE qty != 0"
+        ).fetchall()
+        self.exposure.load(tuple(r) for r in rows)
+
+        stored = {
+            r["asset_class"]: ClassExposure(r["open_count"], r["open_risk"], r["exposure"])
+            for r in self.conn.execute(
+                "SELECT asset_class, open_count, open_risk, exposure FROM exposure_summary"
+            )
+        }
+        actual = self.exposure.totals()
+        in_sync = stored.keys() == actual.keys() and all(
+            stored[k].count == v.count
+            and abs(stored[k].risk - v.risk) < 1e-6
+            and abs(stored[k].exposure - v.exposure) < 1e-6
+            for k, v in actual.items()
+        )
+        if not in_sync:
+            if stored:
+                logger.warning("exposure_summary out of sync with positions, rebuilding")
+            summary = self._summary_rows()
+            ts = self._now_iso()
+            self._write(lambda conn: self._write_summary(conn, summary, ts))
+        return in_sync
+
+    def _summary_rows(self) -> List[tuple]:
+        return [(k, v.count, v.risk, v.exposure) for k, v in self.exposure.totals().items()]
+
+    @staticmethod
+    def _write_summary(conn: sqlite3.Connection, rows: List[tuple], ts: str) -> None:
+        conn.execute("DELETE FROM exposure_summary")
+        conn.executemany(
+            """
+            INSERT INTO exposure_summary (asset_class, open_count, open_risk, exposure, updated_ts)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [(*r, ts) for r in rows],
+        )
+
+    def exposure_totals(self, asset_class: str) -> ClassExposure:
+        return self.exposure.get(asset_class)
+
+    def count_open_positions(self, asset_class: str) -> int:
+        return self.exposure.get(asset_class).count
+
+    def sum_exposure(self, asset_class: str) -> float:
+        return self.exposure.get(asset_class).exposure
 
     def sum_open_risk(self, asset_class: str) -> float:
         """
         Risk = |qty| * |avg_price|
         (упрощённая модель, корректная для v2.2)
         """
-        row = self.conn.execute(
-            """
-            SELECT SUM(ABS(qty * avg_price)) AS risk
-            FROM positions
-            WHERE qty != 0 AND asset_class = ?
-            """,
-            (asset_class,),
-        ).fetchone()
-        return float(row["risk"] or 0.0)
+        return self.exposure.get(asset_class).risk
 
     # ------------------------------------------------------------------
     # DECISIONS (Risk v2.2)
     # ------------------------------------------------------------------
+    _DECISION_INSERT = """
+        INSERT INTO decisions (
+            ts,
+            symbol,
+            asset_class,
+            side,
+            qty,
+            entry,
+            stop,
+            allowed,
+            reason,
+            confidence
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _decision_row(decision: dict) -> tuple:
+        # DecisionWriter / run_signals пишут risk_allowed / risk_reason
+        allowed = decision["allowed"] if "allowed" in decision else decision["risk_allowed"]
+        reason = decision["reason"] if "reason" in decision else decision["risk_reason"]
+        return (
+            decision["ts"],
+            decision["symbol"],
+            decision["asset_class"],
+            decision.get("side"),
+            decision.get("qty"),
+            decision.get("entry"),
+            decision.get("stop"),
+            1 if allowed else 0,
+            reason,
+            decision.get("confidence"),
+        )
+
     def insert_decision(self, decision: dict):
 
         """
@@ -179,44 +728,56 @@ class StorageSQLite:
             qty
             entry
             stop
-            allowed (bool)
-            reason
+            allowed (bool)     | risk_allowed
+            reason             | risk_reason
             confidence
         """
-        self.conn.execute(
-            """
-            INSERT INTO decisions (
-                ts,
-                symbol,
-                asset_class,
-                side,
-                qty,
-                entry,
-                stop,
-                allowed,
-                reason,
-                confidence
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                decision["ts"],
-                decision["symbol"],
-                decision["asset_class"],
-                decision.get("side"),
-                decision.get("qty"),
-                decision.get("entry"),
-                decision.get("stop"),
-                1 if decision["allowed"] else 0,
-                decision["reason"],
-                decision.get("confidence"),
-            ),
-        )
-        self.conn.commit()
+        row = self._decision_row(decision)
+        self._write(lambda conn: conn.execute(self._DECISION_INSERT, row))
+
+    def insert_decisions(self, decisions: Iterable[dict]) -> int:
+        """
+        Пачка решений одной транзакцией (executemany).
+        """
+        rows = [self._decision_row(d) for d in decisions]
+        if rows:
+            self._write(lambda conn: conn.executemany(self._DECISION_INSERT, rows))
+        return len(rows)
 
     # ------------------------------------------------------------------
     # CLOSE
     # ------------------------------------------------------------------
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        if self.writer is not None:
+            self.writer.stop()      # дописывает очередь
+            self.writer = None
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        if self._conn is not None:
+            self._conn.close()
+
+
+def parse_iso(ts: str) -> datetime:
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def to_iso(dt: datetime) -> str:
+    # фиксированная ширина (всегда микросекунды) — строки сравниваются как время
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def normalize_ts(ts: str) -> str:
+    return to_iso(parse_iso(ts))
+
+
+def _row_ts(row: dict) -> str:
+    ts = row.get("ts")
+    if not ts:
+        raise ValueError("missing ts")
+    return normalize_ts(ts)
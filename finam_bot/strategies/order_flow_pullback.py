@@ -6,6 +6,7 @@ from typing import Optional
 from finam_bot.core.market_snapshot import MarketSnapshot
 from finam_bot.core.orderflow_absorption import OrderFlowAbsorptionDetector
 from finam_bot.core.orderflow_analyzer import OrderFlowAnalyzer
+from finam_bot.core.orderflow_batch import TapeStats, evaluate_orderflow_batch
 from finam_bot.core.orderflow_composite import build_composite_signal
 from finam_bot.core.signals import Signal
 
@@ -53,7 +54,29 @@ class OrderFlowPullbackStrategy:
         self.infer_absorption_side_from_imbalance = infer_absorption_side_from_imbalance
         self.infer_opposite_tol_threshold = float(infer_opposite_tol_threshold)
 
-    def on_snapshot(self, snapshot: MarketSnapshot) -> Signal:
+    def evaluate_batch(self, bid, ask, tape: Optional[TapeStats] = None, divergence=None):
+        """
+        Векторный on_snapshot для всех баров сразу (см. core.orderflow_batch).
+        Возвращает (signal int8: 1 BUY / -1 SELL / 0 HOLD, strength, confidence).
+        """
+        return evaluate_orderflow_batch(
+            bid,
+            ask,
+            tape,
+            divergence,
+            min_confidence=self.min_confidence,
+            imbalance_threshold=self.imbalance_analyzer.imbalance_threshold,
+            imbalance_min_volume=self.imbalance_analyzer.min_volume,
+            absorption_min_volume=self.absorption_detector.min_volume,
+            absorption_price_tolerance=self.absorption_detector.price_tolerance,
+            infer_absorption_side_from_imbalance=self.infer_absorption_side_from_imbalance,
+            infer_opposite_tol_threshold=self.infer_opposite_tol_threshold,
+        )
+
+    def on_snapshot(self, snapshot: MarketSnapshot, divergence=None) -> Signal:
+        """
+        divergence — опциональный DivergenceSignal от CvdTracker на этом баре.
+        """
         # 1) imbalance
         imbalance = self.imbalance_analyzer.analyze(snapshot)
 
@@ -79,7 +102,11 @@ class OrderFlowPullbackStrategy:
                 absorption.side = imbalance.side
 
         # 3) composite
-        composite = build_composite_signal(imbalance=imbalance, absorption=absorption)
+        composite = build_composite_signal(
+            imbalance=imbalance,
+            absorption=absorption,
+            divergence=divergence,
+        )
 
         if composite is None:
             self.last_confidence = 0.0
@@ -9,7 +9,12 @@ from finam_bot.config import TELEGRAM_TOKEN
 
 
 class TelegramController:
-    def __init__(self):
+    def __init__(self, state=None):
+        """
+        state — OrderStateCache (опционально): /status читает локальное
+        состояние счёта без RPC.
+        """
+        self.state = state
         if not TELEGRAM_TOKEN:
             raise RuntimeError("TELEGRAM_TOKEN не задан")
 
@@ -32,7 +37,10 @@ class TelegramController:
         )
 
     async def status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await update.message.reply_text("🟢 Bot работает (READ-ONLY)")
+        text = "🟢 Bot работает (READ-ONLY)"
+        if self.state is not None:
+            text += "\n" + self.state.summary()
+        await update.message.reply_text(text)
 
     # === Lifecycle ===
 
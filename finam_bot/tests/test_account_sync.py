@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+from finam_bot.portfolio.sync import AccountSync, fetch_paged
+from finam_bot.storage_sqlite import StorageSQLite
+
+T0 = datetime(2026, 2, 10, 10, 0, tzinfo=timezone.utc)
+
+
+class Client:
+    """
+    Trades / Transactions как у API: interval + limit, без курсора,
+    новые сначала (порядок для fetch_paged не важен).
+    """
+
+    account_id = "ACC1"
+
+    def __init__(self, n_trades):
+        self.trades = [
+            {"trade_id": f"T{i}", "account_id": "ACC1", "ts": (T0 + timedelta(minutes=i)).isoformat(),
+             "symbol": "SBER", "mic": "MISX", "side": "BUY", "qty": 1.0, "price": 100.0 + i, "order_id": "O"}
+            for i in range(n_trades)
+        ]
+        self.transactions = [
+            {"id": "X1", "ts": T0.isoformat(), "symbol": "", "category": "COMMISSION",
+             "amount": -1.5, "currency": "RUB", "description": "fee"},
+        ]
+        self.pages = 0
+        self.returned = 0
+
+    def _page(self, rows, start, end, limit):
+        self.pages += 1
+        hit = [r for r in rows if start <= datetime.fromisoformat(r["ts"]) <= end]
+        hit = sorted(hit, key=lambda r: r["ts"], reverse=True)[:limit]
+        self.returned += len(hit)
+        return hit
+
+    def fetch_trades(self, since=None, until=None, page_size=500):
+        return fetch_paged(lambda a, b, n: self._page(self.trades, a, b, n), since, until, page_size)
+
+    def fetch_transactions(self, since=None, until=None, page_size=500):
+        return fetch_paged(lambda a, b, n: self._page(self.transactions, a, b, n), since, until, page_size)
+
+
+def test_fetch_paged_splits_full_pages():
+    client = Client(250)
+    rows = client.fetch_trades(since=T0 - timedelta(hours=1), until=T0 + timedelta(days=1), page_size=100)
+    assert sorted(r["trade_id"] for r in rows) == sorted(f"T{i}" for i in range(250))
+
+
+def test_sync_is_incremental_and_atomic(tmp_path, monkeypatch):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    client = Client(250)
+    sync = AccountSync(client, storage, page_size=100)
+    now = T0 + timedelta(days=1)
+
+    # первый запуск: 7 дней назад от "сейчас" реального времени не покрывает T0 —
+    # задаём начальную метку как у старой БД
+    monkeypatch.setattr("finam_bot.storage_sqlite.SYNC_INITIAL_DAYS", 365 * 10)
+    first = sync.run(until=now)
+    assert (first.trades, first.transactions) == (250, 1)
+    assert len(storage.get_trades("ACC1")) == 250
+    assert storage.get_trades("ACC1")[0]["symbol"] == "SBER@MISX"
+    assert storage.get_transactions("ACC1")[0]["kind"] == "COMMISSION"
+    assert storage.get_watermark("ACC1", "trades").startswith("2026-02-10T14:09:00")
+
+    # второй запуск: два новых + overlap (5 мин) — не вся история
+    client.trades += [
+        {**client.trades[-1], "trade_id": f"T{i}", "ts": (T0 + timedelta(minutes=i)).isoformat()}
+        for i in (250, 251)
+    ]
+    client.returned = 0
+    second = sync.run(until=now)
+    assert second.trades_since.startswith("2026-02-10T14:04:00")
+    assert client.returned <= 10
+    assert len(storage.get_trades("ACC1")) == 252
+    assert len(storage.get_trades("ACC1", since="2026-02-10T14:10:00Z")) == 2
+    assert storage.get_watermark("ACC1", "trades").startswith("2026-02-10T14:11:00")
+
+
+def test_insert_dedup_and_since_defaults(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    trade = {"id": "TRADE_1", "account_id": "A", "ts": "2026-02-10T12:44:02Z", "symbol": "TEST",
+             "side": "BUY", "qty": 1.0, "price": 100.0, "commission": 1.0, "currency": "RUB"}
+    storage.insert_trades([trade])
+    storage.insert_trades([trade])
+    storage.insert_transactions([{"id": "TX_1", "account_id": "A", "ts": trade["ts"], "kind": "FEE", "amount": -1}])
+    storage.insert_transactions([{"id": "TX_1", "account_id": "A", "ts": trade["ts"], "kind": "FEE", "amount": -1}])
+
+    assert len(storage.get_trades("A")) == 1
+    assert len(storage.get_transactions("A")) == 1
+    # нет sync_state — метка из MAX(ts) минус overlap
+    assert storage.get_since_trades("A") == "2026-02-10T12:39:02.000000Z"
+    assert storage.get_since_trades("other") < datetime.now(timezone.utc).isoformat()
+
+
+def test_rows_without_ts_are_skipped_not_fatal(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    good = {"trade_id": "T1", "account_id": "A", "ts": "2026-02-10T12:00:00Z", "symbol": "SBER",
+            "side": "BUY", "qty": 1.0, "price": 100.0}
+    counts = storage.save_sync_batch(
+        "A",
+        trades=[good, {**good, "trade_id": "T2", "ts": None}, {**good, "trade_id": "T3", "ts": "garbage"}],
+        transactions=[{"id": "X1", "ts": None, "category": "FEE", "amount": -1}],
+    )
+
+    assert counts == {"trades": 1, "transactions": 0}
+    assert [t["id"] for t in storage.get_trades("A")] == ["T1"]
+    assert storage.get_watermark("A", "trades").startswith("2026-02-10T12:00:00")
+    assert storage.get_watermark("A", "transactions") is None
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+
+from finam_bot.backtest.backfill import BarsBackfill, CandleStore, merge_candles, split_range
+from finam_bot.backtest.candle_store import CANDLE_DTYPE
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2 as md
+
+DAY = 86400
+
+
+def utc(ts):
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+class FakeBarsClient:
+    """
+    Один бар в час, close = ts / 3600 + version.
+    """
+
+    def __init__(self, version=0.0):
+        self.version = version
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_bars(self, symbol, timeframe, start, end):
+        self.calls.append((symbol, int(start.timestamp()), int(end.timestamp())))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+
+        a, b = int(start.timestamp()), int(end.timestamp())
+        first = -(-a // 3600) * 3600
+        bars = [
+            md.Bar(timestamp={"seconds": ts}, close={"value": str(ts / 3600 + self.version)}, volume={"value": "1"})
+            for ts in range(first, b, 3600)
+        ]
+        return md.BarsResponse(symbol=symbol, bars=bars)
+
+
+def test_split_range_and_merge():
+    assert split_range(0, 25, 10) == [(0, 10), (10, 20), (20, 25)]
+    assert split_range(5, 5, 10) == []
+
+    old = np.zeros(3, dtype=CANDLE_DTYPE)
+    old["ts"], old["close"] = [0, 60, 120], [1, 2, 3]
+    new = np.zeros(2, dtype=CANDLE_DTYPE)
+    new["ts"], new["close"] = [120, 180], [30, 4]
+    merged = merge_candles(old, new)
+    assert merged["ts"].tolist() == [0, 60, 120, 180]
+    assert merged["close"].tolist() == [1, 2, 30, 4]
+
+
+def test_backfill_chunks_concurrently_and_fetches_only_tail(tmp_path):
+    store = CandleStore(tmp_path)
+    symbols = ["SBER@MISX", "GAZP@MISX"]
+
+    client = FakeBarsClient()
+    backfill = BarsBackfill(client, store, concurrency=3, chunk_seconds={"H1": DAY})
+    data = asyncio.run(backfill.run(symbols, "H1", utc(0), utc(5 * DAY)))
+
+    assert len(client.calls) == 10                 # 5 дней по дню на 2 символа
+    assert client.max_in_flight == 3
+    for s in symbols:
+        assert len(data[s]) == 5 * 24
+        assert store.path(s, "H1").exists()
+
+    # второй запуск: кэш покрывает [0, 5d), качаем только хвост с последнего бара
+    client2 = FakeBarsClient(version=0.5)
+    data2 = asyncio.run(
+        BarsBackfill(client2, store, chunk_seconds={"H1": DAY}).run(symbols, "H1", utc(DAY), utc(6 * DAY))
+    )
+    last = 5 * DAY - 3600
+    assert sorted(client2.calls) == sorted((s, a, b) for s in symbols for a, b in split_range(last, 6 * DAY, DAY))
+
+    arr = data2["SBER@MISX"]
+    assert arr["ts"][0] == DAY and arr["ts"][-1] == 6 * DAY - 3600
+    assert np.all(np.diff(arr["ts"]) == 3600)
+    # перезапрошенный последний бар заменён новой версией
+    assert arr["close"][arr["ts"] == last][0] == last / 3600 + 0.5
+    assert arr["close"][arr["ts"] == last - 3600][0] == (last - 3600) / 3600
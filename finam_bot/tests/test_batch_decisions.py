@@ -0,0 +1,63 @@
+from finam_bot.decisions.batch import decide_batch
+from finam_bot.qty import QtyCalculator
+from finam_bot.risk_engine_v2_2 import RiskEngineV22
+from finam_bot.signals.models import Signal
+from finam_bot.storage_sqlite import StorageSQLite
+
+
+def test_calc_batch_matches_calc():
+    calc = QtyCalculator(1000)
+    cases = [
+        (100.0, 99.0, "EQUITY"),
+        (100.0, 99.7, "EQUITY"),
+        (3.11, 3.08, "FUTURES"),
+        (100.0, 100.0, "EQUITY"),       # нулевой риск
+        (100.0, 0.0, "FUTURES"),        # меньше min_qty
+        (90.0, 89.0, "CURRENCY"),       # шаг 1000
+    ]
+    batch = calc.calc_batch(*zip(*cases))
+    assert list(batch) == [calc.calc(e, s, asset_class=ac) for e, s, ac in cases]
+
+
+def test_check_batch_consumes_limits_in_order(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    storage.upsert_position("BR", side="LONG", qty=1, avg_price=80.0, asset_class="FUTURES")
+    risk = RiskEngineV22(storage, equity=100_000)
+
+    candidate = dict(qty=1, entry=3.0, stop=2.9, asset_class="FUTURES")
+    assert risk.check_batch([candidate]) == [risk.check(**candidate)]
+
+    verdicts = risk.check_batch([candidate, candidate, dict(candidate, asset_class="EQUITY")])
+    assert [(v.allowed, v.reason) for v in verdicts] == [
+        (True, "OK"), (False, "MAX_POSITIONS_BY_CLASS"), (True, "OK"),
+    ]
+    # снимок локальный — storage не меняется
+    assert storage.count_open_positions("FUTURES") == 1
+    storage.close()
+
+
+def test_decide_batch_writes_all_decisions_once(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    calls = []
+    storage.insert_decisions = lambda ds, _orig=storage.insert_decisions: calls.append(len(ds)) or _orig(ds)
+    risk = RiskEngineV22(storage, equity=1_000_000)
+    classes = {"NG": "FUTURES", "SBER": "EQUITY"}
+
+    signals = [
+        Signal("NG", "BUY", 3.11, 3.08, "LEVEL_BOUNCE"),
+        Signal("NG", "BUY", 3.12, 3.08, "LEVEL_BOUNCE"),
+        Signal("NG", "BUY", 3.13, 3.08, "LEVEL_BOUNCE"),
+        Signal("SBER", "BUY", 100.0, 100.0, "FLAT"),
+        Signal("XXX", "BUY", 1.0, 0.9, "LEVEL_BOUNCE"),
+    ]
+    decisions = decide_batch(signals, qty_calc=QtyCalculator(30), risk=risk, storage=storage,
+                             asset_class_of=lambda s: classes[s])
+
+    assert [d["risk_reason"] for d in decisions] == [
+        "OK", "OK", "MAX_POSITIONS_BY_CLASS", "QTY_BLOCKED", "UNKNOWN_ASSET_CLASS",
+    ]
+    assert decisions[0]["qty"] == QtyCalculator(30).calc(3.11, 3.08, asset_class="FUTURES") > 0
+    assert calls == [5]
+    rows = storage.conn.execute("SELECT allowed, reason FROM decisions ORDER BY id").fetchall()
+    assert [tuple(r) for r in rows][:3] == [(1, "OK"), (1, "OK"), (0, "MAX_POSITIONS_BY_CLASS")]
+    storage.close()
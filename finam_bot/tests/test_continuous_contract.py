@@ -0,0 +1,120 @@
+import pytest
+
+from finam_bot.backtest.broker import BrokerSim, PercentCommission
+from finam_bot.backtest.candle_store import load_candles, save_candles
+from finam_bot.backtest.continuous import ContinuousContractBuilder, ContractSpec, files_source_key
+from finam_bot.backtest.models import Candle
+
+
+def bar(ts, px, vol=100.0):
+    return Candle(ts=ts, open=px, high=px + 0.5, low=px - 0.5, close=px, volume=vol)
+
+
+def make_series():
+    # NG-2.26 дешевле NG-3.26 на 10 пунктов, перекрытие на ts=3..4
+    return {
+        "NG-2.26": [bar(1, 100.0), bar(2, 101.0), bar(3, 102.0), bar(4, 103.0, vol=10)],
+        "NG-3.26": [bar(3, 112.0, vol=50), bar(4, 113.0, vol=200), bar(5, 114.0), bar(6, 115.0)],
+    }
+
+
+def test_back_adjusted_series_has_no_gap_on_roll():
+    builder = ContinuousContractBuilder(
+        [ContractSpec("NG-2.26", roll_ts=4), ContractSpec("NG-3.26")],
+        method="back",
+    )
+    candles, rolls = builder.build(make_series())
+
+    assert [c.ts for c in candles] == [1, 2, 3, 4, 5, 6]
+    assert [c.close for c in candles] == [110.0, 111.0, 112.0, 113.0, 114.0, 115.0]
+
+    assert len(rolls) == 1
+    r = rolls[0]
+    assert (r.ts, r.from_symbol, r.to_symbol) == (4, "NG-2.26", "NG-3.26")
+    assert (r.old_price, r.new_price, r.adjustment) == (102.0, 112.0, 10.0)
+
+
+def test_ratio_adjustment_and_volume_crossover_roll():
+    builder = ContinuousContractBuilder(
+        [ContractSpec("NG-2.26"), ContractSpec("NG-3.26")],
+        method="ratio",
+    )
+    candles, rolls = builder.build(make_series())
+
+    # объём NG-3.26 превысил NG-2.26 на ts=4 (200 > 10), на ts=3 ещё нет (50 < 100)
+    assert rolls[0].ts == 4
+    assert candles[0].close == pytest.approx(100.0 * 112.0 / 102.0)
+    assert candles[-1].close == 115.0
+
+
+def test_broker_roll_charges_commission_on_raw_prices():
+    broker = BrokerSim(start_equity=10_000.0, commission=PercentCommission(rate=0.001), max_leverage=10.0)
+    broker.open_position("NG-2.26", "LONG", price=112.0, qty=10, stop_loss=100.0, take_profit=130.0)
+
+    trade = broker.roll_position(to_symbol="NG-3.26", price=113.0, old_price=103.0, new_price=113.0)
+
+    assert trade.reason == "ROLL"
+    assert trade.pnl == pytest.approx(10.0)
+    assert broker.position.symbol == "NG-3.26"
+    assert broker.position.entry_price == 113.0
+    # 112*10*0.001 + 103*10*0.001 + 113*10*0.001
+    assert broker.equity == pytest.approx(10_000.0 + 10.0 - 1.12 - 1.03 - 1.13)
+
+
+def test_broker_roll_restores_position_when_new_leg_fails():
+    broker = BrokerSim(start_equity=1_000.0, commission=PercentCommission(rate=0.001))
+    broker.open_position("NG-2.26", "LONG", price=99.9, qty=10, stop_loss=90.0, take_profit=120.0)
+    before = (broker.position, broker.cash, broker.equity, broker.used_margin)
+
+    # после комиссии за выход на маржу новой ноги не хватает
+    with pytest.raises(RuntimeError, match="Not enough cash"):
+        broker.roll_position(to_symbol="NG-3.26", price=99.9)
+
+    assert (broker.position, broker.cash, broker.equity, broker.used_margin) == before
+    assert broker.position.symbol == "NG-2.26"
+    assert broker.trades == []
+
+
+def test_load_or_build_uses_binary_cache(tmp_path):
+    builder = ContinuousContractBuilder(
+        [ContractSpec("NG-2.26", roll_ts=4), ContractSpec("NG-3.26")],
+    )
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return make_series()
+
+    first, rolls1 = builder.load_or_build(loader, cache_dir=tmp_path, source_key="v1")
+    second, rolls2 = builder.load_or_build(loader, cache_dir=tmp_path, source_key="v1")
+
+    assert len(calls) == 1
+    assert first == second
+    assert rolls1 == rolls2
+
+
+def test_cache_key_follows_source_data(tmp_path):
+    builder = ContinuousContractBuilder(
+        [ContractSpec("NG-2.26", roll_ts=4), ContractSpec("NG-3.26")],
+    )
+    series = make_series()
+    first, _ = builder.load_or_build(lambda: series, cache_dir=tmp_path, source_key=None)
+
+    # докачали бар в последний контракт — кэш не должен отдать старый ряд
+    last = series["NG-3.26"][-1]
+    series["NG-3.26"] = list(series["NG-3.26"]) + [bar(last.ts + 1, last.close + 1.0)]
+    second, _ = builder.load_or_build(lambda: series, cache_dir=tmp_path, source_key=None)
+    assert len(second) == len(first) + 1
+
+    src = tmp_path / "NG-3.26.M1.candles"
+    save_candles(src, series["NG-3.26"])
+    key1 = files_source_key([src])
+    save_candles(src, series["NG-3.26"] + [bar(last.ts + 2, last.close)])
+    assert files_source_key([src]) != key1
+
+
+def test_candle_store_roundtrip(tmp_path):
+    candles = [bar(1, 100.0), Candle(ts=None, open=1.0, high=2.0, low=0.5, close=1.5)]
+    path = tmp_path / "x.candles"
+    save_candles(path, candles)
+    assert load_candles(path) == candles
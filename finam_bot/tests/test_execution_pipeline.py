@@ -0,0 +1,231 @@
+import asyncio
+
+import grpc
+
+from finam_bot.execution.pipeline import ExecutionPipeline
+from finam_bot.grpc.aio_client import AsyncFinamClient
+from finam_bot.grpc_api.grpc.tradeapi.v1 import trade_pb2
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2 as od
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2_grpc
+from finam_bot.infra.metrics import MetricsRegistry
+
+
+class FakeOrders(orders_service_pb2_grpc.OrdersServiceServicer):
+    """
+    PlaceOrder: сделка публикуется ДО ответа (проверка буфера сирот),
+    затем ack NEW и финальный FILLED в стрим ордеров.
+    Лимитные ордера с ценой 1.0 отклоняются.
+    """
+
+    def __init__(self):
+        self.orders_q = []
+        self.trades_q = []
+        self.placed = []
+
+    async def SubscribeOrders(self, request, context):
+        q = asyncio.Queue()
+        self.orders_q.append(q)
+        while True:
+            yield await q.get()
+
+    async def SubscribeTrades(self, request, context):
+        q = asyncio.Queue()
+        self.trades_q.append(q)
+        while True:
+            yield await q.get()
+
+    async def PlaceOrder(self, request, context):
+        self.placed.append(request)
+        order_id = f"O{len(self.placed)}"
+        qty = request.quantity.value
+
+        if request.limit_price.value == "1.0":
+            state = od.OrderState(order_id=order_id, status=od.ORDER_STATUS_REJECTED, order=request)
+            return state
+
+        trade = trade_pb2.AccountTrade(trade_id=f"T{order_id}", order_id=order_id, symbol=request.symbol,
+                                       price={"value": "100.5"}, size={"value": qty})
+        for q in self.trades_q:
+            q.put_nowait(od.SubscribeTradesResponse(trades=[trade]))
+        await asyncio.sleep(0.01)
+
+        filled = od.OrderState(order_id=order_id, status=od.ORDER_STATUS_FILLED, order=request,
+                               executed_quantity={"value": qty})
+        asyncio.get_running_loop().call_later(
+            0.01, lambda: [q.put_nowait(od.SubscribeOrdersResponse(orders=[filled])) for q in self.orders_q]
+        )
+        return od.OrderState(order_id=order_id, status=od.ORDER_STATUS_NEW, order=request)
+
+
+def test_pipeline_tracks_ack_and_fill_via_streams():
+    metrics = MetricsRegistry()
+
+    async def scenario():
+        server = grpc.aio.server()
+        fake = FakeOrders()
+        orders_service_pb2_grpc.add_OrdersServiceServicer_to_server(fake, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = AsyncFinamClient(account_id="ACC1", channel=channel, jwt_token="jwt")
+        pipeline = await ExecutionPipeline(client, metrics=metrics).start()
+        while len(fake.orders_q) < 1 or len(fake.trades_q) < 1:
+            await asyncio.sleep(0.005)
+
+        ticket = pipeline.submit("SBER@MISX", "buy", 10)
+        assert ticket.status == "PENDING"          # submit не ждёт ответа
+        rejected = pipeline.submit("SBER@MISX", "SELL", 1, limit_price=1.0)
+        await asyncio.gather(pipeline.wait(ticket, 2), pipeline.wait(rejected, 2))
+
+        await pipeline.stop()
+        await channel.close()
+        await server.stop(None)
+        return fake, ticket, rejected, pipeline
+
+    fake, ticket, rejected, pipeline = asyncio.run(scenario())
+
+    sent = {o.client_order_id: o for o in fake.placed}
+    assert sent[ticket.client_order_id].symbol == "SBER@MISX"
+    assert sent[ticket.client_order_id].type == od.ORDER_TYPE_MARKET
+    assert sent[rejected.client_order_id].type == od.ORDER_TYPE_LIMIT
+
+    assert ticket.status == "FILLED" and ticket.order_id != rejected.order_id
+    assert ticket.filled_qty == 10.0 and ticket.avg_price == 100.5
+    assert ticket.signal_ts <= ticket.ack_ts <= ticket.fill_ts
+    assert not pipeline._orphans
+
+    assert rejected.status == "REJECTED" and not rejected.is_filled
+
+    snap = metrics.snapshot()["histograms"]
+    assert snap["exec.signal_to_ack"]["count"] == 2
+    assert snap["exec.ack_to_fill"]["count"] == 1
+    assert snap["exec.signal_to_fill"]["count"] == 1
+
+
+class TimeoutOrders(orders_service_pb2_grpc.OrdersServiceServicer):
+    """
+    Брокер принял заявку, но ответ не успел до дедлайна.
+    """
+
+    def __init__(self):
+        self.placed = []
+
+    async def PlaceOrder(self, request, context):
+        self.placed.append(request)
+        await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "slow ack")
+
+
+def test_place_order_is_not_retried_on_deadline():
+    metrics = MetricsRegistry()
+
+    async def scenario():
+        server = grpc.aio.server()
+        fake = TimeoutOrders()
+        orders_service_pb2_grpc.add_OrdersServiceServicer_to_server(fake, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = AsyncFinamClient(account_id="ACC1", channel=channel, jwt_token="jwt", max_attempts=3)
+        pipeline = ExecutionPipeline(client, metrics=metrics)   # без стримов: только PlaceOrder
+        ticket = pipeline.submit("SBER@MISX", "BUY", 1)
+        await pipeline.wait(ticket, 2)
+
+        await pipeline.stop()
+        await channel.close()
+        await server.stop(None)
+        return fake, ticket
+
+    fake, ticket = asyncio.run(scenario())
+
+    assert len(fake.placed) == 1
+    assert ticket.status == "ERROR" and "DEADLINE_EXCEEDED" in ticket.error
+    assert metrics.snapshot()["counters"]["exec.place_errors"] == 1
+
+
+class BrokenStreamOrders(orders_service_pb2_grpc.OrdersServiceServicer):
+    """
+    Первая подписка на ордера падает с INVALID_ARGUMENT после ack заявки;
+    исполнение O1 приходится на разрыв и видно только в GetOrders.
+    """
+
+    def __init__(self):
+        self.subscribes = 0
+        self.get_orders = 0
+        self.placed = asyncio.Event()
+
+    async def SubscribeOrders(self, request, context):
+        self.subscribes += 1
+        if self.subscribes == 1:
+            await self.placed.wait()
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "bad subscription")
+        await asyncio.Event().wait()
+        yield od.SubscribeOrdersResponse()
+
+    async def SubscribeTrades(self, request, context):
+        await asyncio.Event().wait()
+        yield od.SubscribeTradesResponse()
+
+    async def PlaceOrder(self, request, context):
+        self.placed.set()
+        self.order = request
+        return od.OrderState(order_id="O1", status=od.ORDER_STATUS_NEW, order=request)
+
+    async def GetOrders(self, request, context):
+        self.get_orders += 1
+        filled = od.OrderState(order_id="O1", status=od.ORDER_STATUS_FILLED, order=self.order,
+                               executed_quantity=self.order.quantity)
+        return od.OrdersResponse(orders=[filled])
+
+
+def test_failed_stream_resubscribes_and_reconciles_open_tickets():
+    metrics = MetricsRegistry()
+
+    async def scenario():
+        server = grpc.aio.server()
+        fake = BrokenStreamOrders()
+        orders_service_pb2_grpc.add_OrdersServiceServicer_to_server(fake, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = AsyncFinamClient(account_id="ACC1", channel=channel, jwt_token="jwt")
+        pipeline = await ExecutionPipeline(client, metrics=metrics, restart_backoff=0.01).start()
+
+        ticket = pipeline.submit("SBER@MISX", "BUY", 1)
+        await pipeline.wait(ticket, 2)
+
+        await pipeline.stop()
+        await channel.close()
+        await server.stop(None)
+        return fake, ticket
+
+    fake, ticket = asyncio.run(scenario())
+
+    assert ticket.order_id == "O1"
+    assert ticket.status == "FILLED" and ticket.error is None     # не ERROR: ордер жив и исполнен
+    assert ticket.filled_qty == 1
+    assert fake.subscribes >= 2 and fake.get_orders == 1
+    counters = metrics.snapshot()["counters"]
+    assert counters["exec.orders_stream_errors"] == 1
+    assert counters["exec.reconciles"] == 1
+
+
+def test_foreign_orphan_trades_are_evicted_and_dedup_is_bounded():
+    now = [0.0]
+    pipeline = ExecutionPipeline(client=None, metrics=MetricsRegistry(), clock=lambda: now[0],
+                                 orphan_ttl=10.0, max_orphans=2, max_seen_trades=3)
+
+    pipeline._on_trade(trade_pb2.AccountTrade(trade_id="T1", order_id="X1"))
+    pipeline._on_trade(trade_pb2.AccountTrade(trade_id="T2", order_id="X2"))
+    pipeline._on_trade(trade_pb2.AccountTrade(trade_id="T3", order_id="X3"))
+    assert list(pipeline._orphans) == ["X2", "X3"]              # по числу
+
+    now[0] = 11.0
+    pipeline._on_trade(trade_pb2.AccountTrade(trade_id="T4", order_id="X4"))
+    assert list(pipeline._orphans) == ["X4"]                    # по возрасту
+
+    for i in range(5):
+        pipeline._seen_trades.add(f"S{i}")
+    assert len(pipeline._seen_trades) == 3 and "S0" not in pipeline._seen_trades
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from finam_bot.portfolio.exposure import ExposureCache
+from finam_bot.risk_engine_v2_2 import RiskEngineV22
+from finam_bot.storage_sqlite import StorageSQLite
+
+
+def test_cache_incremental_matches_rebuild():
+    cache = ExposureCache()
+    cache.set("SBER", "EQUITY", 10, 100.0)
+    cache.set("GAZP", "EQUITY", -5, 200.0)
+    cache.set("NG", "FUTURES", 1, 3.0)
+    cache.set("SBER", "EQUITY", 20, 110.0)      # изменение позиции
+    cache.remove("NG")
+    cache.set("GAZP", "EQUITY", 0, 200.0)       # закрытие
+
+    eq = cache.get("EQUITY")
+    assert (eq.count, eq.exposure) == (1, pytest.approx(2200.0))
+    assert cache.get("FUTURES").count == 0
+    assert cache.totals() == ExposureCache([("SBER", "EQUITY", 20, 110.0)]).totals()
+
+
+def test_storage_persists_summary_and_reconciles(tmp_path):
+    path = tmp_path / "finam.db"
+    storage = StorageSQLite(path)
+    storage.upsert_position("SBER", side="LONG", qty=10, avg_price=100.0, asset_class="EQUITY")
+    storage.upsert_position("GAZP", side="SHORT", qty=-5, avg_price=200.0, asset_class="EQUITY")
+    storage.upsert_position("SBER", side="LONG", qty=20, avg_price=100.0, asset_class="EQUITY")
+
+    assert storage.count_open_positions("EQUITY") == 2
+    assert storage.sum_exposure("EQUITY") == pytest.approx(3000.0)
+    row = storage.conn.execute("SELECT open_count, exposure FROM exposure_summary WHERE asset_class='EQUITY'").fetchone()
+    assert tuple(row) == (2, pytest.approx(3000.0))
+
+    risk = RiskEngineV22(storage, equity=100_000)
+    # открытый риск 3000 + сделка 1000 = 4% > 3%
+    verdict = risk.check(qty=10, entry=100.0, stop=0.0, asset_class="EQUITY")
+    assert (verdict.allowed, verdict.reason) == (False, "TOTAL_RISK_BY_CLASS")
+    storage.delete_position("GAZP")
+    assert risk.check(qty=10, entry=100.0, stop=0.0, asset_class="EQUITY").allowed
+    storage.close()
+
+    # правка в обход storage — сверка на старте
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO positions (instrument, side, qty, avg_price, updated_ts, asset_class) "
+                 "VALUES ('NG', 'LONG', 2, 3.0, 'x', 'FUTURES')")
+    conn.commit()
+    conn.close()
+
+    reopened = StorageSQLite(path)
+    assert reopened.count_open_positions("FUTURES") == 1
+    assert reopened.sum_open_risk("EQUITY") == pytest.approx(2000.0)
+    assert reopened.reconcile_exposure()        # summary уже переписан
+    reopened.close()
@@ -0,0 +1,138 @@
+import asyncio
+
+import grpc
+import pytest
+
+from finam_bot.grpc.aio_client import AsyncFinamClient, timeframe_to_proto
+from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2, accounts_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.auth import auth_service_pb2, auth_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2 as md
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2_grpc
+
+
+def make_bar(ts, close):
+    return md.Bar(
+        timestamp={"seconds": ts},
+        open={"value": str(close - 1)},
+        high={"value": str(close + 1)},
+        low={"value": str(close - 2)},
+        close={"value": str(close)},
+        volume={"value": "10"},
+    )
+
+
+class Auth(auth_service_pb2_grpc.AuthServiceServicer):
+    async def Auth(self, request, context):
+        assert request.secret == "secret"
+        return auth_service_pb2.AuthResponse(token="jwt-1")
+
+
+class Accounts(accounts_service_pb2_grpc.AccountsServiceServicer):
+    def __init__(self):
+        self.calls = 0
+
+    async def GetAccount(self, request, context):
+        self.calls += 1
+        if self.calls == 1:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "warming up")
+        md_ = dict(context.invocation_metadata())
+        assert md_["authorization"] == "Bearer jwt-1"
+        return accounts_service_pb2.GetAccountResponse(account_id=request.account_id)
+
+
+class MarketData(marketdata_service_pb2_grpc.MarketDataServiceServicer):
+    def __init__(self):
+        self.subscriptions = 0
+
+    async def SubscribeBars(self, request, context):
+        self.subscriptions += 1
+        yield md.SubscribeBarsResponse(symbol=request.symbol, bars=[make_bar(60, 100.0)])
+        if self.subscriptions == 1:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "stream reset")
+        yield md.SubscribeBarsResponse(symbol=request.symbol, bars=[make_bar(120, 101.5)])
+
+    async def LastQuote(self, request, context):
+        await asyncio.sleep(1.0)
+        return md.QuoteResponse(symbol=request.symbol)
+
+
+async def serve():
+    server = grpc.aio.server()
+    accounts, market = Accounts(), MarketData()
+    auth_service_pb2_grpc.add_AuthServiceServicer_to_server(Auth(), server)
+    accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(accounts, server)
+    marketdata_service_pb2_grpc.add_MarketDataServiceServicer_to_server(market, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    return server, port, accounts, market
+
+
+async def client_for(port, **kwargs):
+    channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+    client = AsyncFinamClient(api_token="secret", account_id="ACC1", channel=channel, backoff=0.01, **kwargs)
+    await client.connect()
+    return client, channel
+
+
+def test_unary_retries_and_uses_session_token():
+    async def scenario():
+        server, port, accounts, _ = await serve()
+        client, channel = await client_for(port)
+        try:
+            account = await client.get_account()
+        finally:
+            await channel.close()
+            await server.stop(None)
+        return client, account, accounts
+
+    client, account, accounts = asyncio.run(scenario())
+
+    assert client.jwt_token == "jwt-1"
+    assert account.account_id == "ACC1"
+    assert accounts.calls == 2
+
+
+def test_stream_candles_reconnects_and_converts_bars():
+    async def scenario():
+        server, port, _, market = await serve()
+        client, channel = await client_for(port)
+        out = []
+        try:
+            async for candle in client.stream_candles("SBER@MISX", "M1"):
+                out.append(candle)
+                if len(out) == 3:
+                    break
+        finally:
+            await channel.close()
+            await server.stop(None)
+        return out, market
+
+    candles, market = asyncio.run(scenario())
+
+    assert market.subscriptions == 2
+    assert [c.timestamp for c in candles] == [60, 60, 120]
+    assert candles[-1].close == 101.5
+    assert candles[-1].volume == 10.0
+
+
+def test_deadline_is_enforced_per_call():
+    async def scenario():
+        server, port, _, _ = await serve()
+        client, channel = await client_for(port, max_attempts=1)
+        try:
+            with pytest.raises(grpc.aio.AioRpcError) as err:
+                await client.get_last_quote("SBER@MISX", timeout=0.05)
+            return err.value.code()
+        finally:
+            await channel.close()
+            await server.stop(None)
+
+    assert asyncio.run(scenario()) == grpc.StatusCode.DEADLINE_EXCEEDED
+
+
+def test_timeframe_aliases():
+    assert timeframe_to_proto("5m") == md.TIME_FRAME_M5
+    assert timeframe_to_proto("D1") == md.TIME_FRAME_D
+    assert timeframe_to_proto("TIME_FRAME_H4") == md.TIME_FRAME_H4
+    with pytest.raises(ValueError):
+        timeframe_to_proto("M7")
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import grpc
+import numpy as np
+
+from finam_bot.backtest.candle_store import CANDLE_DTYPE, TICK_DTYPE, load_ticks, save_candles, save_ticks
+from finam_bot.core.orderflow_accumulator import SIDE_BUY, SIDE_SELL
+from finam_bot.grpc.aio_client import AsyncFinamClient
+from finam_bot.grpc.replay_server import ReplayClock, ReplayData, ReplayServer
+from finam_bot.grpc.streaming import decode_trades
+from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2 as od
+
+SYMBOL = "SBER@MISX"
+
+
+def write_data(root):
+    ticks = np.zeros(6, dtype=TICK_DTYPE)
+    ticks["ts"] = [1.0, 1.0, 30.0, 61.0, 62.0, 90.0]
+    ticks["price"] = [100.0, 100.5, 99.0, 98.5, 101.0, 100.0]
+    ticks["qty"] = [1, 2, 3, 4, 5, 6]
+    ticks["side"] = [SIDE_BUY, SIDE_BUY, SIDE_SELL, SIDE_SELL, SIDE_BUY, SIDE_SELL]
+    save_ticks(root / f"{SYMBOL}.ticks", ticks)
+
+    bars = np.zeros(2, dtype=CANDLE_DTYPE)
+    bars["ts"] = [0, 60]
+    bars["open"] = [100.0, 98.5]
+    bars["high"] = [100.5, 101.0]
+    bars["low"] = [99.0, 98.5]
+    bars["close"] = [99.0, 100.0]
+    bars["volume"] = [6, 15]
+    save_candles(root / f"{SYMBOL}.M1.candles", bars)
+    return ticks
+
+
+def test_tick_file_roundtrip(tmp_path):
+    ticks = write_data(tmp_path)
+    loaded = load_ticks(tmp_path / f"{SYMBOL}.ticks")
+    assert loaded.dtype == TICK_DTYPE
+    assert np.array_equal(loaded, ticks)
+
+
+def test_replay_streams_and_fills(tmp_path):
+    write_data(tmp_path)
+
+    async def scenario():
+        server = ReplayServer(ReplayData.from_dir(tmp_path), speed=None)
+        port = await server.start()
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = await AsyncFinamClient(api_token="x", account_id="ACC1", channel=channel).connect()
+
+        history = await client.get_bars(
+            SYMBOL, "M1",
+            datetime.fromtimestamp(60, timezone.utc),
+            datetime.fromtimestamp(120, timezone.utc),
+        )
+        assert [b.timestamp.seconds for b in history.bars] == [60]
+
+        # лимитная покупка ниже рынка — исполнится на сделке 98.5 (ts=61)
+        order = od.Order(
+            account_id="ACC1",
+            symbol=SYMBOL,
+            quantity={"value": "2"},
+            side=side_pb2.SIDE_BUY,
+            type=od.ORDER_TYPE_LIMIT,
+            limit_price={"value": "98.6"},
+            client_order_id="c1",
+        )
+        ack = await client.place_order(order)
+        assert ack.status == od.ORDER_STATUS_NEW
+
+        fills = client.orders.SubscribeTrades(od.SubscribeTradesRequest(account_id="ACC1"), metadata=client.metadata)
+
+        async def read(stream):
+            return [msg async for msg in stream]
+
+        trades_task = asyncio.create_task(read(client.subscribe_latest_trades(SYMBOL)))
+        bars_task = asyncio.create_task(read(client.subscribe_bars(SYMBOL, "M1")))
+        await server.wait_subscribers(2)
+        while not server.exchange.listeners:
+            await asyncio.sleep(0.01)
+
+        server.play()
+        await server.join()
+        trades, bars = await asyncio.gather(trades_task, bars_task)
+        fill = (await asyncio.wait_for(fills.read(), 2.0)).trades[0]
+
+        quote = await client.get_last_quote(SYMBOL)
+        state = await client.get_order(ack.order_id)
+
+        fills.cancel()
+        await channel.close()
+        await server.stop()
+        return trades, bars, fill, quote, state
+
+    trades, bars, fill, quote, state = asyncio.run(scenario())
+
+    records = [r for resp in trades for r in decode_trades(resp)]
+    assert [r.price for r in records] == [100.0, 100.5, 99.0, 98.5, 101.0, 100.0]
+    assert [r.side for r in records][:3] == [SIDE_BUY, SIDE_BUY, SIDE_SELL]
+    # две сделки с одинаковым ts — одним сообщением
+    assert len(trades[0].trades) == 2
+
+    assert [b.bars[0].timestamp.seconds for b in bars] == [0, 60]
+
+    assert fill.order_id == state.order_id
+    assert float(fill.price.value) == 98.6
+    assert fill.timestamp.seconds == 61
+    assert state.status == od.ORDER_STATUS_FILLED
+    assert float(state.executed_quantity.value) == 2.0
+
+    assert float(quote.quote.last.value) == 100.0
+    assert float(quote.quote.bid.value) == 100.0
+    assert float(quote.quote.ask.value) == 101.0
+
+
+def test_replay_clock_paces_by_speed():
+    async def scenario():
+        clock = ReplayClock(speed=20)
+        t0 = time.monotonic()
+        for ts in (0.0, 0.5, 1.0):
+            await clock.wait(ts)
+        return time.monotonic() - t0
+
+    elapsed = asyncio.run(scenario())
+    assert 0.04 <= elapsed < 0.5
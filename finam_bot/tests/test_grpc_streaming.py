@@ -0,0 +1,140 @@
+import asyncio
+
+import grpc
+
+from finam_bot.core.orderflow_accumulator import SIDE_BUY, SIDE_SELL
+from finam_bot.grpc.aio_client import AsyncFinamClient
+from finam_bot.grpc.streaming import BarRecord, BookRecord, MarketDataStreamer, SymbolQueue, TradeRecord
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2 as md
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2_grpc
+
+
+def dec(x):
+    return {"value": str(x)}
+
+
+class MarketData(marketdata_service_pb2_grpc.MarketDataServiceServicer):
+    async def SubscribeBars(self, request, context):
+        for ts, close in [(60, 10.0), (60, 11.0), (120, 12.0)]:
+            bar = md.Bar(timestamp={"seconds": ts}, open=dec(10), high=dec(12), low=dec(9), close=dec(close), volume=dec(5))
+            yield md.SubscribeBarsResponse(symbol=request.symbol, bars=[bar])
+
+    async def SubscribeLatestTrades(self, request, context):
+        trades = [
+            md.Trade(trade_id="1", price=dec(10.5), size=dec(3), side=1, timestamp={"seconds": 1, "nanos": 500_000_000}),
+            md.Trade(trade_id="2", price=dec(10.4), size=dec(2), side=2, timestamp={"seconds": 2}),
+        ]
+        yield md.SubscribeLatestTradesResponse(symbol=request.symbol, trades=trades)
+
+    async def SubscribeQuote(self, request, context):
+        quotes = [md.Quote(symbol=s, bid=dec(1), ask=dec(2)) for s in request.symbols]
+        yield md.SubscribeQuoteResponse(quote=quotes)
+
+
+async def collect(n_per_symbol, **streamer_kwargs):
+    server = grpc.aio.server()
+    marketdata_service_pb2_grpc.add_MarketDataServiceServicer_to_server(MarketData(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+
+    channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+    client = AsyncFinamClient(account_id="ACC1", channel=channel, jwt_token="jwt")
+    streamer = MarketDataStreamer(client, **streamer_kwargs)
+    streamer.subscribe_bars(["SBER@MISX"], "M1")
+    streamer.subscribe_trades(["SBER@MISX"])
+    streamer.subscribe_quotes(["SBER@MISX", "GAZP@MISX"])
+
+    out = {}
+    async with streamer:
+        while streamer.received < 7:
+            await asyncio.sleep(0.01)
+        for symbol, n in n_per_symbol.items():
+            q = streamer.queue(symbol)
+            out[symbol] = [q.get_nowait() for _ in range(n)]
+        stats = streamer.stats()
+
+    await channel.close()
+    await server.stop(None)
+    return out, stats
+
+
+def test_streams_are_decoded_and_fanned_out_per_symbol():
+    out, stats = asyncio.run(collect({"SBER@MISX": 6, "GAZP@MISX": 1}))
+
+    sber = out["SBER@MISX"]
+    bars = [r for r in sber if isinstance(r, BarRecord)]
+    trades = [r for r in sber if isinstance(r, TradeRecord)]
+
+    assert [(b.ts, b.close) for b in bars] == [(60, 10.0), (60, 11.0), (120, 12.0)]
+    assert [(t.price, t.qty, t.side) for t in trades] == [(10.5, 3.0, SIDE_BUY), (10.4, 2.0, SIDE_SELL)]
+    assert trades[0].ts == 1.5
+    assert out["GAZP@MISX"][0].ask == 2.0
+    assert stats["SBER@MISX"]["pending"] == 0
+
+
+def test_coalesce_replaces_pending_bar_with_same_ts():
+    out, stats = asyncio.run(collect({"SBER@MISX": 5}, policy="coalesce"))
+
+    bars = [r for r in out["SBER@MISX"] if isinstance(r, BarRecord)]
+    assert [(b.ts, b.close) for b in bars] == [(60, 11.0), (120, 12.0)]
+    assert stats["SBER@MISX"]["coalesced"] == 1
+
+
+def test_queue_overflow_policies():
+    def fill(policy):
+        q = SymbolQueue(maxsize=2, policy=policy)
+        for i in range(4):
+            q.put_nowait(TradeRecord(symbol="X", ts=i, price=1.0, qty=1.0, side=SIDE_BUY))
+        return [q.get_nowait().ts for _ in range(len(q))], q.dropped
+
+    assert fill("drop_oldest") == ([2, 3], 2)
+    assert fill("drop_newest") == ([0, 1], 2)
+
+
+def test_book_updates_coalesce_by_price_level():
+    q = SymbolQueue(maxsize=10, policy="coalesce")
+    q.put_nowait(BookRecord(symbol="X", ts=1.0, rows=((100.0, 5.0, 0.0, 2), (101.0, 0.0, 3.0, 2))))
+    q.put_nowait(BookRecord(symbol="X", ts=2.0, rows=((100.0, 0.0, 0.0, 1),)))
+
+    merged = q.get_nowait()
+
+    assert len(q) == 0
+    assert merged.ts == 2.0
+    assert sorted(merged.rows) == [(100.0, 0.0, 0.0, 1), (101.0, 0.0, 3.0, 2)]
+
+
+class FlakyClient:
+    """
+    Первая подписка на бары падает, вторая отдаёт данные и висит.
+    """
+
+    def __init__(self):
+        self.subscribes = 0
+
+    async def subscribe_bars(self, symbol, timeframe):
+        self.subscribes += 1
+        if self.subscribes == 1:
+            raise grpc.aio.AioRpcError(grpc.StatusCode.INVALID_ARGUMENT, None, None, "bad subscription")
+        bar = md.Bar(timestamp={"seconds": 60}, open=dec(10), high=dec(12), low=dec(9), close=dec(11), volume=dec(5))
+        yield md.SubscribeBarsResponse(symbol=symbol, bars=[bar])
+        await asyncio.Event().wait()
+
+
+def test_failed_stream_is_resubscribed_with_backoff():
+    async def scenario():
+        client = FlakyClient()
+        streamer = MarketDataStreamer(client, restart_backoff=0.01)
+        streamer.subscribe_bars(["SBER@MISX"], "M1")
+        async with streamer:
+            for _ in range(200):
+                if streamer.received:
+                    break
+                await asyncio.sleep(0.005)
+            rec = streamer.queue("SBER@MISX").get_nowait()
+        return client, streamer, rec
+
+    client, streamer, rec = asyncio.run(scenario())
+
+    assert client.subscribes == 2
+    assert streamer.restarts == {"bars:SBER@MISX": 1}
+    assert (rec.ts, rec.close) == (60, 11.0)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+from concurrent import futures
+
+import grpc
+import pytest
+
+from finam_bot.grpc.instrumentation import aio_client_interceptors, client_interceptors
+from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2, accounts_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2 as md
+from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2_grpc
+from finam_bot.infra.exporters import JsonFileExporter, PrometheusFileExporter, render_prometheus
+from finam_bot.infra.metrics import LatencyHistogram, MetricsRegistry
+
+
+class Accounts(accounts_service_pb2_grpc.AccountsServiceServicer):
+    def GetAccount(self, request, context):
+        if request.account_id == "BAD":
+            context.abort(grpc.StatusCode.NOT_FOUND, "no account")
+        return accounts_service_pb2.GetAccountResponse(account_id=request.account_id, type="UNION")
+
+
+class MarketData(marketdata_service_pb2_grpc.MarketDataServiceServicer):
+    def SubscribeQuote(self, request, context):
+        for _ in range(5):
+            yield md.SubscribeQuoteResponse(quote=[md.Quote(symbol=request.symbols[0])])
+
+
+class AioAccounts(accounts_service_pb2_grpc.AccountsServiceServicer):
+    async def GetAccount(self, request, context):
+        if request.account_id == "BAD":
+            await context.abort(grpc.StatusCode.NOT_FOUND, "no account")
+        return accounts_service_pb2.GetAccountResponse(account_id=request.account_id)
+
+
+class AioMarketData(marketdata_service_pb2_grpc.MarketDataServiceServicer):
+    async def SubscribeQuote(self, request, context):
+        for _ in range(3):
+            yield md.SubscribeQuoteResponse(quote=[md.Quote(symbol=request.symbols[0])])
+
+
+def test_sync_interceptor_records_latency_sizes_and_streams():
+    metrics = MetricsRegistry()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(Accounts(), server)
+    marketdata_service_pb2_grpc.add_MarketDataServiceServicer_to_server(MarketData(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = grpc.intercept_channel(grpc.insecure_channel(f"127.0.0.1:{port}"), *client_interceptors(metrics))
+
+    accounts = accounts_service_pb2_grpc.AccountsServiceStub(channel)
+    req = accounts_service_pb2.GetAccountRequest(account_id="ACC1")
+    resp = accounts.GetAccount(req)
+    assert accounts.GetAccount.future(req).result() == resp
+    with pytest.raises(grpc.RpcError):
+        accounts.GetAccount(accounts_service_pb2.GetAccountRequest(account_id="BAD"))
+
+    quotes = marketdata_service_pb2_grpc.MarketDataServiceStub(channel)
+    msgs = list(quotes.SubscribeQuote(md.SubscribeQuoteRequest(symbols=["SBER@MISX"])))
+    channel.close()
+    server.stop(None)
+
+    c = metrics.counters
+    assert c["grpc.GetAccount.requests"] == 3
+    assert c["grpc.GetAccount.errors"] == 1
+    assert c["grpc.GetAccount.req_bytes"] == 2 * req.ByteSize() + 5
+    assert c["grpc.GetAccount.resp_bytes"] == 2 * resp.ByteSize()
+    assert metrics.histogram("grpc.GetAccount").count == 3
+
+    assert len(msgs) == 5
+    assert c["grpc.SubscribeQuote.stream_msgs"] == 5
+    assert metrics.histogram("grpc.SubscribeQuote").count == 1
+
+
+def test_aio_interceptors():
+    metrics = MetricsRegistry()
+
+    async def scenario():
+        server = grpc.aio.server()
+        accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(AioAccounts(), server)
+        marketdata_service_pb2_grpc.add_MarketDataServiceServicer_to_server(AioMarketData(), server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}", interceptors=aio_client_interceptors(metrics))
+
+        accounts = accounts_service_pb2_grpc.AccountsServiceStub(channel)
+        resp = await accounts.GetAccount(accounts_service_pb2.GetAccountRequest(account_id="ACC1"))
+        try:
+            await accounts.GetAccount(accounts_service_pb2.GetAccountRequest(account_id="BAD"))
+        except grpc.aio.AioRpcError as e:
+            code = e.code()
+
+        quotes = marketdata_service_pb2_grpc.MarketDataServiceStub(channel)
+        msgs = [m async for m in quotes.SubscribeQuote(md.SubscribeQuoteRequest(symbols=["SBER@MISX"]))]
+
+        await channel.close()
+        await server.stop(None)
+        return resp, code, msgs
+
+    resp, code, msgs = asyncio.run(scenario())
+    assert resp.account_id == "ACC1"
+    assert code == grpc.StatusCode.NOT_FOUND
+    assert len(msgs) == 3
+
+    c = metrics.counters
+    assert (c["grpc.GetAccount.requests"], c["grpc.GetAccount.errors"]) == (2, 1)
+    assert c["grpc.GetAccount.resp_bytes"] == resp.ByteSize()
+    assert c["grpc.SubscribeQuote.stream_msgs"] == 3
+
+
+def test_exporters(tmp_path):
+    metrics = MetricsRegistry()
+    h = metrics.histogram("grpc.Bars", bounds=[0.01, 0.1])
+    h.observe(0.005)
+    h.observe(0.05)
+    h.observe(1.0)
+    metrics.inc("grpc.Bars.requests", 3)
+    metrics.set_gauge("grpc.SubscribeQuote.stream_rate", 12.5)
+
+    text = render_prometheus(metrics)
+    assert "finam_grpc_Bars_requests_total 3" in text
+    assert "finam_grpc_SubscribeQuote_stream_rate 12.5" in text
+    assert 'finam_grpc_Bars_seconds_bucket{le="0.1"} 2' in text
+    assert 'finam_grpc_Bars_seconds_bucket{le="+Inf"} 3' in text
+    assert "finam_grpc_Bars_seconds_count 3" in text
+
+    PrometheusFileExporter(tmp_path / "m.prom").export(metrics)
+    assert (tmp_path / "m.prom").read_text() == text
+
+    JsonFileExporter(tmp_path / "m.json", buckets=True).export(metrics)
+    data = json.loads((tmp_path / "m.json").read_text())
+    assert data["counters"]["grpc.Bars.requests"] == 3
+    assert data["histograms"]["grpc.Bars"]["count"] == 3
+    assert data["buckets"]["grpc.Bars"]["counts"] == [1, 1, 1]
+
+
+def test_latency_histogram_percentiles():
+    h = LatencyHistogram("t", bounds=[0.001, 0.01, 0.1, 1.0])
+    for _ in range(90):
+        h.observe(0.0005)
+    for _ in range(10):
+        h.observe(0.05)
+
+    assert h.count == 100
+    assert h.percentile(50) == 0.001
+    assert h.percentile(90) == 0.001
+    assert h.percentile(99) == 0.05          # граница 0.1 обрезается по max
+    h.observe(5.0)                           # за последней границей
+    assert h.percentile(100) == 5.0
+
+
+def test_latency_histogram_concurrent_observe():
+    h = LatencyHistogram("t")
+    snaps = []
+
+    def worker():
+        for i in range(20_000):
+            h.observe(i * 1e-6)
+
+    def reader():
+        for _ in range(200):
+            counts, count, _ = h.buckets()
+            snaps.append(sum(counts) == count)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)] + [threading.Thread(target=reader)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert h.count == sum(h.counts) == 80_000
+    assert all(snaps)                        # снимок согласован
@@ -0,0 +1,113 @@
+import asyncio
+
+from finam_bot.grpc_api.grpc.tradeapi.v1.assets import assets_service_pb2 as pb
+from finam_bot.instruments import InstrumentRegistry
+from finam_bot.qty import QtyCalculator
+from finam_bot.risk_engine_v2_2 import RiskEngineV22
+
+
+class FakeAssetsClient:
+    def __init__(self):
+        self.calls = []
+
+    async def get_assets(self):
+        self.calls.append("Assets")
+        return pb.AssetsResponse(assets=[
+            pb.Asset(symbol="SBER@MISX", ticker="SBER", mic="MISX", type="EQUITIES", name="Sber"),
+            pb.Asset(symbol="NGG6@RTSX", ticker="NG-2.26", mic="RTSX", type="FUTURES", name="NG"),
+            pb.Asset(symbol="SU26238RMFS4@MISX", ticker="SU26238RMFS4", mic="MISX", type="BONDS"),
+        ])
+
+    async def get_asset(self, symbol):
+        self.calls.append(f"GetAsset:{symbol}")
+        if symbol == "SBER@MISX":
+            return pb.GetAssetResponse(ticker="SBER", mic="MISX", type="EQUITIES", decimals=2, min_step=1,
+                                       lot_size={"value": "10"}, quote_currency="RUB")
+        return pb.GetAssetResponse(ticker="NG-2.26", mic="RTSX", type="FUTURES", decimals=3, min_step=1,
+                                   lot_size={"value": "1"}, expiration_date={"year": 2026, "month": 2, "day": 25})
+
+    async def get_schedule(self, symbol):
+        self.calls.append(f"Schedule:{symbol}")
+        return pb.ScheduleResponse(symbol=symbol, sessions=[
+            {"type": "CORE_TRADING", "interval": {"start_time": {"seconds": 1000}, "end_time": {"seconds": 2000}}},
+            {"type": "CLOSED", "interval": {"start_time": {"seconds": 3000}, "end_time": {"seconds": 3600}}},
+        ])
+
+
+class Storage:
+    def count_open_positions(self, asset_class):
+        return 0
+
+    def sum_open_risk(self, asset_class):
+        return 0.0
+
+    def sum_exposure(self, asset_class):
+        return 0.0
+
+
+def test_registry_refresh_lookup_and_cache(tmp_path):
+    client = FakeAssetsClient()
+    registry = InstrumentRegistry(tmp_path / "instruments.json")
+    assert registry.is_stale()
+    asyncio.run(registry.refresh(client, ["SBER@MISX", "NG-2.26"]))
+
+    # один Assets + детали только по рабочему списку
+    assert client.calls.count("Assets") == 1
+    assert sorted(c for c in client.calls if c.startswith("GetAsset")) == ["GetAsset:NGG6@RTSX", "GetAsset:SBER@MISX"]
+
+    sber = registry.get("SBER")
+    assert sber is registry.get("SBER@MISX")
+    assert (sber.asset_class, sber.lot_size, sber.min_step) == ("EQUITY", 10.0, 0.01)
+    assert registry.get("NG-2.26").expiration == "2026-02-25"
+    assert registry.asset_class("SU26238RMFS4@MISX") == "BOND"
+
+    assert registry.session_at("SBER", 1500) == "CORE_TRADING"
+    assert registry.session_at("SBER", 2500) is None
+    assert not registry.is_stale()
+
+    loaded = InstrumentRegistry.load(tmp_path / "instruments.json")
+    assert loaded.get("NG-2.26") == registry.get("NG-2.26")
+    assert loaded.session_at("NGG6@RTSX", 1999) == "CORE_TRADING"
+    assert len(loaded) == 3
+
+
+def test_qty_and_risk_use_registry(tmp_path):
+    registry = InstrumentRegistry(tmp_path / "instruments.json")
+    asyncio.run(registry.refresh(FakeAssetsClient(), ["SBER@MISX"]))
+
+    calc = QtyCalculator(1000, registry=registry)
+    # риск 1.0 на акцию -> 1000 акций, шаг = лот 10
+    assert calc.calc(100.0, 99.0, symbol="SBER") == 1000.0
+    assert calc.calc(100.0, 99.7, symbol="SBER") == 3330.0
+    # без реестра — общее правило класса (шаг 1)
+    assert QtyCalculator(1000).calc(100.0, 99.7, asset_class="EQUITY") == 3333.0
+
+    risk = RiskEngineV22(Storage(), equity=1_000_000, registry=registry)
+    ok = risk.check(qty=10, entry=100.0, stop=99.0, symbol="SBER", ts=1500)
+    assert ok.allowed and ok.asset_class == "EQUITY"
+    closed = risk.check(qty=10, entry=100.0, stop=99.0, symbol="SBER", ts=2500)
+    assert (closed.allowed, closed.reason) == (False, "MARKET_CLOSED")
+    # за концом загруженного расписания (кэш устарел) — статус неизвестен, не «закрыто»
+    stale = risk.check(qty=10, entry=100.0, stop=99.0, symbol="SBER", ts=10_000)
+    assert stale.allowed
+    assert not registry.has_schedule("SBER", 10_000) and registry.has_schedule("SBER", 2500)
+
+
+def test_qty_rule_falls_back_to_class_rule_without_details(tmp_path):
+    registry = InstrumentRegistry(tmp_path / "instruments.json")
+    asyncio.run(registry.refresh(FakeAssetsClient(), ["SBER@MISX"]))
+
+    # облигация только из bulk Assets: лот неизвестен -> QTY_RULES["BOND"]
+    assert registry.get("SU26238RMFS4").lot_size is None
+    assert registry.qty_rule("SU26238RMFS4") is None
+    calc = QtyCalculator(1000, registry=registry)
+    assert calc.calc(100.0, 99.7, symbol="SU26238RMFS4") == QtyCalculator(1000).calc(100.0, 99.7, asset_class="BOND")
+
+
+
+def test_asset_class_by_symbol_falls_back_to_heuristic():
+    from finam_bot.instruments import asset_class_by_symbol
+
+    assert asset_class_by_symbol("NG-2.26") == "FUTURES"       # INSTRUMENTS
+    assert asset_class_by_symbol("OFZ.B") == "BOND"
+    assert asset_class_by_symbol("UNKNOWN_TICKER") == "EQUITY"
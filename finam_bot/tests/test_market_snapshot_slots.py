@@ -0,0 +1,50 @@
+import pytest
+
+from finam_bot.backtest.engine import BacktestEngine
+from finam_bot.backtest.synthetic import generate_synthetic_candles, generate_synthetic_orderflow
+from finam_bot.core.market_snapshot import MarketSnapshot
+from finam_bot.core.orderflow_signal import AbsorptionSignal
+from finam_bot.strategies.order_flow_pullback import OrderFlowPullbackStrategy
+
+
+def test_snapshot_is_slotted_and_update_resets_fields():
+    snap = MarketSnapshot(symbol="SBER", price=100.0, bid_volume=70, ask_volume=30, prices=[1.0], volumes=[2.0])
+    assert not hasattr(snap, "__dict__")
+    with pytest.raises(AttributeError):
+        snap.foo = 1
+    assert snap.imbalance == 0.7
+
+    same = snap.update(price=101.0, atr=0.5)
+
+    assert same is snap
+    assert snap == MarketSnapshot(symbol="SBER", price=101.0, atr=0.5)
+    assert snap.imbalance == 0.5
+
+
+def test_from_candle_into_reuses_object():
+    snap = MarketSnapshot.from_candle(symbol="SBER", candle=100.0)
+    again = MarketSnapshot.from_candle(symbol="SBER", candle=101.0, timestamp=5, into=snap)
+
+    assert again is snap
+    assert (snap.price, snap.timestamp) == (101.0, 5)
+
+
+def test_signals_are_slotted():
+    sig = AbsorptionSignal(side=None, strength=1.0, imbalance=0.0, reason="absorption")
+    assert not hasattr(sig, "__dict__")
+    sig.side = "BUY"        # стратегия проставляет сторону absorption на месте
+    assert sig.side == "BUY"
+
+
+def test_engine_snapshot_reuse_does_not_change_results():
+    candles = generate_synthetic_candles(n=300, seed=3)
+    orderflow = generate_synthetic_orderflow(n=300, seed=3)
+
+    def run(reuse):
+        engine = BacktestEngine(symbol="TEST", strategy=OrderFlowPullbackStrategy(), max_leverage=5.0)
+        broker = engine.run(candles, orderflow=orderflow, atr_floor=0.01, reuse_snapshot=reuse)
+        return broker.trades, engine.equity_curve
+
+    trades, equity = run(True)
+    assert trades
+    assert (trades, equity) == run(False)
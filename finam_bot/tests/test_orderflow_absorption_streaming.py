@@ -0,0 +1,66 @@
+import random
+
+from finam_bot.core.orderflow_absorption import (
+    OrderFlowAbsorptionDetector,
+    StreamingAbsorptionDetector,
+)
+
+
+def test_streaming_window_matches_batch_detector():
+    rnd = random.Random(3)
+    batch = OrderFlowAbsorptionDetector(min_volume=150, price_tolerance=0.05)
+    stream = StreamingAbsorptionDetector(min_volume=150, price_tolerance=0.05, max_prints=8)
+
+    prints = []
+    price = 100.0
+    for i in range(2000):
+        price = round(price + rnd.choice([-0.03, -0.01, 0.0, 0.01, 0.03]), 2)
+        qty = rnd.randint(1, 40)
+        prints.append((price, qty))
+
+        stream.push(i, price, qty, rnd.choice(["BUY", "SELL"]))
+        window = prints[-8:]
+        expected = batch.analyze([p for p, _ in window], [q for _, q in window]) is not None
+
+        assert stream._active == expected
+
+
+def test_signal_fires_on_rising_edge_only():
+    det = StreamingAbsorptionDetector(min_volume=100, price_tolerance=0.01, window_seconds=10)
+
+    assert det.push(0, 100.0, 40, "SELL") is None
+    assert det.push(1, 100.01, 40, "SELL") is None
+    sig = det.push(2, 99.99, 50, "BUY")
+
+    assert sig is not None
+    assert sig.reason == "absorption"
+    assert sig.strength == 130
+    assert sig.side == "BUY"          # bid 80 / 130 >= 0.6
+    assert det.push(3, 100.0, 10, "SELL") is None
+
+
+def test_window_expires_by_time():
+    det = StreamingAbsorptionDetector(min_volume=100, price_tolerance=0.01, window_seconds=5)
+
+    det.push(0, 100.0, 90, "BUY")
+    # первая сделка вышла из окна -> объёма не хватает
+    assert det.push(6, 100.0, 20, "BUY") is None
+    sig = det.push(7, 100.0, 80, "BUY")
+
+    assert sig is not None
+    assert sig.side == "SELL"
+
+
+def test_running_sums_do_not_drift_on_live_feed():
+    import math
+
+    rng = random.Random(1)
+    det = StreamingAbsorptionDetector(min_volume=1e18, price_tolerance=0.5, max_prints=50, resum_every=256)
+    # 50 сделок заполняют окно, затем 400 полных циклов пересчёта
+    for i in range(50 + 256 * 400):           # окно ни разу не пустеет
+        det.push(i, 100 + rng.random() * 1e3, rng.random() * 1e4, rng.choice(["BUY", "SELL"]))
+
+    w = det._window
+    assert det._volume == math.fsum(x[3] for x in w)
+    assert det._price_sum == math.fsum(x[2] for x in w)
+    assert det._bid == math.fsum(x[4] for x in w)
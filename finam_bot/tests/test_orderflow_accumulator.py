@@ -145,3 +145,65 @@ def test_ignores_unknown_side():
 
     assert snap.total_volume == 0.0
     assert snap.trades == 0
+
+
+def test_update_batch_matches_scalar_updates():
+    import numpy as np
+
+    from finam_bot.core.orderflow_accumulator import SIDE_BUY, SIDE_SELL, SIDE_UNKNOWN
+
+    rng = np.random.default_rng(1)
+    prices = 100 + rng.normal(size=200).round(2)
+    qtys = rng.integers(0, 10, size=200).astype(float)
+    sides = rng.choice([SIDE_BUY, SIDE_SELL, SIDE_UNKNOWN], size=200).astype(np.int8)
+
+    scalar = OrderFlowAccumulator()
+    names = {SIDE_BUY: "BUY", SIDE_SELL: "SELL", SIDE_UNKNOWN: "?"}
+    for p, q, s in zip(prices, qtys, sides):
+        scalar.update(price=p, qty=q, side=names[int(s)])
+
+    batch = OrderFlowAccumulator()
+    batch.update_batch(prices[:50], qtys[:50], sides[:50])
+    batch.update_batch(prices[50:], qtys[50:], sides[50:])
+
+    a, b = scalar.flush(), batch.flush()
+    assert (a.bid_volume, a.ask_volume, a.total_volume, a.trades) == (
+        b.bid_volume, b.ask_volume, b.total_volume, b.trades
+    )
+    assert math.isclose(a.vwap, b.vwap, rel_tol=1e-12)
+
+
+def test_update_trades_from_proto():
+    from finam_bot.grpc_api.grpc.tradeapi.v1.marketdata import marketdata_service_pb2 as md
+
+    trades = [
+        md.Trade(side=1, price={"value": "100.5"}, size={"value": "3"}),
+        md.Trade(side=2, price={"value": "100.0"}, size={"value": "2"}),
+        md.Trade(side=0, price={"value": "99.0"}, size={"value": "7"}),
+    ]
+    acc = OrderFlowAccumulator()
+    acc.update_trades(trades)
+
+    assert_snapshot(acc.flush(), bid=2.0, ask=3.0, total=5.0, delta=-1.0, trades=2, vwap=100.3)
+
+
+def test_replay_bars_matches_accumulator():
+    import numpy as np
+
+    from finam_bot.core.orderflow_accumulator import replay_bars
+
+    bar_ids = np.array([0, 0, 0, 2, 2])
+    prices = np.array([10.0, 11.0, 12.0, 13.0, 14.0])
+    qtys = np.array([1.0, 2.0, 0.0, 4.0, 5.0])
+    sides = np.array(["BUY", "SELL", "BUY", "SELL", "SELL"])
+
+    snaps = replay_bars(bar_ids, prices, qtys, sides)
+
+    acc = OrderFlowAccumulator()
+    expected = []
+    for bar in range(3):
+        for i in np.flatnonzero(bar_ids == bar):
+            acc.update(price=prices[i], qty=qtys[i], side=sides[i])
+        expected.append(acc.flush())
+
+    assert snaps == expected
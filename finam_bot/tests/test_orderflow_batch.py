@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from finam_bot.core.market_snapshot import MarketSnapshot
+from finam_bot.core.orderflow_analyzer import OrderFlowAnalyzer
+from finam_bot.core.orderflow_batch import TapeStats, analyze_imbalance_batch
+from finam_bot.core.orderflow_signal import OrderFlowSignal
+from finam_bot.core.orderflow_snapshot import OrderFlowSnapshot
+from finam_bot.core.signals import Signal
+from finam_bot.strategies.order_flow_pullback import OrderFlowPullbackStrategy
+
+CODE = {Signal.BUY: 1, Signal.SELL: -1, Signal.HOLD: 0}
+
+
+def random_bars(n, seed=11):
+    rng = np.random.default_rng(seed)
+    bid = rng.integers(0, 200, n).astype(float)
+    ask = rng.integers(0, 200, n).astype(float)
+    bid[rng.random(n) < 0.05] = np.nan
+
+    prices, volumes = [], []
+    for _ in range(n):
+        k = int(rng.integers(0, 5))
+        prices.append(list(100 + rng.integers(-2, 3, k) * 0.004))
+        volumes.append(list(rng.integers(10, 60, k).astype(float)))
+    return bid, ask, prices, volumes
+
+
+@pytest.mark.parametrize("tol", [0.01, 0.0005])
+def test_batch_matches_strategy_on_snapshot(tol):
+    bid, ask, prices, volumes = random_bars(2000)
+    divergence = np.random.default_rng(2).choice(np.array([0, 0, 0, 1, -1], dtype=np.int8), len(bid))
+    strategy = OrderFlowPullbackStrategy(absorption_price_tolerance=tol, imbalance_threshold=0.55)
+
+    expected_sig, expected_conf = [], []
+    for i in range(len(bid)):
+        snap = MarketSnapshot(
+            symbol="T",
+            price=100.0,
+            bid_volume=None if np.isnan(bid[i]) else bid[i],
+            ask_volume=ask[i],
+            prices=prices[i],
+            volumes=volumes[i],
+        )
+        div = None
+        if divergence[i]:
+            side = "BUY" if divergence[i] > 0 else "SELL"
+            div = OrderFlowSignal(side=side, strength=1.0, imbalance=0.0, reason="cvd_divergence")
+        expected_sig.append(CODE[strategy.on_snapshot(snap, divergence=div)])
+        expected_conf.append(strategy.last_confidence)
+
+    signal, _, confidence = strategy.evaluate_batch(
+        bid, ask, TapeStats.from_lists(prices, volumes), divergence
+    )
+
+    assert signal.tolist() == expected_sig
+    assert confidence.tolist() == expected_conf
+    assert any(expected_sig)
+
+
+def test_imbalance_batch_matches_analyzer_on_orderflow_snapshots():
+    bid, ask, _, _ = random_bars(500, seed=3)
+    bid = np.nan_to_num(bid)
+    analyzer = OrderFlowAnalyzer(imbalance_threshold=0.3)
+
+    side, strength, _ = analyze_imbalance_batch(bid, ask, imbalance_threshold=0.3, kind="orderflow")
+
+    for i in range(len(bid)):
+        sig = analyzer.analyze(OrderFlowSnapshot(bid_volume=bid[i], ask_volume=ask[i]))
+        if sig is None:
+            assert side[i] == 0 and strength[i] == 0.0
+        else:
+            assert side[i] == (1 if sig.side == "BUY" else -1)
+            assert strength[i] == sig.strength
+
+
+def test_tape_stats_from_ticks_matches_lists():
+    bar_ids = np.array([0, 0, 2, 2, 2])
+    prices = np.array([1.0, 2.0, 3.0, 5.0, 4.0])
+    volumes = np.array([10.0, 20.0, 1.0, 1.0, 1.0])
+
+    a = TapeStats.from_ticks(bar_ids, prices, volumes)
+    b = TapeStats.from_lists([[1.0, 2.0], [], [3.0, 5.0, 4.0]], [[10.0, 20.0], [], [1.0, 1.0, 1.0]])
+
+    for field in ("volume", "price_sum", "price_max", "price_min", "count"):
+        assert np.array_equal(getattr(a, field), getattr(b, field))
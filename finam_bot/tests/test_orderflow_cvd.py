@@ -0,0 +1,76 @@
+import numpy as np
+
+from finam_bot.core.orderflow_composite import build_composite_signal
+from finam_bot.core.orderflow_cvd import DIV_BUY, DIV_SELL, CvdTracker, cvd_divergence_batch
+from finam_bot.core.orderflow_signal import OrderFlowSignal
+
+# 2026-02-02 10:00 MSK = 07:00 UTC
+SESSION_OPEN_TS = 1770015600
+
+
+def run_stream(ts, high, low, delta, k):
+    tracker = CvdTracker(pivot_bars=k)
+    cvd, div = [], []
+    for row in zip(ts, high, low, delta):
+        sig = tracker.push(*row)
+        cvd.append(tracker.cvd)
+        div.append(0 if sig is None else (DIV_BUY if sig.side == "BUY" else DIV_SELL))
+    return np.array(cvd), np.array(div, dtype=np.int8)
+
+
+def test_bearish_divergence_on_higher_high_with_lower_cvd():
+    high = [10, 12, 11, 10, 11, 13, 12, 11]
+    low = [h - 1 for h in high]
+    delta = [5, 5, -2, -2, -3, -1, 0, 0]
+    ts = [SESSION_OPEN_TS + 60 * i for i in range(len(high))]
+
+    tracker = CvdTracker(pivot_bars=1)
+    sigs = [tracker.push(*row) for row in zip(ts, high, low, delta)]
+
+    fired = [(i, s) for i, s in enumerate(sigs) if s is not None]
+    assert len(fired) == 1
+    i, sig = fired[0]
+    assert i == 6                      # пивот на баре 5 подтверждён через 1 бар
+    assert sig.side == "SELL"
+    assert (sig.price, sig.prev_price) == (13, 12)
+    assert (sig.cvd, sig.prev_cvd) == (2, 10)
+    assert sig.pivot_ts == ts[5]
+
+
+def test_cvd_resets_on_new_session():
+    tracker = CvdTracker()
+    tracker.push(SESSION_OPEN_TS, 1, 1, 10)
+    tracker.push(SESSION_OPEN_TS + 3600, 1, 1, 5)
+    assert tracker.cvd == 15
+    tracker.push(SESSION_OPEN_TS + 86400, 1, 1, 3)
+    assert tracker.cvd == 3
+
+
+def test_batch_matches_streaming():
+    rng = np.random.default_rng(5)
+    n = 3000
+    ts = SESSION_OPEN_TS + 300 * np.arange(n)      # ~10 сессий
+    close = 100 + np.cumsum(rng.normal(size=n)).round(1)
+    high = close + rng.integers(0, 3, n) * 0.1
+    low = close - rng.integers(0, 3, n) * 0.1
+    delta = rng.integers(-50, 50, n).astype(float)
+
+    for k in (1, 3):
+        cvd_s, div_s = run_stream(ts, high, low, delta, k)
+        cvd_b, div_b = cvd_divergence_batch(ts, high, low, delta, pivot_bars=k)
+
+        assert np.array_equal(cvd_s, cvd_b)
+        assert np.array_equal(div_s, div_b)
+        assert (div_b != 0).any()
+
+
+def test_composite_divergence_boosts_or_blocks():
+    imb = OrderFlowSignal(side="BUY", strength=0.65, imbalance=0.65, reason="imbalance")
+    same = OrderFlowSignal(side="BUY", strength=1.0, imbalance=0.0, reason="cvd_divergence")
+    opposite = OrderFlowSignal(side="SELL", strength=1.0, imbalance=0.0, reason="cvd_divergence")
+
+    boosted = build_composite_signal(imbalance=imb, absorption=None, divergence=same)
+
+    assert boosted.confidence == 0.65 + 0.2
+    assert "cvd_divergence" in boosted.reasons
+    assert build_composite_signal(imbalance=imb, absorption=None, divergence=opposite) is None
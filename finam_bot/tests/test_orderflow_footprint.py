@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from finam_bot.core.orderflow_footprint import FootprintAccumulator
+
+
+def make_footprint(prints, tick_size=0.5, initial_levels=64):
+    fp = FootprintAccumulator(tick_size, initial_levels=initial_levels)
+    for price, qty, side in prints:
+        fp.update(price=price, qty=qty, side=side)
+    return fp
+
+
+def test_levels_poc_and_delta():
+    fp = make_footprint([
+        (100.0, 5, "BUY"),
+        (100.0, 3, "SELL"),
+        (100.5, 10, "BUY"),
+        (99.5, 2, "SELL"),
+    ])
+    bar = fp.view()
+
+    assert list(bar.prices) == [99.5, 100.0, 100.5]
+    assert list(bar.bid) == [2.0, 3.0, 0.0]
+    assert list(bar.ask) == [0.0, 5.0, 10.0]
+    assert bar.poc() == 100.5
+    assert bar.delta_at(100.0) == -2.0
+    assert bar.delta_at(200.0) == 0.0
+    assert bar.total_volume == 20.0
+
+
+def test_array_grows_both_ways_and_flush_resets():
+    fp = make_footprint([(100.0, 1, "BUY"), (150.0, 1, "SELL"), (50.0, 1, "BUY")], tick_size=1.0, initial_levels=4)
+
+    bar = fp.flush()
+
+    assert bar.prices[0] == 50.0 and bar.prices[-1] == 150.0
+    assert len(bar.prices) == 101
+    assert bar.total_volume == 3.0
+    assert fp.view().total_volume == 0.0
+
+    fp.update(price=10.0, qty=2, side="BUY")
+    assert list(fp.flush().prices) == [10.0]
+
+
+def test_value_area_expands_towards_larger_neighbour():
+    vols = {98.0: 5, 99.0: 20, 100.0: 40, 101.0: 10, 102.0: 25}
+    fp = make_footprint([(p, q, "BUY") for p, q in vols.items()], tick_size=1.0)
+
+    # 40 -> +20 (99) -> +10 (101) = 70 из 100
+    assert fp.view().value_area(0.7) == (99.0, 101.0)
+    with pytest.raises(ValueError):
+        fp.view().value_area(0)
+
+
+def test_stacked_buy_imbalance():
+    prints = [(100.0 + i, 1, "SELL") for i in range(5)]
+    prints += [(101.0, 3, "BUY"), (102.0, 4, "BUY"), (103.0, 5, "BUY")]
+    fp = make_footprint(prints, tick_size=1.0)
+
+    stacks = fp.view().stacked_imbalances(ratio=3.0, min_stack=3)
+
+    assert stacks == [("BUY", 101.0, 103.0)]
+    assert np.all(fp.view().deltas[1:4] < 0)
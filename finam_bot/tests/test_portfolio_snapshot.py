@@ -0,0 +1,136 @@
+import threading
+import time
+
+from finam_bot.portfolio.snapshot import SnapshotBuilder, build_snapshot
+
+
+class Client:
+    """
+    Каждый "RPC" спит 50 мс и считается.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _rpc(self, name):
+        with self.lock:
+            self.calls.append(name)
+        time.sleep(0.05)
+
+    def get_account(self):
+        self._rpc("GetAccount")
+        return {"account_id": "ACC1"}
+
+    def get_portfolios(self, account=None):
+        account = account or self.get_account()
+        return [{"account_id": account["account_id"], "balance": 1.0}]
+
+    def get_positions(self, account=None):
+        account = account or self.get_account()
+        return [{"account_id": account["account_id"], "symbol": "SBER"}]
+
+    def get_trades(self, limit=100):
+        self._rpc("Trades")
+        return [{"trade_id": "T1"}]
+
+    def get_transactions(self, days=7, limit=100):
+        self._rpc("Transactions")
+        return []
+
+
+def test_builder_shares_get_account_and_runs_concurrently():
+    client = Client()
+    builder = SnapshotBuilder(client, ttl=60)
+
+    t0 = time.perf_counter()
+    snap = builder.get()
+    elapsed = time.perf_counter() - t0
+
+    assert sorted(client.calls) == ["GetAccount", "Trades", "Transactions"]
+    assert elapsed < 0.12                       # последовательно было бы >= 0.15
+    assert snap == build_snapshot(Client())     # тот же результат, что и старый путь
+    builder.close()
+
+
+def test_builder_ttl_cache_and_single_flight():
+    client = Client()
+    now = [0.0]
+    builder = SnapshotBuilder(client, ttl=1.0, clock=lambda: now[0])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(builder.get())) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert client.calls.count("GetAccount") == 1
+    assert all(r is results[0] for r in results)
+
+    now[0] = 0.5
+    assert builder.get() is results[0]
+    now[0] = 1.5
+    assert builder.get() is not results[0]
+    assert client.calls.count("GetAccount") == 2
+
+    builder.invalidate()
+    builder.get()
+    assert client.calls.count("GetAccount") == 3
+    builder.close()
+
+
+class GatedClient(Client):
+    """
+    GetAccount первой сборки ждёт release — сборка «в полёте» сколько нужно.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get_account(self):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(2)
+        return super().get_account()
+
+
+def _in_flight_build(builder, client):
+    results = []
+    t = threading.Thread(target=lambda: results.append(builder.get()))
+    t.start()
+    assert client.started.wait(2)
+    return t, results
+
+
+def test_invalidate_skips_in_flight_build_from_older_generation():
+    client = GatedClient()
+    builder = SnapshotBuilder(client, ttl=60)
+    t, old = _in_flight_build(builder, client)
+
+    builder.invalidate()                        # сделка после старта сборки
+    fresh = builder.get()                       # не присоединяется к старой
+    client.release.set()
+    t.join()
+
+    assert client.calls.count("GetAccount") == 2
+    assert old[0] is not fresh
+    assert builder.get() is fresh               # старая сборка не перезаписала кэш
+    builder.close()
+
+
+def test_force_does_not_join_regular_in_flight_build():
+    client = GatedClient()
+    builder = SnapshotBuilder(client, ttl=60)
+    t, old = _in_flight_build(builder, client)
+
+    forced = builder.get(force=True)
+    client.release.set()
+    t.join()
+
+    assert client.calls.count("GetAccount") == 2
+    assert old[0] is not forced
+    assert builder.get() is forced              # более поздняя сборка остаётся в кэше
+    builder.close()
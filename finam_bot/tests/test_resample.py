@@ -0,0 +1,62 @@
+import pytest
+
+from finam_bot.backtest.models import Candle
+from finam_bot.backtest.resample import BarRule, StreamingResampler, resample
+from finam_bot.backtest.synthetic import generate_synthetic_candles
+
+# 2026-02-02 10:00 MSK = 07:00 UTC
+SESSION_OPEN_TS = 1770015600
+
+
+def m1_candles(n: int, start_ts: int = SESSION_OPEN_TS):
+    return generate_synthetic_candles(n=n, start_ts=start_ts, ts_step=60, seed=7)
+
+
+def stream_all(rule, candles):
+    r = StreamingResampler(rule)
+    out = [b for b in (r.push(c) for c in candles) if b is not None]
+    tail = r.flush()
+    if tail is not None:
+        out.append(tail)
+    return out
+
+
+def test_m1_to_m5_aligned_to_session_open():
+    candles = m1_candles(12, start_ts=SESSION_OPEN_TS - 120)  # 09:58 MSK
+
+    bars = resample(candles, BarRule.timeframe("M5"))
+
+    assert [b.ts for b in bars] == [SESSION_OPEN_TS - 300, SESSION_OPEN_TS, SESSION_OPEN_TS + 300]
+    first = bars[1]
+    src = candles[2:7]
+    assert first.open == src[0].open
+    assert first.close == src[-1].close
+    assert first.high == max(c.high for c in src)
+    assert first.low == min(c.low for c in src)
+    assert first.volume == pytest.approx(sum(c.volume for c in src))
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        BarRule.timeframe("M5"),
+        BarRule.timeframe("H1"),
+        BarRule(kind="volume", size=5_000.0),
+        BarRule(kind="tick", size=7),
+        BarRule(kind="dollar", size=400_000.0),
+    ],
+)
+def test_streaming_matches_vectorized(rule):
+    candles = m1_candles(500)
+    assert stream_all(rule, candles) == resample(candles, rule)
+
+
+def test_volume_bar_is_emitted_as_soon_as_threshold_is_crossed():
+    r = StreamingResampler(BarRule(kind="volume", size=100.0))
+    c = lambda ts, v: Candle(ts=ts, open=1.0, high=1.0, low=1.0, close=1.0, volume=v)
+
+    assert r.push(c(1, 60.0)) is None
+    bar = r.push(c(2, 50.0))
+
+    assert bar is not None
+    assert (bar.ts, bar.volume) == (1, 110.0)
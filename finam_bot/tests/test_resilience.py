@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from finam_bot.grpc.resilience import CallPolicy, CircuitBreaker, CircuitOpenError, ResilientCaller, method_name
+from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2, accounts_service_pb2_grpc
+from finam_bot.infra.metrics import MetricsRegistry
+
+
+class Accounts(accounts_service_pb2_grpc.AccountsServiceServicer):
+    """
+    account_id управляет поведением:
+      SLOW   — первый вызов висит 1 с (повод для hedge)
+      FLAKY  — первые два вызова UNAVAILABLE
+      BAD    — INVALID_ARGUMENT (не повторяется)
+      DOWN   — всегда UNAVAILABLE
+      MISSING — NOT_FOUND (ответ API, не деградация)
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def GetAccount(self, request, context):
+        with self.lock:
+            n = self.calls[request.account_id] = self.calls.get(request.account_id, 0) + 1
+        kind = request.account_id
+        if kind == "SLOW" and n == 1:
+            time.sleep(1.0)
+        elif kind == "FLAKY" and n <= 2:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "try later")
+        elif kind == "BAD":
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "bad account")
+        elif kind == "DOWN":
+            context.abort(grpc.StatusCode.UNAVAILABLE, "down")
+        elif kind == "MISSING":
+            context.abort(grpc.StatusCode.NOT_FOUND, "no such account")
+        return accounts_service_pb2.GetAccountResponse(account_id=f"{kind}#{n}")
+
+
+@pytest.fixture
+def stub():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    servicer = Accounts()
+    accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    yield accounts_service_pb2_grpc.AccountsServiceStub(channel), servicer
+    channel.close()
+    server.stop(None)
+
+
+def req(account_id):
+    return accounts_service_pb2.GetAccountRequest(account_id=account_id)
+
+
+def test_retry_only_retryable_codes(stub):
+    accounts, servicer = stub
+    metrics = MetricsRegistry()
+    rpc = ResilientCaller(lambda: [], metrics=metrics, rng=lambda: 0.0,
+                          policies={"GetAccount": CallPolicy(deadline=2.0, max_attempts=3)})
+
+    assert method_name(accounts.GetAccount) == "GetAccount"
+    assert rpc.call(accounts.GetAccount, req("FLAKY")).account_id == "FLAKY#3"
+
+    with pytest.raises(grpc.RpcError) as e:
+        rpc.call(accounts.GetAccount, req("BAD"))
+    assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert servicer.calls["BAD"] == 1
+
+    c = metrics.counters
+    assert c["rpc.GetAccount.calls"] == 2 and c["rpc.GetAccount.retries"] == 2
+    assert c["rpc.GetAccount.errors"] == 1
+    assert metrics.histogram("rpc.GetAccount").count == 2
+    assert rpc.breaker.state == "closed"      # INVALID_ARGUMENT — не деградация API
+
+
+def test_hedged_read_returns_first_success(stub):
+    accounts, servicer = stub
+    metrics = MetricsRegistry()
+    rpc = ResilientCaller(lambda: [], metrics=metrics,
+                          policies={"GetAccount": CallPolicy(deadline=3.0, hedge_delay=0.05)})
+
+    t0 = time.perf_counter()
+    resp = rpc.call(accounts.GetAccount, req("SLOW"))
+    assert resp.account_id == "SLOW#2"
+    assert time.perf_counter() - t0 < 0.9
+    assert metrics.counters["rpc.GetAccount.hedged"] == 1
+
+
+def test_circuit_breaker_fails_fast_then_probes(stub):
+    accounts, servicer = stub
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    rpc = ResilientCaller(lambda: [], breaker=breaker, metrics=MetricsRegistry(),
+                          policies={"GetAccount": CallPolicy(max_attempts=1)})
+
+    for _ in range(2):
+        with pytest.raises(grpc.RpcError):
+            rpc.call(accounts.GetAccount, req("DOWN"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        rpc.call(accounts.GetAccount, req("OK"))
+    assert servicer.calls["DOWN"] == 2 and "OK" not in servicer.calls
+
+    now[0] = 10.0                           # half-open: одна пробная попытка
+    assert rpc.call(accounts.GetAccount, req("OK")).account_id == "OK#1"
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_is_released_on_any_outcome(stub):
+    accounts, servicer = stub
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    broken_metadata = [False]
+
+    def metadata():
+        if broken_metadata[0]:
+            raise RuntimeError("token store unavailable")
+        return []
+
+    rpc = ResilientCaller(metadata, breaker=breaker, metrics=MetricsRegistry(),
+                          policies={"GetAccount": CallPolicy(max_attempts=1)})
+
+    with pytest.raises(grpc.RpcError):
+        rpc.call(accounts.GetAccount, req("DOWN"))
+    now[0] = 10.0
+    # пробная попытка — NOT_FOUND: API ответил, breaker закрывается
+    with pytest.raises(grpc.RpcError):
+        rpc.call(accounts.GetAccount, req("MISSING"))
+    assert breaker.state == "closed"
+
+    with pytest.raises(grpc.RpcError):
+        rpc.call(accounts.GetAccount, req("DOWN"))
+    now[0] = 20.0
+    # пробная попытка упала не на gRPC — без вердикта, но и без залипания
+    broken_metadata[0] = True
+    with pytest.raises(RuntimeError):
+        rpc.call(accounts.GetAccount, req("OK"))
+    assert breaker.state == "half_open" and not breaker._trial
+    broken_metadata[0] = False
+    assert rpc.call(accounts.GetAccount, req("OK")).account_id.startswith("OK#")
+    assert breaker.state == "closed"
@@ -0,0 +1,84 @@
+import sqlite3
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from finam_bot.risk_config import KILL_SWITCH_KEY
+from finam_bot.risk_engine import RiskEngine
+from finam_bot.storage_sqlite import StorageSQLite
+
+
+def _trade(i, ts, side="BUY", qty=1.0, price=100.0):
+    return {"trade_id": f"T{i}", "account_id": "A", "ts": ts, "symbol": "SBER",
+            "side": side, "qty": qty, "price": price}
+
+
+def test_daily_stats_maintained_by_trigger(tmp_path):
+    path = tmp_path / "finam.db"
+    storage = StorageSQLite(path)
+    storage.insert_trades([
+        _trade(1, "2026-02-10T10:00:00Z"),
+        _trade(2, "2026-02-10T11:00:00Z", side="SELL", price=110.0),
+        _trade(3, "2026-02-11T09:00:00Z", qty=2.0),
+    ])
+    storage.insert_trades([_trade(1, "2026-02-10T10:00:00Z")])     # дубль не считается
+
+    assert storage.get_daily_trade_stats("2026-02-10") == (2, 10.0)
+    assert storage.get_daily_trade_stats("2026-02-11") == (1, -200.0)
+    assert storage.get_daily_trade_stats("2026-02-12") == (0, 0.0)
+    storage.close()
+
+    # старая БД без daily_trade_stats — пересчёт при открытии
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE daily_trade_stats")
+    conn.commit()
+    conn.close()
+    reopened = StorageSQLite(path)
+    assert reopened.get_daily_trade_stats("2026-02-10") == (2, 10.0)
+    reopened.close()
+
+
+def test_risk_engine_counters_roll_at_day_boundary(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    storage.insert_trades([_trade(i, f"2026-02-10T10:0{i}:00Z") for i in range(4)])
+
+    now = [datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc)]
+    tick = [0.0]
+    risk = RiskEngine(storage, Decimal("1000000"), clock=lambda: now[0], monotonic=lambda: tick[0])
+
+    assert risk.trades_today() == 4
+    assert risk.daily_pnl() == Decimal("-400.0")
+    assert risk.allow_trade(Decimal("100")) == (True, "OK")
+
+    risk.record_trade("BUY", 1, 100)                # своя сделка — сразу в памяти
+    assert risk.trades_today() == 5
+    assert risk.allow_trade(Decimal("100")) == (False, "MAX_TRADES_EXCEEDED")
+
+    now[0] = datetime(2026, 2, 11, 0, 0, 1, tzinfo=timezone.utc)
+    assert (risk.trades_today(), risk.daily_pnl()) == (0, Decimal(0))
+
+    risk.record_trade("BUY", 1000, 30)               # -30000 > 2% от капитала
+    assert risk.allow_trade(Decimal("100")) == (False, "MAX_DAILY_LOSS")
+    assert storage.get_risk_flag(KILL_SWITCH_KEY) == "ON"
+    assert risk.allow_trade(Decimal("100")) == (False, "KILL_SWITCH_ACTIVE")
+    storage.close()
+
+
+def test_recorded_trade_survives_refresh_until_synced(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db")
+    storage.insert_trades([_trade(1, "2026-02-10T10:00:00Z")])
+
+    now = datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc)
+    tick = [0.0]
+    risk = RiskEngine(storage, Decimal("1000000"), refresh_interval=1.0,
+                      clock=lambda: now, monotonic=lambda: tick[0])
+    assert risk.trades_today() == 1
+
+    risk.record_trade("BUY", 1, 100, trade_id="T2")
+    tick[0] = 5.0                                   # refresh до синхронизации
+    assert (risk.trades_today(), risk.daily_pnl()) == (2, Decimal("-200.0"))
+
+    storage.insert_trades([_trade(2, "2026-02-10T12:00:00Z")])   # синхронизация записала T2
+    tick[0] = 10.0
+    assert (risk.trades_today(), risk.daily_pnl()) == (2, Decimal("-200.0"))   # не дважды
+    assert not risk._pending
+    storage.close()
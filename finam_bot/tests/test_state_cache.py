@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import grpc
+
+from finam_bot.execution.state_cache import OrderStateCache
+from finam_bot.grpc.aio_client import AsyncFinamClient
+from finam_bot.grpc_api.grpc.tradeapi.v1 import side_pb2, trade_pb2
+from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2, accounts_service_pb2_grpc
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2 as od
+from finam_bot.grpc_api.grpc.tradeapi.v1.orders import orders_service_pb2_grpc
+
+ORDER = od.Order(symbol="SBER@MISX", side=side_pb2.SIDE_BUY, quantity={"value": "10"},
+                 type=od.ORDER_TYPE_LIMIT, limit_price={"value": "110"}, client_order_id="c1")
+
+
+class Accounts(accounts_service_pb2_grpc.AccountsServiceServicer):
+    def __init__(self):
+        self.calls = 0
+
+    async def GetAccount(self, request, context):
+        self.calls += 1
+        return accounts_service_pb2.GetAccountResponse(
+            account_id=request.account_id,
+            equity={"value": "100000"},
+            positions=[{"symbol": "SBER@MISX", "quantity": {"value": "10"}, "average_price": {"value": "100"}}],
+        )
+
+
+class Orders(orders_service_pb2_grpc.OrdersServiceServicer):
+    def __init__(self, fail_first: bool = False):
+        self.calls = 0
+        self.subscribers = []
+        self.requests = []
+        self.fail_first = fail_first
+
+    async def GetOrders(self, request, context):
+        self.calls += 1
+        return od.OrdersResponse(orders=[od.OrderState(order_id="O1", status=od.ORDER_STATUS_NEW, order=ORDER)])
+
+    async def SubscribeOrderTrade(self, request_iterator, context):
+        self.requests.append(await request_iterator.__anext__())
+        if self.fail_first and len(self.requests) == 1:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "bad subscription")
+        q = asyncio.Queue()
+        self.subscribers.append(q)
+        while True:
+            yield await q.get()
+
+
+def test_cache_seeds_once_and_follows_bidi_stream():
+    async def scenario():
+        server = grpc.aio.server()
+        accounts, orders = Accounts(), Orders()
+        accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(accounts, server)
+        orders_service_pb2_grpc.add_OrdersServiceServicer_to_server(orders, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = AsyncFinamClient(account_id="ACC1", channel=channel, jwt_token="jwt")
+        cache = await OrderStateCache(client).start()
+        while not orders.subscribers:
+            await asyncio.sleep(0.005)
+
+        seeded = (cache.positions(), [o.order_id for o in cache.active_orders()])
+
+        now = int(time.time()) + 1
+        fill = trade_pb2.AccountTrade(trade_id="T1", order_id="O1", symbol="SBER@MISX", side=side_pb2.SIDE_BUY,
+                                      size={"value": "10"}, price={"value": "110"}, timestamp={"seconds": now})
+        done = od.OrderState(order_id="O1", status=od.ORDER_STATUS_FILLED, order=ORDER,
+                             executed_quantity={"value": "10"})
+        orders.subscribers[0].put_nowait(od.OrderTradeResponse(orders=[done], trades=[fill]))
+        orders.subscribers[0].put_nowait(od.OrderTradeResponse(trades=[fill]))    # дубль
+        while not cache.trades:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.02)
+
+        await cache.stop()
+        await channel.close()
+        await server.stop(None)
+        return cache, seeded, accounts, orders
+
+    cache, (positions, active), accounts, orders = asyncio.run(scenario())
+
+    assert positions == [{"account_id": "ACC1", "symbol": "SBER", "mic": "MISX", "qty": 10.0,
+                          "avg_price": 100.0, "current_price": 0.0, "unrealized_pnl": 0.0}]
+    assert active == ["O1"]
+    assert orders.requests[0].action == od.OrderTradeRequest.ACTION_SUBSCRIBE
+    assert orders.requests[0].account_id == "ACC1"
+
+    # после стрима — без новых RPC
+    assert (accounts.calls, orders.calls) == (1, 1)
+    assert cache.order("O1").status == "FILLED" and not cache.active_orders()
+    pos = cache.position("SBER@MISX")
+    assert (pos.qty, pos.avg_price) == (20.0, 105.0)
+    assert len(cache.trades) == 1
+    assert cache.equity == 100000.0
+
+
+def test_trades_before_snapshot_are_not_double_counted():
+    cache = OrderStateCache(AsyncFinamClient(account_id="ACC1", jwt_token="jwt"))
+    cache.seeded_at = 1000.0
+
+    old = trade_pb2.AccountTrade(trade_id="T0", symbol="SBER@MISX", side=side_pb2.SIDE_SELL,
+                                 size={"value": "5"}, price={"value": "100"}, timestamp={"seconds": 999})
+    new = trade_pb2.AccountTrade(trade_id="T1", symbol="SBER@MISX", side=side_pb2.SIDE_SELL,
+                                 size={"value": "5"}, price={"value": "101"}, timestamp={"seconds": 1001})
+    cache.apply(od.OrderTradeResponse(trades=[old, new]))
+
+    pos = cache.position("SBER@MISX")
+    assert (pos.qty, pos.avg_price) == (-5.0, 101.0)
+    assert [t.trade_id for t in cache.recent_trades()] == ["T0", "T1"]
+
+
+def test_failed_stream_resubscribes_and_reseeds():
+    async def scenario():
+        server = grpc.aio.server()
+        accounts, orders = Accounts(), Orders(fail_first=True)
+        accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(accounts, server)
+        orders_service_pb2_grpc.add_OrdersServiceServicer_to_server(orders, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = AsyncFinamClient(account_id="ACC1", channel=channel, jwt_token="jwt")
+        cache = await OrderStateCache(client, restart_backoff=0.01).start()
+        for _ in range(200):
+            if orders.subscribers and not cache.stale:
+                break
+            await asyncio.sleep(0.005)
+        state = (cache.stale, accounts.calls, orders.calls, len(orders.requests))
+
+        await cache.stop()
+        await channel.close()
+        await server.stop(None)
+        return state
+
+    stale, account_calls, order_calls, subscribes = asyncio.run(scenario())
+
+    assert subscribes == 2
+    assert (account_calls, order_calls) == (2, 2)     # засев заново после переподписки
+    assert not stale
+
+
+def test_stale_flag_and_bounded_dedup():
+    cache = OrderStateCache(AsyncFinamClient(account_id="ACC1", jwt_token="jwt"), max_seen_trades=2)
+    assert cache.stale and cache.summary() == "state: not seeded"
+    cache.seeded_at = 1000.0
+    assert not cache.stale
+    cache._down = True
+    assert cache.stale and "STALE" in cache.summary()
+
+    trades = [trade_pb2.AccountTrade(trade_id=f"T{i}", symbol="SBER@MISX", side=side_pb2.SIDE_BUY,
+                                     size={"value": "1"}, price={"value": "100"}, timestamp={"seconds": 2000})
+              for i in range(3)]
+    cache.apply(od.OrderTradeResponse(trades=trades))
+    assert len(cache._seen_trades) == 2 and "T0" not in cache._seen_trades
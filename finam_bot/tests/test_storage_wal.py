@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+
+from finam_bot.infra.sqlite_writer import SQLiteWriter
+from finam_bot.storage_sqlite import StorageSQLite
+
+
+def _decision(i):
+    return {"ts": f"2026-02-10T12:00:{i % 60:02d}Z", "symbol": "SBER", "asset_class": "EQUITY",
+            "side": "BUY", "qty": 1.0, "entry": 100.0, "stop": 99.0,
+            "allowed": True, "reason": "OK", "confidence": 0.5}
+
+
+def test_wal_mode_group_commits_and_readers_see_data(tmp_path):
+    storage = StorageSQLite(tmp_path / "finam.db", mode="wal", commit_interval=0.05)
+
+    threads = [
+        threading.Thread(target=lambda k=k: [storage.insert_decision(_decision(k * 100 + i)) for i in range(100)])
+        for k in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    storage.insert_trades([{"trade_id": "T1", "account_id": "A", "ts": "2026-02-10T12:00:00Z",
+                            "symbol": "SBER", "side": "BUY", "qty": 1.0, "price": 100.0}])
+    assert storage.flush(timeout=5)
+
+    stats = storage.writer.stats
+    assert stats["ops"] == 401
+    assert stats["batches"] < stats["ops"]          # group commit, а не commit на запись
+
+    assert len(storage.get_trades("A")) == 1
+    other = sqlite3.connect(tmp_path / "finam.db")
+    assert other.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert other.execute("SELECT COUNT(*) FROM decisions").fetchone()[0] == 400
+    other.close()
+    storage.close()
+
+
+def test_writer_isolates_failing_op_and_drains_on_stop(tmp_path):
+    path = tmp_path / "w.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+
+    writer = SQLiteWriter(path, commit_interval=0.2).start()
+    writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)"))
+    writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)"))      # PK conflict
+    writer.submit(lambda c: c.execute("INSERT INTO t VALUES (2)"))
+    writer.stop()
+
+    assert writer.stats["errors"] == 1
+    rows = sqlite3.connect(path).execute("SELECT x FROM t ORDER BY x").fetchall()
+    assert rows == [(1,), (2,)]
+
+
+class FailingCommit(sqlite3.Connection):
+    fail = 1
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT" and FailingCommit.fail:
+            FailingCommit.fail -= 1
+            raise sqlite3.OperationalError("disk I/O error")
+        return super().execute(sql, *args)
+
+
+class FlakyWriter(SQLiteWriter):
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                               factory=FailingCommit)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+
+def test_writer_survives_commit_failure(tmp_path):
+    path = tmp_path / "w.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+
+    writer = FlakyWriter(path, commit_interval=0.01).start()
+    writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)"))
+    assert writer.flush(timeout=2)                  # пачка упала на COMMIT, flush не висит
+    assert writer.stats["errors"] == 1
+
+    writer.submit(lambda c: c.execute("INSERT INTO t VALUES (2)"))
+    assert writer.flush(timeout=2)
+    writer.stop()
+
+    rows = sqlite3.connect(path).execute("SELECT x FROM t").fetchall()
+    assert rows == [(2,)]
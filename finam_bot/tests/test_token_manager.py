@@ -0,0 +1,121 @@
+import asyncio
+import base64
+import json
+
+import grpc
+
+from finam_bot.grpc.aio_client import AsyncFinamClient
+from finam_bot.grpc.token_manager import TokenManager, jwt_expiry
+from finam_bot.grpc_api.grpc.tradeapi.v1.accounts import accounts_service_pb2, accounts_service_pb2_grpc
+
+
+def make_jwt(exp, n=0):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp, "n": n}).encode()).rstrip(b"=").decode()
+    return f"hdr.{payload}.sig"
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Exchange:
+    def __init__(self, clock, ttl=600):
+        self.clock, self.ttl, self.calls = clock, ttl, 0
+
+    def __call__(self, secret):
+        assert secret == "secret"
+        self.calls += 1
+        return make_jwt(self.clock() + self.ttl, self.calls)
+
+
+def test_jwt_expiry_parses_payload():
+    assert jwt_expiry(make_jwt(1234)) == 1234.0
+    assert jwt_expiry("not-a-jwt") is None
+
+
+def test_token_shared_via_file_and_refreshed_before_expiry(tmp_path):
+    clock = Clock()
+    exchange = Exchange(clock)
+    cache = tmp_path / "jwt.json"
+
+    a = TokenManager("secret", exchange, cache_path=cache, refresh_margin=60, clock=clock)
+    b = TokenManager("secret", exchange, cache_path=cache, refresh_margin=60, clock=clock)
+
+    t1 = a.token()
+    assert b.token() == t1                       # второй "процесс" берёт из файла
+    assert exchange.calls == 1
+    assert "secret" not in cache.read_text()
+
+    clock.now += 600 - 60 + 1                    # вошли в окно refresh_margin
+    t2 = b.token()
+    assert t2 != t1 and exchange.calls == 2
+    assert a.token() == t2 and exchange.calls == 2
+
+    # сервер отверг t2: a обновляет, b видит свежий токен в файле без Auth
+    t3 = a.refresh(stale=t2)
+    assert b.refresh(stale=t2) == t3
+    assert exchange.calls == 3
+
+    # другой scope (sandbox) — отдельная запись
+    TokenManager("secret", exchange, scope="sandbox", cache_path=cache, clock=clock).token()
+    assert exchange.calls == 4
+
+
+def test_short_ttl_token_is_fresh_for_half_its_life(tmp_path):
+    clock = Clock()
+    exchange = Exchange(clock, ttl=60)              # короче refresh_margin
+    cache = tmp_path / "jwt.json"
+    tokens = TokenManager("secret", exchange, cache_path=cache, refresh_margin=120, clock=clock)
+
+    t1 = tokens.token()
+    assert tokens.token() == t1 and exchange.calls == 1          # не Auth на каждый вызов
+    clock.now += 29
+    other = TokenManager("secret", exchange, cache_path=cache, refresh_margin=120, clock=clock)
+    assert other.token() == t1 and exchange.calls == 1            # ttl берётся и из файла
+
+    clock.now += 2                                   # прошла половина срока
+    assert tokens.token() != t1 and exchange.calls == 2
+
+
+class Accounts(accounts_service_pb2_grpc.AccountsServiceServicer):
+    def __init__(self):
+        self.tokens = []
+
+    async def GetAccount(self, request, context):
+        auth = dict(context.invocation_metadata())["authorization"]
+        self.tokens.append(auth)
+        if len(self.tokens) == 1:
+            await context.abort(grpc.StatusCode.UNAUTHENTICATED, "jwt expired")
+        return accounts_service_pb2.GetAccountResponse(account_id=request.account_id)
+
+
+def test_aio_client_reauthenticates_through_token_manager(tmp_path):
+    clock = Clock()
+    exchange = Exchange(clock)
+    tokens = TokenManager("secret", exchange, cache_path=tmp_path / "jwt.json", clock=clock)
+
+    async def scenario():
+        server = grpc.aio.server()
+        accounts = Accounts()
+        accounts_service_pb2_grpc.add_AccountsServiceServicer_to_server(accounts, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+
+        channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+        client = AsyncFinamClient(account_id="ACC1", channel=channel, token_manager=tokens, max_attempts=1)
+        await client.connect()
+        resp = await client.get_account()
+
+        await channel.close()
+        await server.stop(None)
+        return resp, accounts.tokens
+
+    resp, seen = asyncio.run(scenario())
+    assert resp.account_id == "ACC1"
+    assert exchange.calls == 2
+    assert seen[0] != seen[1]
+    assert seen[1] == f"Bearer {tokens.current()}"
@@ -0,0 +1,73 @@
+import pytest
+
+from finam_bot.core.orderflow_accumulator import OrderFlowAccumulator
+from finam_bot.core.trade_bar_builder import TradeBarBuilder
+
+# 2026-02-02 10:00 MSK = 07:00 UTC
+SESSION_OPEN_TS = 1770015600
+
+
+def test_time_bar_closes_on_next_interval_and_matches_accumulator():
+    b = TradeBarBuilder("time", 60)
+    acc = OrderFlowAccumulator()
+    prints = [
+        (SESSION_OPEN_TS + 1, 100.0, 2.0, "BUY"),
+        (SESSION_OPEN_TS + 10, 101.0, 1.0, "SELL"),
+        (SESSION_OPEN_TS + 59, 99.5, 3.0, "BUY"),
+    ]
+    for ts, px, qty, side in prints:
+        assert b.push(ts, px, qty, side) is None
+        acc.update(price=px, qty=qty, side=side)
+
+    out = b.push(SESSION_OPEN_TS + 61, 100.5, 1.0, "SELL")
+
+    assert out is not None
+    candle, flow = out
+    assert candle.ts == SESSION_OPEN_TS
+    assert (candle.open, candle.high, candle.low, candle.close) == (100.0, 101.0, 99.5, 99.5)
+    assert candle.volume == 6.0
+    assert flow == acc.flush()
+
+    tail = b.flush()
+    assert tail[0].ts == SESSION_OPEN_TS + 60
+    assert b.flush() is None
+
+
+def test_time_bar_poll_closes_without_trade():
+    b = TradeBarBuilder("time", 60)
+    b.push(SESSION_OPEN_TS + 5, 100.0, 1.0, "BUY")
+
+    assert b.poll(SESSION_OPEN_TS + 59) is None
+    candle, flow = b.poll(SESSION_OPEN_TS + 60)
+    assert candle.close == 100.0
+    assert flow.ask_volume == 1.0
+
+
+@pytest.mark.parametrize("mode,threshold,closing_idx", [("volume", 5.0, 2), ("tick", 2, 1)])
+def test_volume_and_tick_bars_close_on_threshold(mode, threshold, closing_idx):
+    b = TradeBarBuilder(mode, threshold)
+    prints = [(1, 10.0, 2.0, "BUY"), (2, 11.0, 2.0, "SELL"), (3, 12.0, 2.0, "BUY")]
+
+    results = [b.push(*p) for p in prints]
+
+    assert [i for i, r in enumerate(results) if r is not None] == [closing_idx]
+    candle, flow = results[closing_idx]
+    assert candle.ts == 1
+    assert flow.trades == closing_idx + 1
+
+
+def test_unknown_side_and_zero_qty_are_ignored():
+    b = TradeBarBuilder("tick", 1)
+    assert b.push(1, 10.0, 0.0, "BUY") is None
+    assert b.push(1, 10.0, 1.0, "?") is None
+    assert b.flush() is None
+
+
+def test_late_print_after_poll_keeps_interval_ts():
+    b = TradeBarBuilder("time", 60)
+    b.push(SESSION_OPEN_TS + 5, 100.0, 1.0, "BUY")
+    assert b.poll(SESSION_OPEN_TS + 60) is not None
+
+    # сделка с опозданием из того же интервала — новый бар с тем же ts, не None
+    b.push(SESSION_OPEN_TS + 50, 100.5, 1.0, "BUY")
+    assert b.flush()[0].ts == SESSION_OPEN_TS
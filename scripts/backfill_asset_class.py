@@ -22,6 +22,7 @@ def main():
         updated += 1
 
     s.conn.commit()
+    s.reconcile_exposure()
     print("asset_class updated:", updated)
 
 if __name__ == "__main__":
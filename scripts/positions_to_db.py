@@ -2,6 +2,8 @@ import sqlite3
 from collections import defaultdict
 from pathlib import Path
 
+from finam_bot.storage_sqlite import StorageSQLite
+
 DB_PATH = Path("finam_bot/data/finam.db")
 
 
@@ -70,11 +72,10 @@ def main():
         p["qty"] += signed_qty
         p["value"] += signed_qty * price
 
-    # --- очищаем positions ---
-    conn.execute("DELETE FROM positions")
-
-    written = 0
+    conn.close()
 
+    # --- заменяем positions (и агрегаты exposure_summary) ---
+    rows = []
     for p in positions.values():
         qty = p["qty"]
 
@@ -82,34 +83,17 @@ def main():
             continue
 
         instrument = p["instrument"]
-        avg_price = abs(p["value"] / qty)
-        side = "LONG" if qty > 0 else "SHORT"
-        asset_class = asset_class_by_symbol(instrument)
-
-        conn.execute(
-            """
-            INSERT INTO positions (
-                instrument,
-                side,
-                asset_class,
-                qty,
-                avg_price
-            )
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                instrument,
-                side,
-                asset_class,
-                qty,
-                avg_price,
-            )
-        )
-
-        written += 1
-
-    conn.commit()
-    conn.close()
+        rows.append({
+            "instrument": instrument,
+            "side": "LONG" if qty > 0 else "SHORT",
+            "asset_class": asset_class_by_symbol(instrument),
+            "qty": qty,
+            "avg_price": abs(p["value"] / qty),
+        })
+
+    storage = StorageSQLite(DB_PATH)
+    written = storage.replace_positions(rows)
+    storage.close()
 
     print(f"positions written: {written}")
 
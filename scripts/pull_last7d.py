@@ -2,6 +2,7 @@ import os
 import json
 from datetime import datetime, timezone
 from finam_bot.finam_client import FinamClient
+from finam_bot.portfolio.sync import AccountSync
 from finam_bot.storage_sqlite import StorageSQLite
 import finam_bot.storage_sqlite
 print("STORAGE MODULE FILE:", finam_bot.storage_sqlite.__file__)
@@ -58,7 +59,7 @@ def main():
     # account check
     # ---------------------------
     if hasattr(client, "get_account"):
-        acc = client.get_account(account_id)
+        acc = client.get_account()
         log(
             "get_account",
             account_id=account_id,
@@ -67,44 +68,19 @@ def main():
         )
 
     # ---------------------------
-    # SINCE from SQLite (ISO -> datetime)
+    # incremental sync: hwm из sync_state -> постранично -> одна транзакция
     # ---------------------------
-    since_trades_iso = storage.get_since_trades(account_id)
-    since_tx_iso = storage.get_since_transactions(account_id)
-
-    since_trades = iso_to_dt(since_trades_iso)
-    since_tx = iso_to_dt(since_tx_iso)
+    report = AccountSync(client, storage).run()
 
     log(
         "since",
-        trades=since_trades_iso,
-        transactions=since_tx_iso,
+        trades=report.trades_since,
+        transactions=report.transactions_since,
     )
-
-    # ---------------------------
-    # pull trades
-    # ---------------------------
-    trades = client.fetch_trades(
-        account_id=account_id,
-        since=since_trades,
-    )
-    storage.insert_trades(trades, account_id)
-#    storage.insert_trades(trades)
     cnt = storage.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
     print("DB trades count AFTER INSERT:", cnt)
-    log("trades", count=len(trades), since=since_trades_iso)
-
-    # ---------------------------
-    # pull transactions
-    # ---------------------------
-    transactions = client.fetch_transactions(
-        account_id=account_id,
-        since=since_tx,
-    )
-
-    storage.insert_transactions(transactions)
-
-    log("transactions", count=len(transactions), since=since_tx_iso)
+    log("trades", count=report.trades, since=report.trades_since)
+    log("transactions", count=report.transactions, since=report.transactions_since)
 
     # ---------------------------
     # done
@@ -112,8 +88,8 @@ def main():
     log(
         "done",
         account_id=account_id,
-        trades=len(trades),
-        transactions=len(transactions),
+        trades=report.trades,
+        transactions=report.transactions,
         ts=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
     )
 
@@ -0,0 +1,58 @@
+"""
+Обновление кэша инструментов (AssetsService -> finam_bot/data/instruments.json)
+
+Запуск:
+python -m scripts.refresh_instruments --symbols SBER@MISX,NG-2.26@RTSX
+python -m scripts.refresh_instruments --symbols SBER@MISX --force
+"""
+
+import argparse
+import asyncio
+
+from finam_bot.env import load_env
+from finam_bot.grpc.factory import create_async_client
+from finam_bot.instruments import InstrumentRegistry
+
+
+async def refresh(symbols, force: bool) -> InstrumentRegistry:
+    registry = InstrumentRegistry.load()
+    if not force and not registry.is_stale():
+        return registry
+    async with create_async_client() as client:
+        return await registry.refresh(client, symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh instrument metadata and schedule cache")
+    parser.add_argument(
+        "--symbols",
+        type=str,
+        default="",
+        help="Working symbols for lot/tick/schedule details (comma separated)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Refresh even if cache is within TTL",
+    )
+    args = parser.parse_args()
+
+    load_env()
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    registry = asyncio.run(refresh(symbols, args.force))
+
+    print(f"INSTRUMENTS : {len(registry)}")
+    print(f"CACHE       : {registry.cache_path}")
+    for s in symbols:
+        info = registry.get(s)
+        if info is None:
+            print(f"{s:<16} NOT FOUND")
+            continue
+        print(
+            f"{s:<16} {info.asset_class:<9} lot={info.lot_size if info.lot_size is not None else '-'} step={info.min_step:g} "
+            f"exp={info.expiration or '-'} open={registry.is_open(s)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
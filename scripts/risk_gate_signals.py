@@ -19,9 +19,10 @@ def main():
         print("No signals")
         return
 
-    for s in reversed(signals):
-        allowed, reason = risk.allow_trade(DEFAULT_RISK_AMOUNT)
+    signals = list(reversed(signals))
+    verdicts = risk.allow_trades([DEFAULT_RISK_AMOUNT] * len(signals))
 
+    for s, (allowed, reason) in zip(signals, verdicts):
         msg = f"{s['instrument']} {s['direction']} {s['signal_type']} -> {allowed} ({reason})"
         print(msg)
 
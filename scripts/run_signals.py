@@ -1,11 +1,9 @@
 # scripts/run_signals.py
 
-from datetime import datetime, timezone
-import uuid
-
 from finam_bot.storage_sqlite import StorageSQLite
 from finam_bot.signals.registry import STRATEGIES
-from finam_bot.instruments import get_asset_class
+from finam_bot.instruments import default_registry
+from finam_bot.decisions.batch import decide_batch
 from finam_bot.qty import QtyCalculator
 from finam_bot.risk_engine_v2_2 import RiskEngineV22
 from finam_bot.risk_config import MAX_RISK_PER_TRADE
@@ -16,82 +14,49 @@ def main():
     load_env()
     storage = StorageSQLite()
     equity = 100_000.0  # временно, далее из account snapshot
-    risk_engine = RiskEngineV22(storage=storage, equity=equity)
+    registry = default_registry()  # кэш AssetsService, без RPC на сделку
+    if registry.is_stale():
+        # расписание за пределами кэша не проверяется (MARKET_CLOSED пропускается)
+        print("WARNING: instruments cache is stale, run scripts/refresh_instruments.py")
+    risk_engine = RiskEngineV22(storage=storage, equity=equity, registry=registry)
 
     print(f"EQUITY: {equity}")
     print(f"MAX_RISK_PER_TRADE: {MAX_RISK_PER_TRADE}")
 
     # === 1. Market data (временно mock) ===
-    symbol = "NG-2.26"
-    last_price = 3.11
+    prices = {
+        "NG-2.26": 3.11,
+    }
 
     # === 2. Signal detection ===
-    signal = None
-    for strategy in STRATEGIES:
-        signal = strategy.detect(symbol=symbol, price=last_price)
-        if signal:
-            break
-
-    if not signal:
+    signals = []
+    for symbol, last_price in prices.items():
+        for strategy in STRATEGIES:
+            signal = strategy.detect(symbol=symbol, price=last_price)
+            if signal:
+                signals.append(signal)
+                break
+
+    if not signals:
         print("NO SIGNAL")
         return
 
-    print(f"SIGNAL: {signal}")
-
-    # === 3. Asset class ===
-    asset_class = get_asset_class(signal.symbol)
-    print(f"ASSET_CLASS: {asset_class}")
-
-    # === 4. Qty calculation ===
-    qty = QtyCalculator(
-        max_risk_per_trade=MAX_RISK_PER_TRADE
-    ).calc(
-        entry_price=signal.entry,
-        stop_price=signal.stop,
-        asset_class=asset_class,
+    # === 3-5. Asset class, qty, Risk v2.2 — одной пачкой ===
+    qty_calc = QtyCalculator(
+        max_risk_per_trade=MAX_RISK_PER_TRADE,
+        registry=registry,
     )
+    decisions = decide_batch(signals, qty_calc=qty_calc, risk=risk_engine)
 
-    print(f"QTY: {qty}")
-
-    if qty <= 0:
-        print("QTY BLOCKED")
-        return
-
-    # === 5. Risk v2.2 ===
-    verdict = risk_engine.check(
-        asset_class=asset_class,
-        qty=qty,
-        entry=signal.entry,
-        stop=signal.stop,
-    )
-
-    allowed = verdict.allowed
-    reason = verdict.reason
-
-    if not allowed:
-        print(f"⛔ BLOCKED: {reason}")
-        return
-
-    print(f"✅ ALLOWED [{asset_class}] qty={qty}")
-
-    # === 6. Decision snapshot ===
-    decision = {
-        "decision_id": str(uuid.uuid4()),
-        "ts": datetime.now(timezone.utc).isoformat(),
-        "symbol": signal.symbol,
-        "asset_class": asset_class,
-        "side": signal.side,
-        "entry": signal.entry,
-        "stop": signal.stop,
-        "qty": qty,
-        "risk_allowed": allowed,
-        "risk_reason": reason,
-        "strategy": signal.reason,
-        "confidence": signal.confidence,
-    }
+    for d in decisions:
+        if d["risk_allowed"]:
+            print(f"✅ ALLOWED [{d['asset_class']}] {d['symbol']} qty={d['qty']}")
+        else:
+            print(f"⛔ BLOCKED [{d['asset_class']}] {d['symbol']}: {d['risk_reason']}")
 
-    storage.insert_decision(decision)
-    print("🧠 DECISION STORED")
+    # === 6. Decision snapshot (одна транзакция) ===
+    storage.insert_decisions(decisions)
+    print(f"🧠 DECISIONS STORED: {len(decisions)}")
 
 
 if __name__ == "__main__":